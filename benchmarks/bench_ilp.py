@@ -0,0 +1,190 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import argparse
+import contextlib
+import os
+import time
+import typing
+
+import numpy as np
+
+from pykit.ilp import (
+    create_message,
+    create_bulk_message,
+    send_columns,
+    send_tcp_messages,
+    send_udp_batched,
+    TcpSender
+)
+from pykit.ilp_server import IlpServer
+
+BENCH_TABLE = 'bench_ilp'
+
+
+class BenchResult:
+    def __init__(self, name: str, rows: int, num_bytes: int, elapsed: float, latencies: typing.List[float]):
+        self.name = name
+        self.rows = rows
+        self.num_bytes = num_bytes
+        self.elapsed = elapsed
+        self.latencies = latencies
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else float('inf')
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.num_bytes / (1024 ** 2) / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def latency_percentile(self, percentile: float) -> float:
+        return float(np.percentile(self.latencies, percentile)) if self.latencies else float('nan')
+
+    def __str__(self):
+        result_str = f'{self.name:<24}'
+        result_str += f'{self.rows:>10} rows '
+        result_str += f'{self.rows_per_sec:>14,.0f} rows/s '
+        result_str += f'{self.mb_per_sec:>9.2f} MB/s '
+        result_str += f'p50: {self.latency_percentile(50) * 1e3:>8.3f} ms '
+        result_str += f'p99: {self.latency_percentile(99) * 1e3:>8.3f} ms'
+        return result_str
+
+
+def bench_messages(rows: int) -> typing.List[str]:
+    return [create_message(
+        BENCH_TABLE,
+        symbols={'sym': f's{idx % 100}'},
+        fields={'price': idx * 0.25, 'qty': idx, 'side': 'buy' if idx % 2 else 'sell'},
+        ts=1633053600000000 + idx) for idx in range(rows)]
+
+
+def bench_columns(rows: int) -> typing.Dict[str, typing.Any]:
+    idx = np.arange(rows)
+    return {
+        'symbols': {'sym': np.array([f's{i}' for i in range(100)], dtype=object)[idx % 100]},
+        'fields': {
+            'price': idx * 0.25,
+            'qty': idx,
+            'side': np.where(idx % 2 == 1, 'buy', 'sell').astype(object)},
+        'ts': 1633053600000000 + idx}
+
+
+def _slice_columns(columns: typing.Dict[str, typing.Any], start: int, end: int) -> typing.Dict[str, typing.Any]:
+    return {
+        'symbols': {name: values[start:end] for name, values in columns['symbols'].items()},
+        'fields': {name: values[start:end] for name, values in columns['fields'].items()},
+        'ts': columns['ts'][start:end]}
+
+
+def bench_create_message(rows: int, batch_rows: int) -> BenchResult:
+    latencies = []
+    num_bytes = 0
+    start = time.perf_counter()
+    for batch_start in range(0, rows, batch_rows):
+        batch_t0 = time.perf_counter()
+        for idx in range(batch_start, min(rows, batch_start + batch_rows)):
+            num_bytes += len(create_message(
+                BENCH_TABLE,
+                symbols={'sym': f's{idx % 100}'},
+                fields={'price': idx * 0.25, 'qty': idx, 'side': 'buy' if idx % 2 else 'sell'},
+                ts=1633053600000000 + idx))
+        latencies.append(time.perf_counter() - batch_t0)
+    return BenchResult('create_message', rows, num_bytes, time.perf_counter() - start, latencies)
+
+
+def bench_sender(name: str,
+                 server: IlpServer,
+                 messages: typing.List[str],
+                 batch_rows: int,
+                 send: typing.Callable[[typing.List[str]], typing.Any],
+                 timeout: float = 30.0) -> BenchResult:
+    # flush latency: from handing a batch to the sender until the server has counted all its lines
+    server.reset()
+    latencies = []
+    sent_rows = 0
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for batch_start in range(0, len(messages), batch_rows):
+            batch = messages[batch_start:batch_start + batch_rows]
+            batch_t0 = time.perf_counter()
+            send(batch)
+            sent_rows += len(batch)
+            if not server.wait_for(sent_rows, timeout):
+                break
+            latencies.append(time.perf_counter() - batch_t0)
+    elapsed = time.perf_counter() - start
+    if server.error_count:
+        raise ValueError(f'{name}: server rejected {server.error_count} lines, first: {server.errors[0]}')
+    return BenchResult(name, server.line_count, server.byte_count, elapsed, latencies)
+
+
+def run(rows: int, batch_rows: int, udp: bool = True, validate: bool = True) -> typing.List[BenchResult]:
+    messages = bench_messages(rows)
+    results = [bench_create_message(rows, batch_rows)]
+    with IlpServer(validate=validate) as server:
+        tcp_host, tcp_port = server.tcp_address
+        results.append(bench_sender(
+            'send_tcp_messages', server, messages, batch_rows,
+            lambda batch: send_tcp_messages(*batch, host=tcp_host, port=tcp_port)))
+        with TcpSender(host=tcp_host, port=tcp_port) as sender:
+            results.append(bench_sender(
+                'TcpSender', server, messages, batch_rows,
+                lambda batch: sender.send(*batch)))
+        columns = bench_columns(rows)
+        with TcpSender(host=tcp_host, port=tcp_port) as sender:
+            results.append(bench_sender(
+                'create_bulk_message', server, list(range(rows)), batch_rows,
+                lambda batch: sender.send_bytes(create_bulk_message(
+                    BENCH_TABLE, **_slice_columns(columns, batch[0], batch[-1] + 1)))))
+            sym_codes = np.arange(rows) % 100
+            sym_dictionary = [f's{i}' for i in range(100)]
+            results.append(bench_sender(
+                'send_columns', server, list(range(rows)), batch_rows,
+                lambda batch: send_columns(BENCH_TABLE, {
+                    'sym': (sym_codes[batch[0]:batch[-1] + 1], sym_dictionary),
+                    **_slice_columns(columns, batch[0], batch[-1] + 1)['fields'],
+                    'ts': columns['ts'][batch[0]:batch[-1] + 1]}, timestamp='ts', sender=sender)))
+        if udp:
+            # loopback UDP may drop datagrams under load, the result reports what arrived
+            udp_host, udp_port = server.udp_address
+            results.append(bench_sender(
+                'send_udp_batched', server, messages, batch_rows,
+                lambda batch: send_udp_batched(*batch, group=udp_host, port=udp_port),
+                timeout=1.0))
+    return results
+
+
+def _args_parser() -> argparse.ArgumentParser:
+    args_parser = argparse.ArgumentParser(description='ILP ingestion benchmarks against a local stand-in server')
+    args_parser.add_argument('--rows', default=100_000, type=int, help='total rows per benchmark')
+    args_parser.add_argument('--batch', default=1_000, type=int, help='rows per flush')
+    args_parser.add_argument('--no-udp', action='store_true', help='skip UDP senders')
+    args_parser.add_argument('--no-validate', action='store_true', help='skip server side syntax validation')
+    return args_parser
+
+
+if __name__ == '__main__':
+    args = _args_parser().parse_args()
+    for result in run(args.rows, args.batch, udp=not args.no_udp, validate=not args.no_validate):
+        print(result)
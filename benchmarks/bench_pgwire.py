@@ -0,0 +1,148 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import argparse
+import asyncio
+import time
+import typing
+
+import psycopg2
+
+from benchmarks.bench_ilp import BenchResult
+from pykit.aio import (
+    async_query_columns,
+    close_async_pool
+)
+from pykit.pgwire import (
+    CONN_ATTRS,
+    configure_pool,
+    insert_values,
+    query_columns,
+    query_df,
+    query_iter,
+    select_all,
+    with_cursor
+)
+from pykit.pgwire_server import PgWireServer
+
+BENCH_SQL = 'SELECT * FROM bench_pgwire'
+
+
+def bench_calls(name: str,
+                calls: int,
+                call: typing.Callable[[], typing.Any],
+                rows_per_call: int = 1,
+                bytes_per_call: int = 0) -> BenchResult:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_t0)
+    return BenchResult(name, calls * rows_per_call, calls * bytes_per_call, time.perf_counter() - start, latencies)
+
+
+def bench_async(name: str, calls: int, concurrency: int, rows_per_call: int, bytes_per_call: int) -> BenchResult:
+    # calls queries, concurrency at a time, from one event loop
+    latencies = []
+
+    async def _query(semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            call_t0 = time.perf_counter()
+            await async_query_columns(BENCH_SQL)
+            latencies.append(time.perf_counter() - call_t0)
+
+    async def _run() -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            await asyncio.gather(*(_query(semaphore) for _ in range(calls)))
+        finally:
+            await close_async_pool()
+
+    start = time.perf_counter()
+    asyncio.run(_run())
+    return BenchResult(name, calls * rows_per_call, calls * bytes_per_call, time.perf_counter() - start, latencies)
+
+
+def _consume(chunks: typing.Iterator[typing.Any]) -> None:
+    for _ in chunks:
+        pass
+
+
+def run(rows: int, calls: int, chunk_rows: int, concurrency: int = 8) -> typing.List[BenchResult]:
+    # round trip benchmarks on a one row result, decode benchmarks on a rows rows result
+    conn_attrs = dict(CONN_ATTRS)
+    with PgWireServer(rows=rows) as server:
+        text_bytes = sum(len(row) for row in server.data_rows(False))
+        binary_bytes = sum(len(row) for row in server.data_rows(True))
+        configure_pool(server.conn_attrs)
+        try:
+            def _connect_select():
+                with psycopg2.connect(**server.conn_attrs) as conn:
+                    with conn.cursor() as stmt_cursor:
+                        stmt_cursor.execute('SELECT 1 LIMIT 1')
+                        stmt_cursor.fetchall()
+                conn.close()
+
+            def _pooled_select(stmt_cursor):
+                stmt_cursor.execute('SELECT 1 LIMIT 1')
+                return stmt_cursor.fetchall()
+
+            results = [
+                bench_calls('psycopg2.connect', calls, _connect_select),
+                bench_calls('with_cursor', calls, lambda: with_cursor(_pooled_select)),
+                bench_calls('select_all', calls, lambda: select_all('bench_pgwire'), rows_per_call=10),
+                bench_calls(
+                    'insert_values', 1,
+                    lambda: insert_values('bench_pgwire', (('id', 'LONG'), ('sym', 'SYMBOL')),
+                                          *((idx, f's{idx % 100}') for idx in range(rows))),
+                    rows_per_call=rows),
+                bench_calls('query_df', calls, lambda: query_df(BENCH_SQL), rows, text_bytes),
+                bench_calls('query_iter', calls, lambda: _consume(query_iter(BENCH_SQL, chunk_rows=chunk_rows)),
+                            rows, text_bytes),
+                bench_calls('query_iter named', calls,
+                            lambda: _consume(query_iter(BENCH_SQL, chunk_rows=chunk_rows, named=True)),
+                            rows, text_bytes),
+                bench_calls('query_iter binary', calls,
+                            lambda: _consume(query_iter(BENCH_SQL, chunk_rows=chunk_rows, binary=True)),
+                            rows, binary_bytes),
+                bench_calls('query_columns', calls, lambda: query_columns(BENCH_SQL), rows, binary_bytes),
+                bench_async('async_query_columns', calls, concurrency, rows, binary_bytes)]
+        finally:
+            configure_pool(conn_attrs)
+    return results
+
+
+def _args_parser() -> argparse.ArgumentParser:
+    args_parser = argparse.ArgumentParser(description='pgwire client benchmarks against a local stand-in server')
+    args_parser.add_argument('--rows', default=100_000, type=int, help='rows per query result')
+    args_parser.add_argument('--calls', default=20, type=int, help='calls per benchmark')
+    args_parser.add_argument('--chunk', default=10_000, type=int, help='rows per query_iter chunk')
+    args_parser.add_argument('--concurrency', default=8, type=int, help='concurrent async queries')
+    return args_parser
+
+
+if __name__ == '__main__':
+    args = _args_parser().parse_args()
+    for result in run(args.rows, args.calls, args.chunk, args.concurrency):
+        print(result)
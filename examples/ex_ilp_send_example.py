@@ -24,7 +24,8 @@
 from pykit import (
     create_message,
     send_tcp_messages,
-    send_udp_messages
+    send_udp_messages,
+    send_udp_batched
 )
 
 if __name__ == "__main__":
@@ -35,3 +36,6 @@ if __name__ == "__main__":
 
     send_udp_messages(create_message(
         table_name, symbols={'proto': 'udp'}, fields={'noun': 'table'}))
+
+    send_udp_batched(*(create_message(
+        table_name, symbols={'proto': 'udp'}, fields={'idx': idx}) for idx in range(1000)))
@@ -32,7 +32,8 @@ from pykit.core import (
     Metadata,
     Transaction,
     PartitionBy,
-    Partition
+    Partition,
+    read_txn_id
 )
 
 from pykit.types import (
@@ -46,29 +47,145 @@ from pykit.ts import (
     from_timestamp,
     to_date,
     from_date,
-    now_utc
+    now_utc,
+    to_timestamps,
+    from_timestamps,
+    utc_to_local,
+    local_to_utc
+)
+
+from pykit.cache import (
+    QueryCache,
+    normalize_sql,
+    referenced_tables
 )
 
 from pykit.pgwire import (
     Cursor,
     CursorConsumer,
+    CONN_ATTRS,
+    POOL_ATTRS,
+    connection_pool,
+    wire_pool,
+    configure_pool,
+    close_pool,
+    enable_query_cache,
+    disable_query_cache,
     with_cursor,
     create_table,
+    create_table_statement,
+    create_tables,
+    execute_statements,
+    truncate_tables,
     insert_values,
+    insert_dataframe,
     select_all,
+    query_iter,
+    query_columns,
+    query_df,
+    parallel_query,
+    time_slices,
+    df_from_rows,
     drop_table,
     drop_tables,
     report_version
 )
 
+from pykit.wire import (
+    StatementResult,
+    WireConnection,
+    WireError
+)
+
+from pykit.aio import (
+    AsyncWireConnection,
+    AsyncConnectionPool,
+    async_pool,
+    close_async_pool,
+    async_query_columns,
+    async_query_df,
+    async_execute
+)
+
 from pykit.ilp import (
     create_message,
     send_tcp_messages,
-    send_udp_messages
+    send_udp_messages,
+    create_bulk_message,
+    send_columns,
+    send_udp_batched,
+    pack_datagrams,
+    TcpSender
+)
+
+from pykit.pool import (
+    ConnectionPool,
+    PoolTimeoutError
+)
+
+from pykit.spool import (
+    Spool,
+    SpoolFullError
+)
+
+from pykit.csv_import import (
+    import_csv,
+    infer_column_types
+)
+
+from pykit.columns import (
+    register_codec,
+    column_codec,
+    read_column,
+    read_fixed,
+    read_string,
+    read_symbol,
+    read_symbol_table,
+    symbol_key,
+    clear_symbol_tables,
+    read_long256,
+    read_long256_hex,
+    long256_hex,
+    read_binary,
+    read_binary_values,
+    BinaryColumn,
+    take_rows,
+    column_idx,
+    symbol_idx,
+    partition_in_range,
+    partition_row_range,
+    map_file,
+    string_lengths
+)
+
+from pykit.geohash import (
+    GeoBox,
+    geohash_bits,
+    read_geohash,
+    parse_geohash,
+    geohash_boxes,
+    geohash_centres,
+    geohash_prefix_mask,
+    geohash_box_mask
+)
+
+from pykit.symbols import (
+    rows_for_symbol,
+    df_for_symbol,
+    latest_by
+)
+
+from pykit.strings import (
+    string_equals,
+    string_in,
+    string_startswith,
+    string_contains
 )
 
 from pykit.dataframe import (
-    df_from_table
+    df_from_table,
+    df_from_partition_rows,
+    read_table
 )
 
 import pykit.internal
@@ -30,6 +30,9 @@ import zipfile
 from pathlib import Path
 
 from pykit.core import (QDB_HOME, QDB_DB_ROOT, QDB_DB_CONF, QDB_DB_PUBLIC, QDB_CLONE_FOLDER)
+from pykit.csv_import import (DEFAULT_CHUNK_BYTES, import_csv)
+from pykit.ilp import (ILP_HOST, ILP_PORT)
+from pykit.types import ColumnTypes
 
 
 def _update_command(branch_name: str, force: bool):
@@ -99,6 +102,30 @@ def _start_command():
         pass
 
 
+def _import_csv_command(args: argparse.Namespace):
+    column_types = {}
+    if args.types:
+        for column_spec in args.types.split(','):
+            col_name, _, type_name = column_spec.partition(':')
+            column_types[col_name.strip()] = ColumnTypes.resolve_name(type_name.strip())
+    try:
+        total_rows = import_csv(
+            args.csv_file,
+            args.table,
+            column_types=column_types,
+            timestamp=args.timestamp,
+            timestamp_format=args.timestamp_format,
+            delimiter=args.delimiter,
+            host=args.host,
+            port=args.port,
+            chunk_bytes=args.chunk_mb * 1024 ** 2,
+            workers=args.workers)
+    except (OSError, ValueError) as import_error:
+        print(f'Failed to import {args.csv_file}: {import_error}')
+        sys.exit(1)
+    print(f'Imported {total_rows} rows into {args.table}')
+
+
 def _extract_zip(src_file_name, dst_folder) -> None:
     import pykit
     src_file = Path(pykit.__file__).parent / 'resources' / src_file_name
@@ -141,6 +168,33 @@ def _args_parser() -> argparse.ArgumentParser:
         default=False,
         type=bool,
         help='FORCE True to delete/clone/build QuestDB\'s github repo')
+    import_csv_cmd = command.add_parser('import-csv', help='Streams a CSV file into a table over ILP')
+    import_csv_cmd.add_argument('csv_file', type=str, help='CSV file, the first line holds the column names')
+    import_csv_cmd.add_argument('--table', required=True, type=str, help='target table')
+    import_csv_cmd.add_argument('--timestamp', default=None, type=str, help='designated timestamp column')
+    import_csv_cmd.add_argument(
+        '--timestamp-format',
+        default=None,
+        type=str,
+        help='strftime format of timestamp columns (default inferred)')
+    import_csv_cmd.add_argument(
+        '--types',
+        default=None,
+        type=str,
+        help='comma separated column:TYPE pairs, e.g. sym:SYMBOL,qty:INT (default inferred)')
+    import_csv_cmd.add_argument('--delimiter', default=',', type=str, help='field delimiter (default ,)')
+    import_csv_cmd.add_argument('--host', default=ILP_HOST, type=str, help=f'ILP host (default {ILP_HOST})')
+    import_csv_cmd.add_argument('--port', default=ILP_PORT, type=int, help=f'ILP port (default {ILP_PORT})')
+    import_csv_cmd.add_argument(
+        '--workers',
+        default=None,
+        type=int,
+        help='parser processes (default number of cpus)')
+    import_csv_cmd.add_argument(
+        '--chunk-mb',
+        default=DEFAULT_CHUNK_BYTES // 1024 ** 2,
+        type=int,
+        help=f'MB of CSV per parsed chunk (default {DEFAULT_CHUNK_BYTES // 1024 ** 2})')
     return args_parser
 
 
@@ -153,3 +207,5 @@ if __name__ == '__main__':
         _start_command()
     elif args.command == 'update':
         _update_command(args.branch, args.force)
+    elif args.command == 'import-csv':
+        _import_csv_command(args)
@@ -0,0 +1,332 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import asyncio
+import contextlib
+import struct
+import time
+import typing
+
+import numpy as np
+import pandas as pd
+
+from pykit.pgwire import (
+    CONN_ATTRS,
+    POOL_ATTRS,
+    _numbered_params
+)
+from pykit.pool import PoolTimeoutError
+from pykit.wire import (
+    WireError,
+    _WireProtocol,
+    _ResultDecoder,
+    _RECV_SIZE,
+    _bind_message,
+    _cancel_message,
+    _cstr,
+    _error_fields,
+    _message,
+    _row_description,
+    _startup_message
+)
+
+
+class AsyncWireConnection(_WireProtocol):
+    # asyncio counterpart of pykit.wire.WireConnection. A query interrupted by cancellation
+    # or a timeout leaves the protocol mid-result, so the connection sends the server a
+    # CancelRequest and closes itself; pools then discard it.
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, address: typing.Tuple[str, int]):
+        super().__init__()
+        self._reader = reader
+        self._writer = writer
+        self._address = address
+
+    @classmethod
+    async def connect(cls,
+                      host: str = '127.0.0.1',
+                      port: typing.Union[int, str] = 8812,
+                      user: str = 'admin',
+                      password: str = 'quest',
+                      database: str = 'qdb',
+                      connect_timeout: float = 10.0,
+                      **_unused_attrs):
+        address = (host, int(port))
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*address), connect_timeout)
+        conn = cls(reader, writer, address)
+        try:
+            conn._send(_startup_message(user, database))
+            while not conn._on_startup_message(*await conn._read_message(), user, password):
+                pass
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    @property
+    def closed(self) -> bool:
+        return self._writer is None
+
+    def close(self) -> None:
+        if self._writer is not None:
+            if not self._writer.is_closing():
+                self._writer.write(b'X\x00\x00\x00\x04')
+            self._writer.close()
+            self._writer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def cancel(self) -> None:
+        # asks the server, over a separate connection, to stop the running statement
+        if self.backend_key is not None:
+            _, writer = await asyncio.open_connection(*self._address)
+            writer.write(_cancel_message(self.backend_key))
+            await writer.drain()
+            writer.close()
+
+    async def execute(self, sql: str) -> str:
+        # simple query protocol, returns the tag of the last command
+        async with self._interruptible():
+            self._send(_message(b'Q', _cstr(sql)))
+            tag = None
+            error = None
+            while True:
+                msg_type, payload = await self._read_message()
+                if msg_type == b'C':
+                    tag = payload[:-1].decode('utf-8')
+                elif msg_type == b'E':
+                    error = WireError(_error_fields(payload))
+                elif msg_type == b'Z':
+                    if error is not None:
+                        raise error
+                    return tag
+
+    async def query_columns(self,
+                            sql: str,
+                            params: typing.Sequence[typing.Any] = None) -> typing.Dict[str, np.ndarray]:
+        async with self._interruptible():
+            self._send(
+                _message(b'P', b'\x00' + _cstr(sql) + b'\x00\x00'),
+                _bind_message(params),
+                _message(b'D', b'P\x00'),
+                _message(b'E', b'\x00' + struct.pack('>i', 0)),
+                _message(b'S'))
+            decoder = None
+            columns = None
+            error = None
+            while True:
+                if self._feed_rows(decoder) or (message := self._take_message()) is None:
+                    await self._fill()
+                    continue
+                msg_type, payload = message
+                if msg_type == b'T':
+                    decoder = _ResultDecoder(_row_description(payload))
+                elif msg_type == b'n':
+                    decoder = _ResultDecoder([])
+                elif msg_type in (b'C', b'I') and decoder is not None:
+                    columns = decoder.finish()
+                elif msg_type == b'E':
+                    error = WireError(_error_fields(payload))
+                elif msg_type == b'Z':
+                    if error is not None:
+                        raise error
+                    return columns
+
+    async def query_df(self, sql: str, params: typing.Sequence[typing.Any] = None) -> pd.DataFrame:
+        return pd.DataFrame(await self.query_columns(sql, params), copy=False)
+
+    @contextlib.asynccontextmanager
+    async def _interruptible(self) -> typing.AsyncIterator[None]:
+        try:
+            yield
+        except (asyncio.CancelledError, OSError):
+            if not self.closed:
+                self.close()
+                _background(self.cancel())
+            raise
+
+    def _send(self, *messages: bytes) -> None:
+        self._writer.write(b''.join(messages))
+
+    async def _fill(self) -> None:
+        await self._writer.drain()
+        data = await self._reader.read(_RECV_SIZE)
+        if not data:
+            self.close()
+            raise ConnectionError('server closed the connection')
+        self._append(data)
+
+    async def _read_message(self) -> typing.Tuple[bytes, bytes]:
+        while (message := self._take_message()) is None:
+            await self._fill()
+        return message
+
+
+class AsyncConnectionPool:
+    # asyncio pool of up to max_size connections, opened on demand and handed out most
+    # recently used first; connections idle for longer than max_idle seconds are closed.
+    # Belongs to the event loop it is first used from.
+
+    def __init__(self,
+                 connect: typing.Callable[[], typing.Awaitable[AsyncWireConnection]],
+                 max_size: int = 8,
+                 max_idle: float = 300.0,
+                 acquire_timeout: float = 30.0,
+                 **_unused_attrs):
+        if max_size < 1:
+            raise ValueError(f'invalid pool size [max: {max_size}]')
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect
+        self._cond = asyncio.Condition()
+        self._idle = []  # (connection, released at), most recently released last
+        self._size = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    async def acquire(self, timeout: float = None) -> AsyncWireConnection:
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError('pool is closed')
+                self._evict_idle()
+                if self._idle:
+                    return self._idle.pop()[0]
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.0:
+                    raise PoolTimeoutError(f'no connection available within timeout [max_size: {self.max_size}]')
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        try:
+            return await self._connect()
+        except BaseException:
+            async with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    async def release(self, conn: AsyncWireConnection, discard: bool = False) -> None:
+        async with self._cond:
+            if discard or self._closed or conn.closed:
+                conn.close()
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextlib.asynccontextmanager
+    async def connection(self, timeout: float = None) -> typing.AsyncIterator[AsyncWireConnection]:
+        conn = await self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            await asyncio.shield(self.release(conn, discard=conn.closed))
+            raise
+        await self.release(conn)
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def _evict_idle(self) -> None:
+        expired_before = time.monotonic() - self.max_idle
+        while self._idle and (self._idle[0][1] < expired_before or self._idle[0][0].closed):
+            self._idle.pop(0)[0].close()
+            self._size -= 1
+
+
+_pool = None
+_background_tasks = set()
+
+
+def async_pool() -> AsyncConnectionPool:
+    # one pool per event loop, configured from pgwire.CONN_ATTRS and POOL_ATTRS
+    global _pool
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool[0] is not loop:
+        _pool = (loop, AsyncConnectionPool(lambda: AsyncWireConnection.connect(**CONN_ATTRS), **POOL_ATTRS))
+    return _pool[1]
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool = _pool[1]
+        _pool = None
+        await pool.close()
+
+
+async def async_query_columns(sql: str,
+                              params: typing.Sequence[typing.Any] = None,
+                              timeout: float = None) -> typing.Dict[str, np.ndarray]:
+    # pgwire.query_columns for asyncio; on timeout the query is cancelled server side
+    # and asyncio.TimeoutError raised
+    async with async_pool().connection() as conn:
+        return await asyncio.wait_for(conn.query_columns(_numbered_params(sql, params), params), timeout)
+
+
+async def async_query_df(sql: str,
+                         params: typing.Sequence[typing.Any] = None,
+                         timeout: float = None) -> pd.DataFrame:
+    return pd.DataFrame(await async_query_columns(sql, params, timeout), copy=False)
+
+
+async def async_execute(sql: str, timeout: float = None) -> str:
+    async with async_pool().connection() as conn:
+        return await asyncio.wait_for(conn.execute(sql), timeout)
+
+
+def _background(coro: typing.Awaitable[typing.Any]) -> None:
+    # fire and forget, keeping a reference until done and swallowing connection errors
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+
+
+def _background_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,196 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import collections
+import re
+import sys
+import threading
+import typing
+
+import numpy as np
+import pandas as pd
+
+from pykit.core import read_txn_id
+
+DEFAULT_CACHE_BYTES = 64 * 1024 ** 2
+
+# single quoted literals, kept verbatim when normalizing
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_SOURCE = re.compile(r'\b(?:from|join)\s+("[^"]+"|[\w.\-]+)(\s*[(,])?')
+_LEADING_TABLE = re.compile(r'^("[^"]+"|[\w.\-]+)(?:\s+(?:limit|where|latest|sample|order)\b.*)?;?$')
+_VOLATILE = re.compile(r'\b(?:rnd_\w+|now|systimestamp|sysdate|current_timestamp)\s*\(')
+_LIST_TOKEN = re.compile(r'"[^"]*"|[(),]|\w+')
+# words ending the item list of a FROM or JOIN
+_LIST_END = frozenset((
+    'where', 'group', 'order', 'limit', 'sample', 'latest', 'union', 'except', 'intersect',
+    'inner', 'left', 'right', 'full', 'outer', 'cross', 'asof', 'lt', 'splice'))
+
+
+class QueryCache:
+    # LRU cache of query results, valid while none of the tables the query reads from
+    # has committed. Only queries whose sources are all tables found under QDB_DB_DATA
+    # are cached, as their txn_id can be read locally before every lookup: a changed
+    # txn_id reloads the entry, so results are never stale. Cached results are copied
+    # on the way out, callers may modify them.
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (txn ids, result, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(self,
+                    sql: str,
+                    params: typing.Sequence[typing.Any],
+                    load: typing.Callable[[], typing.Any],
+                    kind: str = '') -> typing.Any:
+        normalized = normalize_sql(sql)
+        tables = referenced_tables(normalized)
+        try:
+            key = (kind, normalized, tuple(params or ()))
+            hash(key)
+        except TypeError:
+            tables = None
+        txn_ids = _txn_ids(tables) if tables else None
+        if txn_ids is None:
+            return load()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == txn_ids:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(entry[1])
+            self.misses += 1
+        # txn ids are read before loading, a commit racing the query only causes a reload
+        result = load()
+        if result is None:
+            return None
+        size = _result_size(result)
+        with self._lock:
+            self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (txn_ids, result, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return _copy_result(result)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: typing.Any) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+def normalize_sql(sql: str) -> str:
+    # whitespace collapsed and lower cased outside string literals, no trailing ';'
+    parts = _LITERAL.split(sql.strip().rstrip(';').strip())
+    for idx in range(0, len(parts), 2):
+        parts[idx] = re.sub(r'\s+', ' ', parts[idx]).lower()
+    return ''.join(parts)
+
+
+def referenced_tables(normalized_sql: str) -> typing.Optional[typing.Set[str]]:
+    # tables read by the query, None when it cannot be cached: volatile functions,
+    # table functions, comma joins or no table at all
+    code = ' '.join(_LITERAL.split(normalized_sql)[::2])
+    if _VOLATILE.search(code) or _has_comma_join(code):
+        return None
+    if leading := _LEADING_TABLE.match(code):
+        return {leading.group(1).strip('"')}
+    tables = set()
+    for match in _SOURCE.finditer(code):
+        if match.group(2):
+            return None
+        tables.add(match.group(1).strip('"'))
+    return tables or None
+
+
+def _has_comma_join(code: str) -> bool:
+    # True when a FROM or JOIN lists several items, at any subquery depth. The aliased
+    # tables after the first could not be told apart from other names.
+    in_list = [False]  # per open parenthesis
+    for token in _LIST_TOKEN.findall(code):
+        if token == '(':
+            in_list.append(False)
+        elif token == ')':
+            if len(in_list) > 1:
+                in_list.pop()
+        elif token == ',':
+            if in_list[-1]:
+                return True
+        elif token in ('from', 'join'):
+            in_list[-1] = True
+        elif token in _LIST_END:
+            in_list[-1] = False
+    return False
+
+
+def _txn_ids(tables: typing.Set[str]) -> typing.Optional[typing.Tuple[typing.Tuple[str, int], ...]]:
+    txn_ids = []
+    for table_name in sorted(tables):
+        txn_id = read_txn_id(table_name)
+        if txn_id is None:
+            return None
+        txn_ids.append((table_name, txn_id))
+    return tuple(txn_ids)
+
+
+def _copy_result(result: typing.Any) -> typing.Any:
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    if isinstance(result, dict):
+        return {name: values.copy() for name, values in result.items()}
+    if isinstance(result, list):
+        return list(result)
+    return result
+
+
+def _result_size(result: typing.Any) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, dict):
+        return sum(_array_size(values) for values in result.values())
+    if isinstance(result, list):
+        return sys.getsizeof(result) + sum(
+            sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in result)
+    return sys.getsizeof(result)
+
+
+def _array_size(values: np.ndarray) -> int:
+    if values.dtype == object:
+        return values.nbytes + sum(sys.getsizeof(value) for value in values)
+    return values.nbytes
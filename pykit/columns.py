@@ -0,0 +1,423 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import mmap
+from pathlib import Path
+import sys
+import threading
+import typing
+
+import numpy as np
+import pandas as pd
+
+from pykit.core import TableInfo
+from pykit.types import (
+    ColumnTypes,
+    ColumnType,
+    NPArray
+)
+
+NOT_STORED_ANONYMOUS_MEMORY = -1
+
+# SYMBOL key of null values, the length of null STRING and BINARY values, and each
+# of the four longs of a null LONG256
+INT_NULL = np.iinfo(np.int32).min
+STRING_NULL_LENGTH = -1
+LONG256_NULL = np.uint64(0x8000000000000000)
+
+# symbol table offsets file header size
+SYMBOL_OFFSETS_HEADER_SIZE = 64
+
+# reads column col_idx of a local table, all partitions, into one array
+ColumnCodec = typing.Callable[[TableInfo, int], typing.Any]
+
+# partition id, table row of the partition's first row, and ascending partition row ids
+PartitionRows = typing.List[typing.Tuple[int, int, np.ndarray]]
+
+_CODECS: typing.Dict[int, ColumnCodec] = {}
+
+
+def register_codec(col_type: ColumnType, codec: ColumnCodec) -> None:
+    _CODECS[col_type.type_id] = codec
+
+
+def column_codec(col_type: ColumnType) -> ColumnCodec:
+    codec = _CODECS.get(col_type.type_id)
+    if codec is None:
+        raise ValueError(f'no reader for column type: {col_type.type_name}')
+    return codec
+
+
+def read_column(table_info: TableInfo, col_idx: int) -> typing.Any:
+    return column_codec(table_info.column_type(col_idx))(table_info, col_idx)
+
+
+def take_rows(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> typing.Any:
+    # column col_idx at the given rows only, as read_column would return it. Codecs without
+    # a row reader of their own read the whole column first.
+    codec = column_codec(table_info.column_type(col_idx))
+    take = _ROW_READERS.get(codec)
+    if take is not None:
+        return take(table_info, col_idx, partition_rows)
+    row_ids = np.concatenate([np.zeros(0, dtype=np.int64)] + [first + p_rows for _, first, p_rows in partition_rows])
+    return codec(table_info, col_idx)[row_ids]
+
+
+def column_idx(table_info: TableInfo, column: str) -> int:
+    for col_idx in range(table_info.column_count):
+        if table_info.column_name(col_idx) == column:
+            return col_idx
+    raise ValueError(f'column [{column}] not found in table [{table_info.metadata.table_name}]')
+
+
+def symbol_idx(table_info: TableInfo, col_idx: int) -> int:
+    # position among the table's SYMBOL columns, as in _txn
+    return sum(1 for idx in range(col_idx) if table_info.column_type(idx) is ColumnTypes.SYMBOL)
+
+
+def partition_in_range(table_info: TableInfo, p_id: int, ts_from: int, ts_to: int) -> bool:
+    # partition timestamps are the floor of their rows' timestamps
+    partitions = table_info.transaction.partitions
+    if ts_to is not None and partitions[p_id].p_timestamp >= ts_to:
+        return False
+    if ts_from is not None and p_id + 1 < len(partitions) and partitions[p_id + 1].p_timestamp <= ts_from:
+        return False
+    return True
+
+
+def partition_row_range(table_info: TableInfo, p_folder, p_row_count: int,
+                        ts_from: int, ts_to: int) -> typing.Tuple[int, int]:
+    if table_info.ts_idx is None:
+        raise ValueError(f'table [{table_info.metadata.table_name}] has no designated timestamp')
+    ts_name = table_info.column_name(table_info.ts_idx)
+    timestamps = np.frombuffer(map_file(p_folder / f'{ts_name}.d', p_row_count * 8), dtype=np.int64)
+    lo = 0 if ts_from is None else int(np.searchsorted(timestamps, ts_from))
+    hi = p_row_count if ts_to is None else int(np.searchsorted(timestamps, ts_to))
+    return lo, hi
+
+
+def map_file(file_path: Path, length: int = 0) -> mmap.mmap:
+    # length 0 maps the whole file
+    with open(file_path, 'rb') as col_file:
+        return mmap.mmap(
+            col_file.fileno(),
+            length=length,
+            flags=mmap.MAP_SHARED,
+            access=mmap.ACCESS_READ,
+            offset=0)
+
+
+def read_fixed(table_info: TableInfo, col_idx: int) -> NPArray:
+    col_type = table_info.column_type(col_idx)
+    col_mmap, col_file = _concat_partitions(table_info, col_idx, col_type.dtype.itemsize)
+    return NPArray(
+        col_file=col_file,
+        row_count=table_info.row_count,
+        col_type=col_type,
+        col_mmap=col_mmap)
+
+
+def read_string(table_info: TableInfo, col_idx: int) -> np.ndarray:
+    # object array of str, None for nulls
+    col_name = table_info.column_name(col_idx)
+    values = np.empty(table_info.row_count, dtype=object)
+    row = 0
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        if p_row_count:
+            offsets = np.frombuffer(map_file(p_folder / f'{col_name}.i', p_row_count * 8), dtype=np.int64)
+            values[row:row + p_row_count] = _decode_strings(map_file(p_folder / f'{col_name}.d'), offsets)
+            row += p_row_count
+    return values
+
+
+def read_symbol(table_info: TableInfo, col_idx: int) -> pd.Categorical:
+    # the mapping is at least a byte long, empty tables included
+    keys = np.frombuffer(_concat_partitions(table_info, col_idx, 4)[0], dtype=np.int32, count=table_info.row_count)
+    codes = np.where(keys == INT_NULL, -1, keys)
+    return pd.Categorical.from_codes(codes, categories=pd.Index(read_symbol_table(table_info, col_idx), dtype=object))
+
+
+def read_symbol_table(table_info: TableInfo, col_idx: int) -> np.ndarray:
+    # committed values of SYMBOL column col_idx as an object array, the position of each
+    # value is its key. Tables are cached and only grow by the values added since the
+    # last read; the returned array is a view that later reads leave unchanged.
+    with _SYMBOL_TABLES_LOCK:
+        symbol_table, symbol_count = _load_symbol_table(table_info, col_idx)
+        return symbol_table.values[:symbol_count]
+
+
+def symbol_key(table_info: TableInfo, col_idx: int, value: str) -> typing.Optional[int]:
+    # key of value in SYMBOL column col_idx, None when it is not in the symbol table
+    with _SYMBOL_TABLES_LOCK:
+        symbol_table, symbol_count = _load_symbol_table(table_info, col_idx)
+        key = symbol_table.keys.get(value)
+        return key if key is not None and key < symbol_count else None
+
+
+def clear_symbol_tables() -> None:
+    with _SYMBOL_TABLES_LOCK:
+        _SYMBOL_TABLES.clear()
+
+
+class _SymbolTable:
+    def __init__(self, table_id: int, data_version: int):
+        self.table_id = table_id
+        self.data_version = data_version
+        self.values = np.empty(0, dtype=object)
+        self.count = 0
+        self.keys = {}
+
+
+_SYMBOL_TABLES: typing.Dict[typing.Tuple[str, str], _SymbolTable] = {}
+_SYMBOL_TABLES_LOCK = threading.Lock()
+
+
+def _load_symbol_table(table_info: TableInfo, col_idx: int) -> typing.Tuple[_SymbolTable, int]:
+    # the cached table and the snapshot's symbol count, an older snapshot of the same
+    # data version sees a prefix of it
+    col_name = table_info.column_name(col_idx)
+    root_path = table_info.transaction.root_path
+    symbol_count = table_info.transaction.symbol_value_counts[symbol_idx(table_info, col_idx)]
+    table_id, data_version = table_info.metadata.table_id, table_info.transaction.data_version
+    cache_key = (str(root_path), col_name)
+    symbol_table = _SYMBOL_TABLES.get(cache_key)
+    if symbol_table is None or (symbol_table.table_id, symbol_table.data_version) != (table_id, data_version):
+        # new, recreated, or truncated which rewrites the symbol files and bumps the data version
+        symbol_table = _SYMBOL_TABLES[cache_key] = _SymbolTable(table_id, data_version)
+    if symbol_count > symbol_table.count:
+        first = symbol_table.count
+        offsets_mmap = map_file(root_path / f'{col_name}.o', SYMBOL_OFFSETS_HEADER_SIZE + symbol_count * 8)
+        offsets = np.frombuffer(offsets_mmap, dtype=np.int64, count=symbol_count - first,
+                                offset=SYMBOL_OFFSETS_HEADER_SIZE + first * 8)
+        added = _decode_strings(map_file(root_path / f'{col_name}.c'), offsets)
+        if symbol_count > len(symbol_table.values):
+            # new storage, views handed out earlier keep the old one
+            values = np.empty(max(symbol_count, 2 * len(symbol_table.values)), dtype=object)
+            values[:first] = symbol_table.values[:first]
+            symbol_table.values = values
+        symbol_table.values[first:symbol_count] = added
+        symbol_table.keys.update(zip(added, range(first, symbol_count)))
+        symbol_table.count = symbol_count
+    return symbol_table, symbol_count
+
+
+def read_long256(table_info: TableInfo, col_idx: int) -> np.ndarray:
+    # (row_count, 4) uint64 view, least significant long first
+    col_mmap, _ = _concat_partitions(table_info, col_idx, 32)
+    return np.frombuffer(col_mmap, dtype=np.uint64, count=table_info.row_count * 4).reshape((-1, 4))
+
+
+def long256_hex(longs: np.ndarray) -> np.ndarray:
+    # str array of '0x' and the hex digits without leading zeros, '' for nulls
+    longs = np.asarray(longs, dtype=np.uint64).reshape((-1, 4))
+    digits = _HEX_PAIRS[longs[:, ::-1].astype('>u8').view(np.uint8)].view(np.uint8)
+    # rows are shifted left past their leading zeros, keeping the last digit, in groups
+    # of equal shift
+    significant = digits != ord('0')
+    leading = np.where(significant.any(axis=1), np.argmax(significant, axis=1), 63)
+    chars = np.zeros((len(longs), 66), dtype=np.uint8)
+    chars[:, :2] = (ord('0'), ord('x'))
+    for shift in np.unique(leading).tolist():
+        rows = leading == shift
+        chars[rows, 2:66 - shift] = digits[rows, shift:]
+    chars[(longs == LONG256_NULL).all(axis=1)] = 0
+    return chars.astype(np.uint32).view('U66').ravel()
+
+
+# the two hex digits of each byte value, as little-endian uint16 so the first digit comes first
+_HEX_PAIRS = np.frombuffer(b''.join(f'{value:02x}'.encode() for value in range(256)), dtype='<u2')
+
+
+class BinaryColumn:
+    # rows of a BINARY column as memoryviews over the mapped partition files, None for
+    # nulls; nothing is read until a row is asked for
+    def __init__(self, partitions: typing.List[typing.Tuple[mmap.mmap, np.ndarray]]):
+        self._data = [memoryview(data) for data, _ in partitions]
+        self._raw = [np.frombuffer(data, dtype=np.uint8) for data, _ in partitions]
+        self._offsets = [offsets for _, offsets in partitions]
+        self._starts = np.cumsum([0] + [len(offsets) for offsets in self._offsets])
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def __getitem__(self, row: int) -> typing.Optional[memoryview]:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(f'row {row} out of range')
+        p_idx = int(np.searchsorted(self._starts, row, side='right')) - 1
+        offset = int(self._offsets[p_idx][row - self._starts[p_idx]])
+        data = self._data[p_idx]
+        length = int.from_bytes(data[offset:offset + 8], byteorder=sys.byteorder, signed=True)
+        return data[offset + 8:offset + 8 + length] if length != STRING_NULL_LENGTH else None
+
+    def __iter__(self) -> typing.Iterator[typing.Optional[memoryview]]:
+        for data, offsets, lengths in zip(self._data, self._offsets, self._partition_lengths()):
+            for offset, length in zip(offsets.tolist(), lengths.tolist()):
+                yield data[offset + 8:offset + 8 + length] if length != STRING_NULL_LENGTH else None
+
+    @property
+    def lengths(self) -> np.ndarray:
+        # byte length of each row, -1 for nulls
+        return np.concatenate([np.zeros(0, dtype=np.int64)] + self._partition_lengths())
+
+    def to_numpy(self) -> np.ndarray:
+        values = np.empty(len(self), dtype=object)
+        values[:] = list(self)
+        return values
+
+    def _partition_lengths(self) -> typing.List[np.ndarray]:
+        return [raw[offsets[:, None] + np.arange(8)].view(np.int64).ravel()
+                for raw, offsets in zip(self._raw, self._offsets)]
+
+
+def read_binary(table_info: TableInfo, col_idx: int) -> BinaryColumn:
+    col_name = table_info.column_name(col_idx)
+    partitions = []
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        if p_row_count:
+            offsets = np.frombuffer(map_file(p_folder / f'{col_name}.i', p_row_count * 8), dtype=np.int64)
+            partitions.append((map_file(p_folder / f'{col_name}.d'), offsets))
+    return BinaryColumn(partitions)
+
+
+def read_long256_hex(table_info: TableInfo, col_idx: int) -> np.ndarray:
+    return long256_hex(read_long256(table_info, col_idx))
+
+
+def read_binary_values(table_info: TableInfo, col_idx: int) -> np.ndarray:
+    return read_binary(table_info, col_idx).to_numpy()
+
+
+def _take_fixed(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> np.ndarray:
+    return _take_partition_values(table_info, col_idx, table_info.column_type(col_idx).dtype, partition_rows)
+
+
+def _take_symbol(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> pd.Categorical:
+    keys = _take_partition_values(table_info, col_idx, np.dtype(np.int32), partition_rows)
+    categories = pd.Index(read_symbol_table(table_info, col_idx), dtype=object)
+    return pd.Categorical.from_codes(np.where(keys == INT_NULL, -1, keys), categories=categories)
+
+
+def _take_long256_hex(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> np.ndarray:
+    return long256_hex(_take_partition_values(table_info, col_idx, np.dtype((np.uint64, 4)), partition_rows))
+
+
+def _take_partition_values(table_info: TableInfo,
+                           col_idx: int,
+                           dtype: np.dtype,
+                           partition_rows: PartitionRows) -> np.ndarray:
+    # fixed width values gathered from each partition's .d
+    values = np.empty(sum(len(p_rows) for _, _, p_rows in partition_rows), dtype=dtype)
+    col_name = table_info.column_name(col_idx)
+    filled = 0
+    for p_id, _, p_rows in partition_rows:
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        p_values = np.frombuffer(map_file(p_folder / f'{col_name}.d', p_row_count * dtype.itemsize), dtype=dtype)
+        values[filled:filled + len(p_rows)] = p_values[p_rows]
+        filled += len(p_rows)
+    return values
+
+
+def _take_string(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> np.ndarray:
+    # only the selected rows are decoded, located through the .i offsets
+    values = np.empty(sum(len(p_rows) for _, _, p_rows in partition_rows), dtype=object)
+    filled = 0
+    for data, offsets in _var_partitions(table_info, col_idx, partition_rows):
+        values[filled:filled + len(offsets)] = _decode_strings(data, offsets)
+        filled += len(offsets)
+    return values
+
+
+def _take_binary(table_info: TableInfo, col_idx: int, partition_rows: PartitionRows) -> np.ndarray:
+    return BinaryColumn(list(_var_partitions(table_info, col_idx, partition_rows))).to_numpy()
+
+
+def _var_partitions(table_info: TableInfo,
+                    col_idx: int,
+                    partition_rows: PartitionRows) -> typing.Iterator[typing.Tuple[mmap.mmap, np.ndarray]]:
+    # each partition's mapped .d and the .i offsets of the selected rows
+    col_name = table_info.column_name(col_idx)
+    for p_id, _, p_rows in partition_rows:
+        if len(p_rows):
+            p_folder, p_row_count = table_info.partition_info(p_id)
+            offsets = np.frombuffer(map_file(p_folder / f'{col_name}.i', p_row_count * 8), dtype=np.int64)
+            yield map_file(p_folder / f'{col_name}.d'), offsets[p_rows]
+
+
+def _decode_strings(data: mmap.mmap, offsets: np.ndarray) -> typing.List[typing.Optional[str]]:
+    # entries are an int32 char count, -1 for null, then UTF-16 chars
+    lengths = string_lengths(data, offsets)
+    view = memoryview(data)
+    return [str(view[offset + 4:offset + 4 + length * 2], 'utf-16-le') if length != STRING_NULL_LENGTH else None
+            for offset, length in zip(offsets.tolist(), lengths.tolist())]
+
+
+def string_lengths(data: mmap.mmap, offsets: np.ndarray) -> np.ndarray:
+    raw = np.frombuffer(data, dtype=np.uint8)
+    return raw[offsets[:, None] + np.arange(4)].view(np.int32).ravel()
+
+
+def _concat_partitions(table_info: TableInfo,
+                       col_idx: int,
+                       storage_size: int) -> typing.Tuple[mmap.mmap, typing.Optional[str]]:
+    col_name = table_info.column_name(col_idx)
+    col_mmap = mmap.mmap(
+        NOT_STORED_ANONYMOUS_MEMORY,
+        length=max(table_info.row_count * storage_size, 1),
+        flags=mmap.MAP_SHARED,
+        access=mmap.ACCESS_WRITE,
+        offset=0)
+    col_file = None
+    wr_offset = 0
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        col_file = str(p_folder / f'{col_name}.d')
+        p_storage_size = p_row_count * storage_size
+        if p_storage_size:
+            write_end = wr_offset + p_storage_size
+            col_mmap[wr_offset:write_end] = map_file(Path(col_file), p_storage_size)
+            wr_offset = write_end
+    return col_mmap, col_file
+
+
+for _col_type in (ColumnTypes.BOOLEAN, ColumnTypes.BYTE, ColumnTypes.SHORT, ColumnTypes.CHAR,
+                  ColumnTypes.INT, ColumnTypes.LONG, ColumnTypes.DATE, ColumnTypes.TIMESTAMP,
+                  ColumnTypes.FLOAT, ColumnTypes.DOUBLE, ColumnTypes.GEOBYTE, ColumnTypes.GEOSHORT,
+                  ColumnTypes.GEOINT, ColumnTypes.GEOLONG):
+    register_codec(_col_type, read_fixed)
+register_codec(ColumnTypes.STRING, read_string)
+register_codec(ColumnTypes.SYMBOL, read_symbol)
+register_codec(ColumnTypes.LONG256, read_long256_hex)
+register_codec(ColumnTypes.BINARY, read_binary_values)
+
+# take_rows readers of the built-in codecs
+_ROW_READERS: typing.Dict[ColumnCodec, typing.Callable[[TableInfo, int, PartitionRows], typing.Any]] = {
+    read_fixed: _take_fixed,
+    read_string: _take_string,
+    read_symbol: _take_symbol,
+    read_long256_hex: _take_long256_hex,
+    read_binary_values: _take_binary
+}
@@ -99,11 +99,13 @@ class Metadata:
         self.commit_lag = None
         self.column_names = []
         self.column_types = []
+        self.column_type_ids = []
         self.reload()
 
     def reload(self):
         self.column_names.clear()
         self.column_types.clear()
+        self.column_type_ids.clear()
         if table_root_path := _table_data_root(self.table_name):
             self.meta_path = table_root_path / '_meta'
             with open(self.meta_path, mode='rb') as meta_file:
@@ -119,9 +121,11 @@ class Metadata:
                 name_offset = 128 + self.column_count * 16
                 for i in range(self.column_count):
                     type_offset = 128 + i * 16
+                    # as stored, geohash ids carry their bit count in the second byte
+                    self.column_type_ids.append(_read_int32(meta_file, offset=type_offset))
                     self.column_types.append(
                         TypeMetadata(
-                            type_id=_read_int32(meta_file, offset=type_offset),
+                            type_id=self.column_type_ids[-1],
                             type_flags=_read_int64(meta_file, offset=type_offset + 4),
                             type_idx_block_size=_read_int32(meta_file, offset=type_offset + 4 + 8)))
                     name_len = _read_int32(meta_file, name_offset)
@@ -183,6 +187,7 @@ class Transaction:
         self.partition_table_version = None
         self.txn_check = None
         self.symbols_count = None
+        self.symbol_value_counts = []
         self.partitions_count = None
         self.partition_table_size = None
         self.partitions = []
@@ -203,6 +208,9 @@ class Transaction:
                 self.partition_table_version = _read_int64(txn_file, offset=56)
                 self.txn_check = _read_int64(txn_file, offset=64)
                 self.symbols_count = _read_int32(txn_file, offset=72)
+                # committed symbol table size of each SYMBOL column, in column order
+                self.symbol_value_counts = [
+                    _read_int32(txn_file, offset=76 + symbol_idx * 8) for symbol_idx in range(self.symbols_count)]
                 partition_table_offset = 72 + 4 + self.symbols_count * 8
                 self.partition_table_size = int(_read_int32(txn_file, offset=partition_table_offset) / 8)
                 self.partitions_count = int(self.partition_table_size / 4)
@@ -314,6 +322,17 @@ class TableInfo:
         return self.transaction.root_path / folder_name
 
 
+def read_txn_id(table_name: str) -> typing.Optional[int]:
+    # committed txn id of a local table, without parsing the rest of _txn; None when not local
+    if table_root_path := _table_data_root(table_name):
+        try:
+            with open(table_root_path / '_txn', mode='rb') as txn_file:
+                return _read_int64(txn_file, offset=0)
+        except FileNotFoundError:
+            return None
+    return None
+
+
 def _table_data_root(table_name: str) -> Path:
     if QDB_DB_DATA.exists():
         candidate = QDB_DB_DATA / str(table_name)
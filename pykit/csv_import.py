@@ -0,0 +1,224 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import concurrent.futures
+import io
+import os
+import re
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pykit.ilp import (
+    ILP_HOST,
+    ILP_PORT,
+    TcpSender,
+    create_bulk_message
+)
+from pykit.types import (
+    ColumnTypes,
+    ColumnType
+)
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 ** 2
+
+# rows sampled from the head of the file to infer column types
+INFER_SAMPLE_ROWS = 10_000
+
+# object columns with at most this ratio of distinct values are inferred as SYMBOL
+SYMBOL_MAX_DISTINCT_RATIO = 0.1
+
+_INTEGER_TYPES = ('BYTE', 'SHORT', 'INT', 'LONG')
+_FLOAT_TYPES = ('FLOAT', 'DOUBLE')
+_TIMESTAMP_TYPES = ('TIMESTAMP', 'DATE')
+_STRING_TYPES = ('STRING', 'CHAR')
+_ISO_DATE_PREFIX = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+def import_csv(csv_path: typing.Union[str, Path],
+               table_name: str,
+               column_types: typing.Dict[str, ColumnType] = None,
+               timestamp: str = None,
+               timestamp_format: str = None,
+               delimiter: str = ',',
+               host: str = ILP_HOST,
+               port: int = ILP_PORT,
+               chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+               workers: int = None) -> int:
+    # Streams a CSV file with a header line into table_name over one persistent ILP connection.
+    # The file is split into byte ranges on line boundaries, which a process pool parses and
+    # serializes to ILP in parallel, so quoted values must not contain line breaks. Types not
+    # given in column_types are inferred from the head of the file. Returns the rows sent.
+    csv_path = Path(csv_path)
+    with open(csv_path, 'rb') as csv_file:
+        header_end = len(csv_file.readline())
+    sample = pd.read_csv(csv_path, sep=delimiter, nrows=INFER_SAMPLE_ROWS)
+    names = list(sample.columns)
+    type_names = {name: col_type.type_name for name, col_type in
+                  infer_column_types(sample, timestamp, timestamp_format).items()}
+    if column_types:
+        type_names.update({name: col_type.type_name for name, col_type in column_types.items()})
+    if timestamp is not None and timestamp not in names:
+        raise ValueError(f'timestamp column not found: {timestamp}')
+    convert_args = (csv_path, names, type_names, table_name, timestamp, timestamp_format, delimiter)
+    chunks = _chunk_ranges(csv_path, header_end, chunk_bytes)
+    total_rows = 0
+    with TcpSender(host=host, port=port) as sender:
+        def send(payload: bytes, row_count: int):
+            nonlocal total_rows
+            if not sender.send_bytes(payload):
+                raise ConnectionError(f'failed to send rows {total_rows}-{total_rows + row_count} '
+                                      f'to {host}:{port}')
+            total_rows += row_count
+
+        workers = workers if workers is not None else os.cpu_count()
+        if workers < 2:
+            for offset, length in chunks:
+                send(*_chunk_to_ilp(offset, length, *convert_args))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                max_pending = 2 * workers
+                pending = []
+                for offset, length in chunks:
+                    pending.append(executor.submit(_chunk_to_ilp, offset, length, *convert_args))
+                    if len(pending) >= max_pending:
+                        send(*pending.pop(0).result())
+                for future in pending:
+                    send(*future.result())
+    return total_rows
+
+
+def infer_column_types(df: pd.DataFrame,
+                       timestamp: str = None,
+                       timestamp_format: str = None) -> typing.Dict[str, ColumnType]:
+    column_types = {}
+    for name in df.columns:
+        series = df[name]
+        kind = series.dtype.kind
+        if kind == 'b':
+            column_types[name] = ColumnTypes.BOOLEAN
+        elif kind in ('i', 'u'):
+            column_types[name] = ColumnTypes.TIMESTAMP if name == timestamp else ColumnTypes.LONG
+        elif kind == 'f':
+            column_types[name] = ColumnTypes.DOUBLE
+        elif kind == 'M' or name == timestamp or _looks_like_timestamp(series, timestamp_format):
+            column_types[name] = ColumnTypes.TIMESTAMP
+        elif series.nunique() <= max(1, int(len(series) * SYMBOL_MAX_DISTINCT_RATIO)):
+            column_types[name] = ColumnTypes.SYMBOL
+        else:
+            column_types[name] = ColumnTypes.STRING
+    return column_types
+
+
+def frame_to_ilp(df: pd.DataFrame,
+                 table_name: str,
+                 type_names: typing.Dict[str, str],
+                 timestamp: str = None,
+                 timestamp_format: str = None) -> bytes:
+    symbols = {}
+    fields = {}
+    ts = None
+    for name in df.columns:
+        series = df[name]
+        type_name = type_names[name]
+        if type_name == 'SYMBOL':
+            symbols[name] = series.to_numpy(dtype=object)
+        elif type_name in _STRING_TYPES:
+            fields[name] = series.to_numpy(dtype=object)
+        elif type_name == 'BOOLEAN':
+            fields[name] = _to_boolean(series)
+        elif type_name in _INTEGER_TYPES:
+            series = pd.to_numeric(series, errors='coerce')
+            null_mask = series.isna().to_numpy()
+            fields[name] = np.ma.masked_array(series.fillna(0).to_numpy(dtype=np.int64), null_mask)
+        elif type_name in _FLOAT_TYPES:
+            fields[name] = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+        elif type_name in _TIMESTAMP_TYPES:
+            micros = _to_datetime64(series, timestamp_format)
+            if name == timestamp:
+                ts = micros
+            else:
+                fields[name] = micros
+        else:
+            raise ValueError(f'unsupported column type for ILP [{name}]: {type_name}')
+    return create_bulk_message(table_name, symbols=symbols, fields=fields, ts=ts)
+
+
+def _chunk_ranges(csv_path: Path, start: int, chunk_bytes: int) -> typing.Iterator[typing.Tuple[int, int]]:
+    file_size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as csv_file:
+        offset = start
+        while offset < file_size:
+            end = offset + chunk_bytes
+            if end < file_size:
+                csv_file.seek(end)
+                csv_file.readline()
+                end = csv_file.tell()
+            else:
+                end = file_size
+            yield offset, end - offset
+            offset = end
+
+
+def _chunk_to_ilp(offset: int,
+                  length: int,
+                  csv_path: Path,
+                  names: typing.List[str],
+                  type_names: typing.Dict[str, str],
+                  table_name: str,
+                  timestamp: str,
+                  timestamp_format: str,
+                  delimiter: str) -> typing.Tuple[bytes, int]:
+    with open(csv_path, 'rb') as csv_file:
+        csv_file.seek(offset)
+        data = csv_file.read(length)
+    dtypes = {name: object for name, type_name in type_names.items()
+              if type_name not in _INTEGER_TYPES and type_name not in _FLOAT_TYPES}
+    df = pd.read_csv(io.BytesIO(data), sep=delimiter, header=None, names=names, dtype=dtypes)
+    # rows without any non-null field are left out (see create_bulk_message), and values
+    # hold no line breaks (see import_csv), so each line is a row sent
+    lines = frame_to_ilp(df, table_name, type_names, timestamp, timestamp_format)
+    return lines, lines.count(b'\n')
+
+
+def _to_datetime64(series: pd.Series, timestamp_format: str = None) -> np.ndarray:
+    if series.dtype.kind in ('i', 'u'):
+        return series.to_numpy(dtype=np.int64).astype('datetime64[us]')
+    values = pd.to_datetime(series, format=timestamp_format, utc=True, errors='coerce')
+    return values.dt.tz_localize(None).to_numpy(dtype='datetime64[us]')
+
+
+def _to_boolean(series: pd.Series) -> np.ndarray:
+    if series.dtype.kind == 'b':
+        return series.to_numpy()
+    values = series.astype(str).str.lower()
+    return np.ma.masked_array(values.isin(('true', 't', '1')).to_numpy(), series.isna().to_numpy())
+
+
+def _looks_like_timestamp(series: pd.Series, timestamp_format: str = None) -> bool:
+    values = series.dropna()
+    if values.empty or not _ISO_DATE_PREFIX.match(str(values.iloc[0])):
+        return False
+    return pd.to_datetime(values, format=timestamp_format, utc=True, errors='coerce').notna().all()
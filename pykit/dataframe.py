@@ -21,15 +21,25 @@
 #  limitations under the License.
 #
 
-import mmap
 import typing
+import numpy as np
 import pandas as pd
 from pandas.core.internals import (BlockManager, make_block)
 from pandas.core.indexes.base import Index
-from pykit.core import TableInfo
-from pykit.types import NPArray
-
-NOT_STORED_ANONYMOUS_MEMORY = -1
+from pykit.core import (
+    TableInfo,
+    _table_data_root
+)
+from pykit.columns import (
+    read_column,
+    take_rows,
+    column_idx,
+    partition_in_range,
+    partition_row_range,
+    PartitionRows
+)
+from pykit.pgwire import query_df
+from pykit.types import ColumnTypes
 
 
 def df_from_table(table_name: str,
@@ -41,32 +51,7 @@ def df_from_table(table_name: str,
     for col_idx in range(table_info.column_count):
         col_name = table_info.column_name(col_idx)
         if _validate_column(col_name, *columns):
-            type_storage_size = table_info.column_type(col_idx).type_storage_size
-            col_mmap = mmap.mmap(
-                NOT_STORED_ANONYMOUS_MEMORY,
-                length=table_info.row_count * type_storage_size,
-                flags=mmap.MAP_SHARED,
-                access=mmap.ACCESS_WRITE,
-                offset=0)
-            wr_offset = 0
-            for p_id in range(table_info.partitions_count):
-                p_folder, p_row_count = table_info.partition_info(p_id)
-                with open(p_folder / f'{col_name}.d', 'rb') as p_file:
-                    p_storage_size = p_row_count * type_storage_size
-                    p_mmap = mmap.mmap(
-                        p_file.fileno(),
-                        length=p_storage_size,
-                        flags=mmap.MAP_SHARED,
-                        access=mmap.ACCESS_READ,
-                        offset=0)
-                    write_end = wr_offset + p_storage_size
-                    col_mmap[wr_offset:write_end] = p_mmap
-                    wr_offset = write_end
-            col_np_array = NPArray(
-                col_file=p_file.name,
-                row_count=table_info.row_count,
-                col_type=table_info.column_type(col_idx),
-                col_mmap=col_mmap)
+            col_np_array = read_column(table_info, col_idx)
             if table_info.ts_idx == col_idx and usr_index is None:
                 index = Index(
                     data=col_np_array,
@@ -86,8 +71,9 @@ def df_from_table(table_name: str,
         else:
             index = usr_index
     df_blocks = tuple(make_block(
-        values=column.reshape((1, len(column))),
-        placement=(position,)
+        values=column.reshape((1, len(column))) if isinstance(column, np.ndarray) else column,
+        placement=(position,),
+        ndim=2
     ) for position, column in enumerate(df_column_np_arrays))
     return pd.DataFrame(
         data=BlockManagerUnconsolidated(
@@ -97,6 +83,116 @@ def df_from_table(table_name: str,
         copy=False)
 
 
+def df_from_partition_rows(table_info: TableInfo,
+                           columns: typing.Optional[typing.Sequence[str]],
+                           partition_rows: PartitionRows) -> pd.DataFrame:
+    # columns at the given rows only, see take_rows, indexed by the designated timestamp
+    col_names = [table_info.column_name(col_idx) for col_idx in range(table_info.column_count)]
+    ts_name = col_names[table_info.ts_idx] if table_info.ts_idx is not None else None
+    data = {}
+    for col_name in list(columns or [col_name for col_name in col_names if col_name != ts_name]) + [ts_name]:
+        if col_name and col_name not in data:
+            data[col_name] = take_rows(table_info, column_idx(table_info, col_name), partition_rows)
+    index_values = data.pop(ts_name) if ts_name else None
+    row_count = sum(len(p_rows) for _, _, p_rows in partition_rows)
+    if index_values is None:
+        index = pd.RangeIndex(name='Idx', start=0, stop=row_count, step=1)
+    else:
+        index = pd.Index(index_values, name=ts_name)
+    return pd.DataFrame(data, index=index)
+
+
+def read_table(table_name: str,
+               columns: typing.Sequence[str] = None,
+               ts_from: int = None,
+               ts_to: int = None,
+               binary: bool = False) -> pd.DataFrame:
+    # Rows of table_name with designated timestamp in [ts_from, ts_to), epoch micros. Tables
+    # found under QDB_DB_DATA are read from the partitions holding the range, others queried
+    # over pgwire; either way the designated timestamp is the index, SYMBOL columns are
+    # categorical and the columns come in the requested order.
+    columns = [col[0] if isinstance(col, tuple) else col for col in columns] if columns else None
+    if _table_data_root(table_name):
+        return _read_local_table(table_name, columns, ts_from, ts_to)
+    return _read_remote_table(table_name, columns, ts_from, ts_to, binary)
+
+
+def _read_local_table(table_name: str,
+                      columns: typing.List[str],
+                      ts_from: int,
+                      ts_to: int) -> pd.DataFrame:
+    table_info = TableInfo(table_name)
+    ts_name = table_info.column_name(table_info.ts_idx) if table_info.ts_idx is not None else None
+    _check_ts_range(table_name, ts_name, ts_from, ts_to)
+    if columns is None:
+        columns = [table_info.column_name(col_idx) for col_idx in range(table_info.column_count)]
+    columns = [col_name for col_name in columns if col_name != ts_name]
+    if ts_from is not None or ts_to is not None:
+        return df_from_partition_rows(table_info, columns, _range_rows(table_info, ts_from, ts_to))
+    df = df_from_table(table_name, tuple((col_name, '') for col_name in columns + [ts_name] if col_name))
+    if list(df.columns) != columns:
+        df = df[columns]
+    return df
+
+
+def _range_rows(table_info: TableInfo, ts_from: int, ts_to: int) -> PartitionRows:
+    # partitions outside [ts_from, ts_to) are skipped and only the first and last of those
+    # left are searched for the range, all rows of the others are in it
+    in_range = []
+    first_row = 0
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        if p_row_count and partition_in_range(table_info, p_id, ts_from, ts_to):
+            in_range.append((p_id, first_row, p_folder, p_row_count))
+        first_row += p_row_count
+    partition_rows = []
+    for position, (p_id, first_row, p_folder, p_row_count) in enumerate(in_range):
+        if position in (0, len(in_range) - 1):
+            lo, hi = partition_row_range(table_info, p_folder, p_row_count, ts_from, ts_to)
+        else:
+            lo, hi = 0, p_row_count
+        partition_rows.append((p_id, first_row, np.arange(lo, hi, dtype=np.int64)))
+    return partition_rows
+
+
+def _read_remote_table(table_name: str,
+                       columns: typing.List[str],
+                       ts_from: int,
+                       ts_to: int,
+                       binary: bool) -> pd.DataFrame:
+    table_columns = query_df('SELECT "column", type, designated FROM table_columns(%s)', (table_name,))
+    designated = table_columns['column'][table_columns['designated'].astype(bool)]
+    ts_name = designated.iloc[0] if len(designated) else None
+    _check_ts_range(table_name, ts_name, ts_from, ts_to)
+    if columns is None:
+        sql = f'SELECT * FROM {table_name}'
+    else:
+        select_columns = columns + [ts_name] if ts_name and ts_name not in columns else columns
+        sql = f'SELECT {", ".join(select_columns)} FROM {table_name}'
+    conditions = []
+    if ts_from is not None:
+        conditions.append(f'{ts_name} >= {ts_from}')
+    if ts_to is not None:
+        conditions.append(f'{ts_name} < {ts_to}')
+    if conditions:
+        sql += f' WHERE {" AND ".join(conditions)}'
+    df = query_df(sql, binary=binary)
+    # SYMBOL values come as strings, categorical as read locally
+    symbols = set(table_columns['column'][table_columns['type'] == ColumnTypes.SYMBOL.type_name])
+    for col_name in df.columns:
+        if col_name in symbols:
+            df[col_name] = df[col_name].astype('category')
+    if ts_name:
+        return df.set_index(ts_name)
+    df.index = pd.RangeIndex(name='Idx', start=0, stop=len(df), step=1)
+    return df
+
+
+def _check_ts_range(table_name: str, ts_name: str, ts_from: int, ts_to: int) -> None:
+    if ts_name is None and (ts_from is not None or ts_to is not None):
+        raise ValueError(f'table [{table_name}] has no designated timestamp to select a time range on')
+
+
 class BlockManagerUnconsolidated(BlockManager):
     def __init__(self, *args, **kwargs):
         BlockManager.__init__(self, *args, **kwargs)
@@ -0,0 +1,127 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import typing
+
+import numpy as np
+
+from pykit.core import TableInfo
+from pykit.columns import read_fixed
+from pykit.types import ColumnTypes
+
+GEOHASH_CHARS = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_NULL = -1
+MAX_GEOHASH_BITS = 60
+
+_GEOHASH_TYPES = (ColumnTypes.GEOBYTE, ColumnTypes.GEOSHORT, ColumnTypes.GEOINT, ColumnTypes.GEOLONG)
+
+
+class GeoBox(typing.NamedTuple):
+    lat_min: np.ndarray
+    lat_max: np.ndarray
+    lon_min: np.ndarray
+    lon_max: np.ndarray
+
+
+def geohash_bits(table_info: TableInfo, col_idx: int) -> int:
+    if table_info.column_type(col_idx) not in _GEOHASH_TYPES:
+        raise ValueError(f'column [{table_info.column_name(col_idx)}] is not a geohash')
+    return table_info.metadata.column_type_ids[col_idx] >> 8 & 0xFF
+
+
+def read_geohash(table_info: TableInfo, col_idx: int) -> typing.Tuple[np.ndarray, int]:
+    return read_fixed(table_info, col_idx), geohash_bits(table_info, col_idx)
+
+
+def parse_geohash(geohash: str) -> typing.Tuple[int, int]:
+    # value and bit count of a base32 geohash, e.g. a prefix to filter by
+    value = 0
+    for char in geohash.lower():
+        char_value = GEOHASH_CHARS.find(char)
+        if char_value < 0:
+            raise ValueError(f'invalid geohash: {geohash}')
+        value = value << 5 | char_value
+    if len(geohash) * 5 > MAX_GEOHASH_BITS:
+        raise ValueError(f'geohash longer than {MAX_GEOHASH_BITS // 5} chars: {geohash}')
+    return value, len(geohash) * 5
+
+
+def geohash_boxes(values: np.ndarray, bits: int) -> GeoBox:
+    # cell bounds of each geohash, NaN for nulls
+    lat_idx, lon_idx, nulls = _cell_indexes(values, bits)
+    lat_size = 180.0 / (1 << bits // 2)
+    lon_size = 360.0 / (1 << (bits + 1) // 2)
+    lat_min = np.where(nulls, np.nan, lat_idx * lat_size - 90.0)
+    lon_min = np.where(nulls, np.nan, lon_idx * lon_size - 180.0)
+    return GeoBox(lat_min, lat_min + lat_size, lon_min, lon_min + lon_size)
+
+
+def geohash_centres(values: np.ndarray, bits: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    box = geohash_boxes(values, bits)
+    return (box.lat_min + box.lat_max) / 2, (box.lon_min + box.lon_max) / 2
+
+
+def geohash_prefix_mask(values: np.ndarray, bits: int, prefix: str) -> np.ndarray:
+    # rows whose geohash starts with prefix, one shift and compare
+    prefix_value, prefix_bits = parse_geohash(prefix)
+    if prefix_bits > bits:
+        raise ValueError(f'prefix [{prefix}] is longer than the column\'s {bits} bits')
+    values = np.asarray(values)
+    return (values != GEOHASH_NULL) & (values >> (bits - prefix_bits) == prefix_value)
+
+
+def geohash_box_mask(values: np.ndarray, bits: int,
+                     lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+    # rows whose cell intersects the box, compared as integer cell index ranges
+    lat_idx, lon_idx, nulls = _cell_indexes(values, bits)
+    lat_lo, lat_hi = _cell_range(lat_min, lat_max, -90.0, 180.0, bits // 2)
+    lon_lo, lon_hi = _cell_range(lon_min, lon_max, -180.0, 360.0, (bits + 1) // 2)
+    return ~nulls & (lat_idx >= lat_lo) & (lat_idx <= lat_hi) & (lon_idx >= lon_lo) & (lon_idx <= lon_hi)
+
+
+def _cell_indexes(values: np.ndarray, bits: int) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # latitude and longitude cell indexes of the interleaved geohash bits, longitude
+    # takes the most significant bit
+    if not 0 < bits <= MAX_GEOHASH_BITS:
+        raise ValueError(f'geohash bits out of range: {bits}')
+    values = np.asarray(values)
+    nulls = values == GEOHASH_NULL
+    interleaved = values.astype(np.int64).view(np.uint64) & np.uint64((1 << bits) - 1)
+    even, odd = _compact_bits(interleaved), _compact_bits(interleaved >> np.uint64(1))
+    return (odd, even, nulls) if bits % 2 else (even, odd, nulls)
+
+
+def _compact_bits(value: np.ndarray) -> np.ndarray:
+    # gathers the even bits into the low half
+    value = value & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+        value = (value | value >> np.uint64(shift)) & np.uint64(mask)
+    return value.astype(np.int64)
+
+
+def _cell_range(low: float, high: float, origin: float, extent: float, bits: int) -> typing.Tuple[int, int]:
+    cells = 1 << bits
+    first = int(np.clip(np.floor((low - origin) / extent * cells), 0, cells - 1))
+    last = int(np.clip(np.floor((high - origin) / extent * cells), 0, cells - 1))
+    return first, last
@@ -21,8 +21,42 @@
 #  limitations under the License.
 #
 
+import ctypes
+import ctypes.util
+import os
 import socket
+import time
 import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pykit.internal import is_linux
+from pykit.spool import (
+    Spool,
+    SpoolFullError,
+    DEFAULT_SPOOL_CAPACITY,
+    DEFAULT_REPLAY_CHUNK_SIZE
+)
+
+ILP_HOST = '127.0.0.1'
+ILP_PORT = 9009
+
+# Multicast group QuestDB joins to receive ILP over UDP (line.udp.join)
+ILP_UDP_GROUP = '232.1.2.3'
+
+# Ethernet MTU (1500) - IPv4 header (20) - UDP header (8)
+UDP_DATAGRAM_SIZE = 1472
+
+# Jumbo frame MTU (9000) - IPv4 header (20) - UDP header (8)
+UDP_JUMBO_DATAGRAM_SIZE = 8972
+
+# QuestDB's LONG/TIMESTAMP null
+LONG_NULL = np.iinfo(np.int64).min
+
+# Linux caps the number of messages per sendmmsg call (UIO_MAXIOV)
+SENDMMSG_MAX_BATCH = 1024
 
 
 def create_message(table_name: str,
@@ -52,8 +86,57 @@ def create_message(table_name: str,
     return ''.join(message)
 
 
-def send_tcp_messages(*messages: typing.List[str]) -> bool:
-    host, port = '127.0.0.1', 9009
+SymbolColumn = typing.Union[np.ndarray, typing.Tuple[np.ndarray, typing.Sequence[typing.Any]]]
+
+
+def create_bulk_message(table_name: str,
+                        symbols: typing.Dict[str, SymbolColumn] = None,
+                        fields: typing.Dict[str, np.ndarray] = None,
+                        ts: np.ndarray = None) -> bytes:
+    # Column-wise create_message, every argument holds one value per row and the result one
+    # line per row. A symbol column is either its values or a (codes, dictionary) pair, code
+    # -1 being null. Nulls (None, NaN, inf, NaT, masked) are left out of their line, and rows
+    # without a non-null field are skipped. Timestamps, both ts and datetime64 fields, are
+    # epoch micros as everywhere in pykit (ILP ts is in nanos).
+    fragments = []
+    for name, values in (symbols or {}).items():
+        if isinstance(values, tuple):
+            codes, dictionary = values
+        else:
+            codes, dictionary = pd.factorize(np.asarray(values, dtype=object))
+        fragments.append(_symbol_table(name, dictionary)[np.asarray(codes)])
+    return _bulk_lines(table_name, fragments, fields, ts)
+
+
+def _bulk_lines(table_name: str,
+                fragments: typing.List[np.ndarray],
+                fields: typing.Dict[str, np.ndarray] = None,
+                ts: np.ndarray = None) -> bytes:
+    # create_bulk_message once symbols are encoded, fragments holds one per row and symbol
+    fragments = list(fragments)
+    has_field = None
+    for name, values in (fields or {}).items():
+        text, quote, suffix, null_mask = _field_text(values)
+        name_bytes = _escape_name(name).encode('utf-8')
+        if has_field is None:
+            separator = b' ' + name_bytes + b'=' + quote
+        else:
+            separator = np.where(has_field, b',' + name_bytes + b'=' + quote, b' ' + name_bytes + b'=' + quote)
+        fragments.append(_null_as_empty(null_mask, separator))
+        fragments.append(_null_as_empty(null_mask, text))
+        if suffix:
+            fragments.append(_null_as_empty(null_mask, suffix))
+        has_field = ~null_mask if has_field is None else has_field | ~null_mask
+    if ts is not None:
+        micros, null_mask = _timestamp_micros(ts)
+        fragments.append(_null_as_empty(null_mask, b' '))
+        fragments.append(_null_as_empty(null_mask, (micros * 1000).astype('S')))
+    if has_field is None:
+        return b''
+    return _join_lines(_escape_measurement(table_name).encode('utf-8'), fragments, has_field)
+
+
+def send_tcp_messages(*messages: typing.List[str], host: str = ILP_HOST, port: int = ILP_PORT) -> bool:
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.connect((host, port))
@@ -66,14 +149,418 @@ def send_tcp_messages(*messages: typing.List[str]) -> bool:
         return False
 
 
-def send_udp_messages(*messages: typing.List[str]) -> bool:
-    host, port = '232.1.2.3', 9009
+class TcpSender:
+    # Keeps one connection open across sends. With a spool, rows that cannot be written
+    # because the server is down or too slow (send_timeout) go to disk instead, and are
+    # replayed in large sequential chunks, ahead of new rows, once a connection succeeds.
+
+    def __init__(self,
+                 host: str = ILP_HOST,
+                 port: int = ILP_PORT,
+                 spool_path: typing.Union[str, Path] = None,
+                 spool_capacity: int = DEFAULT_SPOOL_CAPACITY,
+                 send_timeout: float = None,
+                 connect_timeout: float = 5.0,
+                 retry_interval: float = 1.0,
+                 replay_chunk_size: int = DEFAULT_REPLAY_CHUNK_SIZE):
+        self.host = host
+        self.port = port
+        self.send_timeout = send_timeout
+        self.connect_timeout = connect_timeout
+        self.retry_interval = retry_interval
+        self.replay_chunk_size = replay_chunk_size
+        self.spool = Spool(spool_path, spool_capacity) if spool_path else None
+        self._sock = None
+        self._next_connect = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def send(self, *messages: typing.List[str]) -> bool:
+        return self.send_bytes(''.join(messages).encode('utf-8'))
+
+    def send_bytes(self, payload: bytes) -> bool:
+        # True when the payload reached the socket, False when it was spooled or lost
+        if self.spool is not None and self.spool.pending:
+            if len(payload) > self.spool.free:
+                # make room before giving up on the new rows
+                self._replay()
+            if self.spool.pending:
+                return self._spool(payload) and self._replay()
+        if self._connect():
+            written = self._write(payload)
+            if written == len(payload):
+                return True
+            line_start = payload.rfind(b'\n', 0, written) + 1
+            payload = payload[line_start:]
+        if self.spool is None:
+            print(f'Failed to send tcp messages: {len(payload)} bytes lost')
+            return False
+        self._spool(payload)
+        return False
+
+    def flush(self) -> bool:
+        # replays whatever is spooled, True when nothing is left pending
+        if self.spool is None or not self.spool.pending:
+            return True
+        return self._replay()
+
+    def close(self) -> None:
+        self._disconnect()
+        if self.spool is not None:
+            self.spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _connect(self) -> bool:
+        if self._sock is not None:
+            return True
+        now = time.monotonic()
+        if now < self._next_connect:
+            return False
+        self._next_connect = now + self.retry_interval
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            self._sock.settimeout(self.send_timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return True
+        except OSError as err:
+            print(f'Failed to connect to {self.host}:{self.port}: {err}')
+            self._sock = None
+            return False
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def _write(self, payload: bytes) -> int:
+        # bytes written before the connection failed or timed out, a broken connection is
+        # dropped because the server discards the partial line it holds
+        view = memoryview(payload)
+        written = 0
+        try:
+            while written < len(view):
+                written += self._sock.send(view[written:])
+        except OSError as err:
+            print(f'Failed to send tcp messages: {err}')
+            self._disconnect()
+        return written
+
+    def _spool(self, payload: bytes) -> bool:
+        try:
+            self.spool.append(payload)
+            return True
+        except SpoolFullError as err:
+            print(f'Failed to spool tcp messages: {err}')
+            return False
+
+    def _replay(self) -> bool:
+        if self._connect():
+            self.spool.replay(self._write, self.replay_chunk_size)
+        return self.spool.pending == 0
+
+
+def send_columns(table_name: str,
+                 columns: typing.Union[np.ndarray, typing.Dict[str, typing.Any]],
+                 timestamp: str = None,
+                 sender: TcpSender = None,
+                 batch_rows: int = 100_000) -> bool:
+    # Sends NumPy columns without building a DataFrame: a dict of arrays, or a structured
+    # array whose fields are taken as zero-copy views. (codes, dictionary) pairs are symbols,
+    # timestamp names the designated timestamp column. Without a sender, one connection to
+    # ILP_HOST:ILP_PORT is opened for the call.
+    if isinstance(columns, np.ndarray):
+        if columns.dtype.names is None:
+            raise ValueError('a structured array is required')
+        columns = {name: columns[name] for name in columns.dtype.names}
+    symbols = {name: values for name, values in columns.items() if isinstance(values, tuple)}
+    fields = {name: values for name, values in columns.items()
+              if name != timestamp and not isinstance(values, tuple)}
+    ts = columns[timestamp] if timestamp is not None else None
+    if not columns:
+        return True
+    first_column = next(iter(columns.values()))
+    row_count = len(first_column[0] if isinstance(first_column, tuple) else first_column)
+    # each symbol dictionary is encoded once, batches only pick from it by code
+    symbol_tables = {name: (np.asarray(codes), _symbol_table(name, dictionary))
+                     for name, (codes, dictionary) in symbols.items()}
+    own_sender = sender is None
+    if own_sender:
+        sender = TcpSender()
+    try:
+        for start in range(0, row_count, batch_rows):
+            end = start + batch_rows
+            payload = _bulk_lines(
+                table_name,
+                [encoded[codes[start:end]] for codes, encoded in symbol_tables.values()],
+                fields={name: values[start:end] for name, values in fields.items()},
+                ts=ts[start:end] if ts is not None else None)
+            if not sender.send_bytes(payload):
+                return False
+        return True
+    finally:
+        if own_sender:
+            sender.close()
+
+
+def send_udp_messages(*messages: typing.List[str],
+                      group: str = ILP_UDP_GROUP,
+                      port: int = ILP_PORT,
+                      ttl: int = None,
+                      interface: str = None) -> bool:
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        with _udp_socket(ttl, interface) as sock:
             for message in messages:
-                sock.sendto(message.encode('utf-8'), (host, port))
+                sock.sendto(message.encode('utf-8'), (group, port))
                 print(f'Sent udp: {message}', end='')
             return True
     except Exception as err:
         print(f'Failed to send udp messages: {err}')
         return False
+
+
+def send_udp_batched(*messages: typing.List[str],
+                     datagram_size: int = UDP_DATAGRAM_SIZE,
+                     group: str = ILP_UDP_GROUP,
+                     port: int = ILP_PORT,
+                     ttl: int = None,
+                     interface: str = None) -> bool:
+    payload = bytearray(''.join(messages).encode('utf-8'))
+    datagrams = pack_datagrams(payload, datagram_size)
+    try:
+        with _udp_socket(ttl, interface) as sock:
+            sock.connect((group, port))
+            if _libc_sendmmsg is not None:
+                _sendmmsg(sock, payload, datagrams)
+            else:
+                view = memoryview(payload)
+                for offset, length in datagrams:
+                    sock.send(view[offset:offset + length])
+            print(f'Sent udp: {len(datagrams)} datagrams, {len(payload)} bytes')
+            return True
+    except Exception as err:
+        print(f'Failed to send udp messages: {err}')
+        return False
+
+
+def pack_datagrams(payload: bytes, datagram_size: int = UDP_DATAGRAM_SIZE) -> typing.List[typing.Tuple[int, int]]:
+    # greedily packs complete lines into (offset, length) ranges of at most datagram_size
+    # bytes, a line longer than datagram_size travels alone and is left to IP fragmentation
+    if datagram_size < 1:
+        raise ValueError(f'datagram_size must be positive: {datagram_size}')
+    datagrams = []
+    payload_len = len(payload)
+    start = 0
+    while start < payload_len:
+        end = start + datagram_size
+        if end >= payload_len:
+            end = payload_len
+        else:
+            line_end = payload.rfind(b'\n', start, end)
+            if line_end == -1:
+                line_end = payload.find(b'\n', end)
+                if line_end == -1:
+                    line_end = payload_len - 1
+            end = line_end + 1
+        datagrams.append((start, end - start))
+        start = end
+    return datagrams
+
+
+def _udp_socket(ttl: int = None, interface: str = None) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        if ttl is not None:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        if interface is not None:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t)
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IoVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int)
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint)
+    ]
+
+
+def _load_sendmmsg():
+    if not is_linux():
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int)
+    func.restype = ctypes.c_int
+    return func
+
+
+_libc_sendmmsg = _load_sendmmsg()
+
+
+def _sendmmsg(sock: socket.socket, payload: bytearray, datagrams: typing.List[typing.Tuple[int, int]]) -> None:
+    # the socket is connected, so msg_name stays NULL and every iovec points straight into payload
+    if not payload:
+        return
+    payload_buffer = (ctypes.c_char * len(payload)).from_buffer(payload)
+    base_address = ctypes.addressof(payload_buffer)
+    msg_size = ctypes.sizeof(_MMsgHdr)
+    for batch_start in range(0, len(datagrams), SENDMMSG_MAX_BATCH):
+        batch = datagrams[batch_start:batch_start + SENDMMSG_MAX_BATCH]
+        batch_len = len(batch)
+        iovecs = (_IoVec * batch_len)()
+        msgs = (_MMsgHdr * batch_len)()
+        for idx, (offset, length) in enumerate(batch):
+            iovecs[idx].iov_base = base_address + offset
+            iovecs[idx].iov_len = length
+            msgs[idx].msg_hdr.msg_iov = ctypes.pointer(iovecs[idx])
+            msgs[idx].msg_hdr.msg_iovlen = 1
+        sent = 0
+        while sent < batch_len:
+            msgs_ptr = ctypes.cast(ctypes.addressof(msgs) + sent * msg_size, ctypes.POINTER(_MMsgHdr))
+            result = _libc_sendmmsg(sock.fileno(), msgs_ptr, batch_len - sent, 0)
+            if result < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f'sendmmsg: {os.strerror(errno)}')
+            sent += result
+
+
+_MEASUREMENT_ESCAPES = str.maketrans({',': '\\,', ' ': '\\ ', '\n': '\\\n'})
+_NAME_ESCAPES = str.maketrans({',': '\\,', '=': '\\=', ' ': '\\ ', '\n': '\\\n'})
+
+
+def _escape_measurement(name: str) -> str:
+    return name.translate(_MEASUREMENT_ESCAPES)
+
+
+def _escape_name(name: str) -> str:
+    return name.translate(_NAME_ESCAPES)
+
+
+def _symbol_table(name: str, dictionary: typing.Sequence[typing.Any]) -> np.ndarray:
+    # each distinct value escaped and encoded once, rows pick theirs by code, -1 (the last
+    # entry) is null
+    prefix = b',' + _escape_name(name).encode('utf-8') + b'='
+    encoded = [prefix + _escape_name(_as_str(value)).encode('utf-8') for value in dictionary]
+    _check_no_trailing_nul(encoded)
+    encoded.append(b'')
+    return np.array(encoded, dtype=bytes)
+
+
+def _as_str(value: typing.Any) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+def _field_text(values: np.ndarray) -> typing.Tuple[np.ndarray, bytes, bytes, np.ndarray]:
+    # (text, opening quote, suffix, null mask) of a field column
+    if isinstance(values, np.ma.MaskedArray):
+        null_mask = np.ma.getmaskarray(values)
+        values = values.data
+    else:
+        values = np.asarray(values)
+        null_mask = np.zeros(len(values), dtype=bool)
+    kind = values.dtype.kind
+    if kind == 'b':
+        return np.where(values, b't', b'f'), b'', b'', null_mask
+    if kind in ('i', 'u'):
+        return values.astype('S'), b'', b'i', null_mask
+    if kind == 'f':
+        # inf is not a valid ILP float, non-finite values are nulls like NaN
+        return values.astype('S'), b'', b'', null_mask | ~np.isfinite(values)
+    if kind == 'M':
+        micros, ts_null_mask = _timestamp_micros(values)
+        return micros.astype('S'), b'', b't', null_mask | ts_null_mask
+    # strings are escaped and encoded once per distinct value, like symbols
+    codes, dictionary = pd.factorize(np.asarray(values, dtype=object))
+    encoded = [_as_str(value).replace('\\', '\\\\').replace('"', '\\"').encode('utf-8') for value in dictionary]
+    _check_no_trailing_nul(encoded)
+    encoded.append(b'')
+    return np.array(encoded, dtype=bytes)[codes], b'"', b'"', null_mask | (codes == -1)
+
+
+def _check_no_trailing_nul(encoded: typing.List[bytes]) -> None:
+    # fixed-width bytes arrays can't tell a trailing NUL from padding
+    for value in encoded:
+        if value.endswith(b'\x00'):
+            raise ValueError(f'values can not end with a NUL byte: {value!r}')
+
+
+def _timestamp_micros(values: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+    if isinstance(values, np.ma.MaskedArray):
+        micros, null_mask = _timestamp_micros(values.data)
+        return micros, null_mask | np.ma.getmaskarray(values)
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[us]').astype(np.int64), np.isnat(values)
+    values = values.astype(np.int64, copy=False)
+    return values, values == LONG_NULL
+
+
+def _null_as_empty(null_mask: np.ndarray, fragment: typing.Union[bytes, np.ndarray]) -> np.ndarray:
+    if isinstance(fragment, np.ndarray) and not null_mask.any():
+        return fragment
+    return np.where(null_mask, b'', fragment)
+
+
+def _join_lines(prefix: bytes, fragments: typing.List[np.ndarray], keep: np.ndarray = None) -> bytes:
+    # every fragment becomes a fixed-width bytes field of one structured array, whose NUL
+    # padding is stripped with one byte mask, so no Python object is built per line. Only
+    # rows where keep is true are joined.
+    if not fragments:
+        return b''
+    row_count = len(fragments[0])
+    for fragment in fragments:
+        if len(fragment) != row_count:
+            raise ValueError(f'all columns must be of len {row_count}')
+    if keep is not None and not keep.all():
+        fragments = [fragment[keep] for fragment in fragments]
+        row_count = len(fragments[0])
+    fields = [('prefix', f'S{len(prefix)}')]
+    fields.extend((f'f{idx}', fragment.dtype) for idx, fragment in enumerate(fragments))
+    fields.append(('nl', 'S1'))
+    lines = np.empty(row_count, dtype=fields)
+    lines['prefix'] = prefix
+    for idx, fragment in enumerate(fragments):
+        lines[f'f{idx}'] = fragment
+    lines['nl'] = b'\n'
+    raw = lines.view(np.uint8).reshape(row_count, lines.dtype.itemsize)
+    # padding is the NULs after the last non-NUL byte of each fragment, NULs within values stay
+    keep_bytes = np.ones(raw.shape, dtype=bool)
+    for idx in range(len(fragments)):
+        fragment_dtype, start = lines.dtype.fields[f'f{idx}'][:2]
+        end = start + fragment_dtype.itemsize
+        non_nul = raw[:, start:end] != 0
+        keep_bytes[:, start:end] = np.logical_or.accumulate(non_nul[:, ::-1], axis=1)[:, ::-1]
+    return raw[keep_bytes].tobytes()
@@ -0,0 +1,163 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import re
+import socketserver
+import threading
+import time
+import typing
+
+# ILP line: measurement[,tag=value...] field=value[,field=value...][ timestamp], QuestDB
+# rejects lines without fields
+_ILP_MEASUREMENT = rb'(?:[^, \\\n]|\\.)+'
+_ILP_NAME = rb'(?:[^,= \\\n]|\\.)+'
+_ILP_FIELD_VALUE = (rb'(?:-?\d+i'
+                    rb'|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+                    rb'|NaN|t|T|true|True|TRUE|f|F|false|False|FALSE'
+                    rb'|"(?:[^"\\]|\\.)*")')
+_ILP_FIELD = _ILP_NAME + rb'=' + _ILP_FIELD_VALUE
+_ILP_LINE = re.compile(
+    rb'^' + _ILP_MEASUREMENT +
+    rb'(?:,' + _ILP_NAME + rb'=' + _ILP_NAME + rb')*' +
+    rb' ' + _ILP_FIELD + rb'(?:,' + _ILP_FIELD + rb')*' +
+    rb'(?: -?\d+)?$',
+    re.DOTALL)
+
+
+def is_valid_line(line: bytes) -> bool:
+    return _ILP_LINE.match(line) is not None
+
+
+class IlpServer:
+    # Local stand-in for QuestDB's ILP TCP and UDP listeners. It splits the stream into
+    # lines, counts them, optionally validates and records them, and never writes anything.
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 tcp_port: int = 0,
+                 udp_port: int = 0,
+                 validate: bool = True,
+                 record: bool = False):
+        self.validate = validate
+        self.record = record
+        self.line_count = 0
+        self.byte_count = 0
+        self.error_count = 0
+        self.lines = []
+        self.errors = []
+        self._cond = threading.Condition()
+        self._servers = []
+        self._threads = []
+        self.tcp_address = None
+        self.udp_address = None
+        if tcp_port is not None:
+            tcp_server = _ThreadingTCPServer((host, tcp_port), _TcpHandler)
+            tcp_server.ilp_server = self
+            self.tcp_address = tcp_server.server_address
+            self._servers.append(tcp_server)
+        if udp_port is not None:
+            udp_server = _UDPServer((host, udp_port), _UdpHandler)
+            udp_server.ilp_server = self
+            self.udp_address = udp_server.server_address
+            self._servers.append(udp_server)
+
+    def start(self):
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def reset(self) -> None:
+        with self._cond:
+            self.line_count = 0
+            self.byte_count = 0
+            self.error_count = 0
+            self.lines.clear()
+            self.errors.clear()
+
+    def wait_for(self, line_count: int, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.line_count < line_count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _on_lines(self, lines: typing.List[bytes], num_bytes: int) -> None:
+        errors = [line for line in lines if not is_valid_line(line)] if self.validate else None
+        with self._cond:
+            self.line_count += len(lines)
+            self.byte_count += num_bytes
+            if errors:
+                self.error_count += len(errors)
+                self.errors.extend(errors)
+            if self.record:
+                self.lines.extend(lines)
+            self._cond.notify_all()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _UDPServer(socketserver.UDPServer):
+    allow_reuse_address = True
+    max_packet_size = 65535
+
+
+class _TcpHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        ilp_server = self.server.ilp_server
+        pending = b''
+        while chunk := self.request.recv(1024 * 1024):
+            chunk = pending + chunk
+            line_end = chunk.rfind(b'\n') + 1
+            pending = chunk[line_end:]
+            if line_end:
+                ilp_server._on_lines(chunk[:line_end - 1].split(b'\n'), line_end)
+        # the server discards an unterminated line when the connection closes
+
+
+class _UdpHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        datagram = self.request[0]
+        lines = datagram.rstrip(b'\n').split(b'\n') if datagram.strip() else []
+        self.server.ilp_server._on_lines(lines, len(datagram))
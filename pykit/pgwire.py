@@ -21,8 +21,33 @@
 #  limitations under the License.
 #
 
-import psycopg2
+import concurrent.futures
+import datetime
+import threading
 import typing
+import uuid
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.extras
+
+from pykit.cache import (
+    DEFAULT_CACHE_BYTES,
+    QueryCache
+)
+from pykit.core import Transaction
+from pykit.pool import ConnectionPool
+from pykit.types import (
+    ColumnTypes,
+    ColumnType
+)
+from pykit.wire import (
+    PG_OID_TYPES,
+    StatementResult,
+    WireConnection,
+    unique_names
+)
 
 CONN_ATTRS = {
     'user': 'admin',
@@ -32,19 +57,120 @@ CONN_ATTRS = {
     'database': 'qdb'
 }
 
+POOL_ATTRS = {
+    'min_size': 1,
+    'max_size': 8,
+    'max_idle': 300.0,
+    'check_after': 30.0,
+    'acquire_timeout': 30.0
+}
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_INSERT_PAGE_ROWS = 1_000
+
+# QuestDB's LONG/DATE/TIMESTAMP null, NaT as int64
+LONG_NULL = np.iinfo(np.int64).min
+
 Cursor = typing.NewType('Cursor', psycopg2.extensions.cursor)
 CursorConsumer = typing.NewType('CursorConsumer', typing.Callable[[Cursor], typing.Any])
 
 
+_pool = None
+_wire_pool = None
+_pool_lock = threading.Lock()
+_query_cache = None
+
+
+def connection_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(_connect, ping=_ping, **POOL_ATTRS)
+        return _pool
+
+
+def wire_pool() -> ConnectionPool:
+    # pool of pykit.wire connections, which fetch results in binary format
+    global _wire_pool
+    with _pool_lock:
+        if _wire_pool is None:
+            _wire_pool = ConnectionPool(_wire_connect, ping=_wire_ping, **POOL_ATTRS)
+        return _wire_pool
+
+
+def configure_pool(conn_attrs: typing.Dict[str, typing.Any] = None, **pool_attrs) -> None:
+    # updates CONN_ATTRS/POOL_ATTRS, the current pools are closed and the next call opens new ones
+    global _pool, _wire_pool
+    with _pool_lock:
+        if conn_attrs:
+            CONN_ATTRS.update(conn_attrs)
+        POOL_ATTRS.update(pool_attrs)
+        for pool in (_pool, _wire_pool):
+            if pool is not None:
+                pool.close()
+        _pool = _wire_pool = None
+
+
+def close_pool() -> None:
+    configure_pool()
+
+
+def enable_query_cache(max_bytes: int = DEFAULT_CACHE_BYTES) -> QueryCache:
+    # select_all, query_df and query_columns results are then served from a QueryCache
+    # for as long as the local tables they read from have not committed
+    global _query_cache
+    _query_cache = QueryCache(max_bytes)
+    return _query_cache
+
+
+def disable_query_cache() -> None:
+    global _query_cache
+    _query_cache = None
+
+
+def _cached(kind: str,
+            sql: str,
+            params: typing.Sequence[typing.Any],
+            load: typing.Callable[[], typing.Any]) -> typing.Any:
+    query_cache = _query_cache
+    if query_cache is None:
+        return load()
+    return query_cache.get_or_load(sql, params, load, kind)
+
+
 def with_cursor(consumer: CursorConsumer) -> typing.Any:
-    with psycopg2.connect(**CONN_ATTRS) as conn:
-        conn.autocommit = False
-        with conn.cursor() as stmt_cursor:
-            result = consumer(stmt_cursor)
+    with connection_pool().connection() as conn:
+        try:
+            with conn.cursor() as stmt_cursor:
+                result = consumer(stmt_cursor)
             conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
     return result
 
 
+def _connect() -> psycopg2.extensions.connection:
+    conn = psycopg2.connect(**CONN_ATTRS)
+    conn.autocommit = False
+    return conn
+
+
+def _ping(conn: psycopg2.extensions.connection) -> None:
+    with conn.cursor() as stmt_cursor:
+        stmt_cursor.execute('SELECT 1;')
+    conn.rollback()
+
+
+def _wire_connect() -> WireConnection:
+    return WireConnection(**CONN_ATTRS)
+
+
+def _wire_ping(conn: WireConnection) -> None:
+    conn.execute('SELECT 1;')
+
+
 def select_all(table_name: str, limit: int = 10) -> typing.List[typing.Tuple[typing.Any, ...]]:
     def _select_all(stmt_cursor: Cursor) -> typing.List[typing.Tuple[typing.Any, ...]]:
         try:
@@ -54,12 +180,171 @@ def select_all(table_name: str, limit: int = 10) -> typing.List[typing.Tuple[typ
             print(f'Notice table [{table_name}]: {error}')
             return None
 
-    return with_cursor(_select_all)
+    return _cached('rows', f'{table_name} LIMIT {limit};', None, lambda: with_cursor(_select_all))
+
+
+def query_iter(sql: str,
+               params: typing.Sequence[typing.Any] = None,
+               chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               named: bool = False,
+               binary: bool = False) -> typing.Iterator[pd.DataFrame]:
+    # Yields the result in DataFrames of up to chunk_rows rows, typed through PG_OID_TYPES.
+    # named=True declares a server-side cursor, so only one chunk is ever held client side;
+    # otherwise libpq still receives the whole result, but Python objects only exist for one
+    # chunk at a time. binary=True fetches chunks through a suspended portal on a wire
+    # connection (see query_columns). The pooled connection is held until the iterator is
+    # exhausted or closed.
+    if binary:
+        with wire_pool().connection() as conn:
+            for columns in conn.iter_columns(_numbered_params(sql, params), params, chunk_rows):
+                yield pd.DataFrame(columns, copy=False)
+        return
+    with connection_pool().connection() as conn:
+        try:
+            cursor_name = f'pykit_{uuid.uuid4().hex}' if named else None
+            with conn.cursor(name=cursor_name) as stmt_cursor:
+                if named:
+                    stmt_cursor.itersize = chunk_rows
+                stmt_cursor.execute(sql, params)
+                while rows := stmt_cursor.fetchmany(chunk_rows):
+                    yield df_from_rows(rows, stmt_cursor.description)
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+
+
+def query_columns(sql: str, params: typing.Sequence[typing.Any] = None) -> typing.Dict[str, np.ndarray]:
+    # Runs sql over a wire connection asking for binary results, decoded column-wise into
+    # NumPy arrays with the same types and nulls as df_from_rows, without building a Python
+    # object per cell. Parameters use the %s placeholders of the psycopg2 helpers.
+    def _query_columns() -> typing.Dict[str, np.ndarray]:
+        with wire_pool().connection() as conn:
+            return conn.query_columns(_numbered_params(sql, params), params)
+
+    return _cached('columns', sql, params, _query_columns)
+
+
+def query_df(sql: str,
+             params: typing.Sequence[typing.Any] = None,
+             binary: bool = False) -> pd.DataFrame:
+    if binary:
+        return pd.DataFrame(query_columns(sql, params), copy=False)
+
+    def _query_df(stmt_cursor: Cursor) -> pd.DataFrame:
+        stmt_cursor.execute(sql, params)
+        return df_from_rows(stmt_cursor.fetchall(), stmt_cursor.description)
+
+    return _cached('df', sql, params, lambda: with_cursor(_query_df))
+
+
+def parallel_query(sql_template: str,
+                   ts_from: int,
+                   ts_to: int,
+                   slices: int = 4,
+                   params: typing.Sequence[typing.Any] = None,
+                   table_name: str = None,
+                   binary: bool = False) -> pd.DataFrame:
+    # Runs sql_template once per slice of [ts_from, ts_to), epoch micros, concurrently on
+    # pooled connections, and concatenates the results in slice order. The template gets
+    # each slice through {ts_from} and {ts_to}, as in 'WHERE ts >= {ts_from} AND ts < {ts_to}'.
+    # With table_name local, slices are cut on its partition boundaries (see time_slices).
+    ranges = time_slices(ts_from, ts_to, slices, table_name)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        frames = list(executor.map(
+            lambda ts_range: query_df(
+                sql_template.format(ts_from=ts_range[0], ts_to=ts_range[1]), params, binary=binary),
+            ranges))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def time_slices(ts_from: int,
+                ts_to: int,
+                slices: int,
+                table_name: str = None) -> typing.List[typing.Tuple[int, int]]:
+    # Up to slices consecutive [from, to) ranges covering [ts_from, ts_to). When table_name
+    # is found under QDB_DB_DATA and partitioned, ranges start on partition boundaries with
+    # partitions grouped to balance row counts; otherwise the range is split evenly.
+    if ts_from >= ts_to or slices < 1:
+        raise ValueError(f'invalid time range [from: {ts_from}, to: {ts_to}, slices: {slices}]')
+    bounds = _partition_bounds(table_name, ts_from, ts_to, slices) if table_name else None
+    if not bounds:
+        bounds = sorted({ts_from + (ts_to - ts_from) * idx // slices for idx in range(slices + 1)})
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _partition_bounds(table_name: str, ts_from: int, ts_to: int, slices: int) -> typing.Optional[typing.List[int]]:
+    txn = Transaction(table_name)
+    if txn.txn_path is None or txn.partitions_count < 2:
+        return None
+    # partitions starting inside the range, with the rows up to each
+    cuts = []
+    rows = 0
+    for idx, partition in enumerate(txn.partitions):
+        if idx + 1 < txn.partitions_count and txn.partitions[idx + 1].p_timestamp <= ts_from:
+            continue
+        if partition.p_timestamp >= ts_to:
+            break
+        if partition.p_timestamp > ts_from:
+            cuts.append((partition.p_timestamp, rows))
+        rows += partition.p_size if idx + 1 < txn.partitions_count else txn.transient_row_count
+    if not cuts:
+        return None
+    # the cut closest to each even share of the rows
+    bounds = {ts_from, ts_to}
+    for share in range(1, slices):
+        target = rows * share // slices
+        bounds.add(min(cuts, key=lambda cut: abs(cut[1] - target))[0])
+    return sorted(bounds)
+
+
+def _numbered_params(sql: str, params: typing.Sequence[typing.Any] = None) -> str:
+    # psycopg2's %s placeholders to the protocol's $1, $2...
+    if not params:
+        return sql
+    parts = sql.split('%s')
+    return ''.join(f'{part}${idx}' for idx, part in enumerate(parts[:-1], 1)) + parts[-1]
+
+
+def df_from_rows(rows: typing.List[typing.Tuple[typing.Any, ...]],
+                 description: typing.Sequence[typing.Any]) -> pd.DataFrame:
+    # numeric nulls become the QuestDB null of their type (see ColumnTypes), timestamps
+    # are epoch micros and dates epoch millis, as in tables read with df_from_table.
+    # Repeated column names are suffixed, see unique_names.
+    columns = list(zip(*rows)) if rows else [()] * len(description)
+    return pd.DataFrame(
+        {name: _column_values(values, PG_OID_TYPES.get(column.type_code, ColumnTypes.UNDEFINED))
+         for name, column, values in zip(unique_names(column.name for column in description), description, columns)},
+        copy=False)
+
+
+def _column_values(values: typing.Sequence[typing.Any], col_type: ColumnType) -> np.ndarray:
+    type_name = col_type.type_name
+    if type_name in ('TIMESTAMP', 'DATE'):
+        # aware values (timestamptz) are converted to naive UTC, numpy won't parse them
+        values = [value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                  if getattr(value, 'tzinfo', None) is not None else value for value in values]
+        micros = np.array(values, dtype='datetime64[us]').astype(np.int64)
+        if type_name == 'DATE':
+            return np.where(micros == LONG_NULL, micros, micros // 1000)
+        return micros
+    if type_name in ('BOOLEAN', 'FLOAT', 'DOUBLE'):
+        return np.array(values, dtype=col_type.dtype.type)
+    if type_name in ('SHORT', 'INT', 'LONG'):
+        dtype = col_type.dtype.type
+        try:
+            return np.array(values, dtype=dtype)
+        except TypeError:
+            null_value = np.iinfo(dtype).min
+            return np.array([null_value if value is None else value for value in values], dtype=dtype)
+    return np.array(values, dtype=object)
 
 
 def insert_values(table_name: str,
                   columns: typing.Tuple[typing.Tuple[str, str], ...],
-                  *values: typing.Tuple[typing.Any, ...]) -> None:
+                  *values: typing.Tuple[typing.Any, ...],
+                  page_size: int = DEFAULT_INSERT_PAGE_ROWS) -> None:
     num_columns = len(columns)
     for value in values:
         _len = len(value)
@@ -67,23 +352,47 @@ def insert_values(table_name: str,
             raise ValueError(f'all tuples must be of len {num_columns}')
 
     def _insert_table(stmt_cursor: Cursor) -> None:
-        insert_stmt = f'insert into {table_name} values({", ".join("%s" for _ in range(num_columns))})'
-        stmt_cursor.executemany(insert_stmt, values)
+        # one multi-row VALUES statement, one round trip, per page_size rows
+        psycopg2.extras.execute_values(stmt_cursor, f'insert into {table_name} values %s', values, page_size=page_size)
 
     with_cursor(_insert_table)
 
 
+def insert_dataframe(table_name: str,
+                     df: pd.DataFrame,
+                     page_size: int = DEFAULT_INSERT_PAGE_ROWS) -> int:
+    # Inserts df by column name, page_size rows per statement. NaN/NaT become NULL and
+    # datetime64 columns are sent as timestamps. Returns the number of rows inserted.
+    rows = list(zip(*(_insert_column(df[col_name]) for col_name in df.columns)))
+    if not rows:
+        return 0
+
+    def _insert_dataframe(stmt_cursor: Cursor) -> None:
+        statement = f'insert into {table_name} ({", ".join(str(col_name) for col_name in df.columns)}) values %s'
+        psycopg2.extras.execute_values(stmt_cursor, statement, rows, page_size=page_size)
+
+    with_cursor(_insert_dataframe)
+    return len(rows)
+
+
+def _insert_column(column: pd.Series) -> typing.List[typing.Any]:
+    # whole column to Python values psycopg2 can adapt, numpy scalars cannot be
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        values = list(column.dt.to_pydatetime())
+    else:
+        values = column.to_numpy().tolist()
+    if column.hasnans:
+        nulls = column.isna().to_numpy()
+        values = [None if is_null else value for value, is_null in zip(values, nulls)]
+    return values
+
+
 def create_table(table_name: str,
                  columns: typing.List[typing.Tuple[str, str]],
                  designated: str = None,
                  partition_by: str = 'NONE') -> bool:
     def _create_table(stmt_cursor: Cursor) -> None:
-        statement = f'CREATE TABLE IF NOT EXISTS {table_name} ('
-        statement += ', '.join(f'{col_name} {col_type}' for col_name, col_type in columns)
-        statement += f')'
-        if designated:
-            statement += f' TIMESTAMP({designated}) PARTITION BY {partition_by}'
-        stmt_cursor.execute(statement)
+        stmt_cursor.execute(create_table_statement(table_name, columns, designated, partition_by))
 
     try:
         with_cursor(_create_table)
@@ -93,6 +402,53 @@ def create_table(table_name: str,
         return False
 
 
+def create_table_statement(table_name: str,
+                           columns: typing.List[typing.Tuple[str, str]],
+                           designated: str = None,
+                           partition_by: str = 'NONE') -> str:
+    statement = f'CREATE TABLE IF NOT EXISTS {table_name} ('
+    statement += ', '.join(f'{col_name} {col_type}' for col_name, col_type in columns)
+    statement += f')'
+    if designated:
+        statement += f' TIMESTAMP({designated}) PARTITION BY {partition_by}'
+    return statement
+
+
+def execute_statements(statements: typing.Iterable[str], concurrency: int = 1) -> typing.List[StatementResult]:
+    # Pipelines statements over pooled wire connections, one round trip per PIPELINE_BATCH
+    # statements, and returns a result per statement in order; failures do not stop the rest.
+    # With concurrency > 1 statements are dealt round robin to that many connections, so they
+    # must not depend on each other.
+    statements = list(statements)
+    if concurrency <= 1 or len(statements) < 2:
+        return _pipeline(statements)
+    concurrency = min(concurrency, len(statements))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        group_results = list(executor.map(_pipeline, (statements[idx::concurrency] for idx in range(concurrency))))
+    results = [None] * len(statements)
+    for idx, group in enumerate(group_results):
+        results[idx::concurrency] = group
+    return results
+
+
+def _pipeline(statements: typing.List[str]) -> typing.List[StatementResult]:
+    with wire_pool().connection() as conn:
+        return conn.pipeline(statements)
+
+
+def create_tables(tables: typing.Mapping[str, typing.List[typing.Tuple[str, str]]],
+                  designated: str = None,
+                  partition_by: str = 'NONE',
+                  concurrency: int = 1) -> typing.List[StatementResult]:
+    return execute_statements(
+        (create_table_statement(table_name, columns, designated, partition_by) for table_name, columns in tables.items()),
+        concurrency)
+
+
+def truncate_tables(table_names: typing.Iterable[str], concurrency: int = 1) -> typing.List[StatementResult]:
+    return execute_statements((f'TRUNCATE TABLE {table_name};' for table_name in table_names), concurrency)
+
+
 def drop_table(table_name: str) -> bool:
     def _drop_table(stmt_cursor: Cursor) -> bool:
         try:
@@ -104,16 +460,12 @@ def drop_table(table_name: str) -> bool:
     return with_cursor(_drop_table)
 
 
-def drop_tables(name_prefix: str, total: int) -> None:
-    def _drop_tables(stmt_cursor: Cursor) -> None:
-        for idx in range(total):
-            try:
-                table_name = f'{name_prefix}{idx}'
-                stmt_cursor.execute(f'DROP table {table_name};')
-            except (Exception, psycopg2.Error) as error:
-                print(f'Notice table [{table_name}]: {error}')
-
-    with_cursor(_drop_tables)
+def drop_tables(name_prefix: str, total: int, concurrency: int = 1) -> typing.List[StatementResult]:
+    results = execute_statements((f'DROP table {name_prefix}{idx};' for idx in range(total)), concurrency)
+    for idx, result in enumerate(results):
+        if not result.ok:
+            print(f'Notice table [{name_prefix}{idx}]: {result.error}')
+    return results
 
 
 def report_version():
@@ -0,0 +1,411 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import datetime
+import re
+import socketserver
+import struct
+import threading
+import typing
+
+from pykit.wire import (
+    CANCEL_REQUEST_CODE,
+    FORMAT_BINARY,
+    PG_EPOCH_MICROS,
+    PROTOCOL_VERSION
+)
+
+SSL_REQUEST_CODE = 80877103
+
+# id, price, qty, sym, ts, flag
+DEFAULT_COLUMNS = (('id', 20), ('price', 701), ('qty', 23), ('sym', 1043), ('ts', 1114), ('flag', 16))
+DEFAULT_ROWS = 10_000
+
+SERVER_PARAMS = {
+    'server_version': '12.3',
+    'server_encoding': 'UTF8',
+    'client_encoding': 'UTF8',
+    'DateStyle': 'ISO, MDY',
+    'TimeZone': 'UTC',
+    'integer_datetimes': 'on',
+    'standard_conforming_strings': 'on'
+}
+
+# first canned timestamp, 2021-10-01T00:00:00Z as epoch micros
+_BASE_MICROS = 1_633_046_400_000_000
+_LIMIT = re.compile(r'\blimit\s+(\d+)\s*;?\s*$', re.IGNORECASE)
+_INSERT_VALUES = re.compile(r'\)\s*,\s*\(')
+_DECLARE = re.compile(r'^declare\s+"?([^"\s]+)"?\s.*?\bfor\s+(.*)$', re.IGNORECASE | re.DOTALL)
+_FETCH = re.compile(r'^fetch\s+forward\s+(\d+)\s+from\s+"?([^"\s;]+)"?', re.IGNORECASE)
+
+_TEXT_FORMATS = {
+    16: lambda idx: b't' if idx % 2 else b'f',
+    17: lambda idx: b'\\x' + idx.to_bytes(4, 'big').hex().encode('ascii'),
+    20: lambda idx: str(idx * 1000).encode('ascii'),
+    21: lambda idx: str(idx % 32767).encode('ascii'),
+    23: lambda idx: str(idx).encode('ascii'),
+    700: lambda idx: repr(idx / 4).encode('ascii'),
+    701: lambda idx: repr(idx * 0.5).encode('ascii'),
+    1043: lambda idx: f's{idx % 100}'.encode('ascii'),
+    1082: lambda idx: str(datetime.date(2021, 10, 1) + datetime.timedelta(days=idx)).encode('ascii'),
+    1114: lambda idx: _iso_micros(_BASE_MICROS + idx * 1_000_000).encode('ascii')
+}
+_TEXT_FORMATS[25] = _TEXT_FORMATS[1043]
+_TEXT_FORMATS[1184] = _TEXT_FORMATS[1114]
+
+_BINARY_FORMATS = {
+    16: lambda idx: b'\x01' if idx % 2 else b'\x00',
+    17: lambda idx: idx.to_bytes(4, 'big'),
+    20: lambda idx: struct.pack('>q', idx * 1000),
+    21: lambda idx: struct.pack('>h', idx % 32767),
+    23: lambda idx: struct.pack('>i', idx),
+    700: lambda idx: struct.pack('>f', idx / 4),
+    701: lambda idx: struct.pack('>d', idx * 0.5),
+    1082: lambda idx: struct.pack('>i', (_BASE_MICROS - PG_EPOCH_MICROS) // 86_400_000_000 + idx),
+    1114: lambda idx: struct.pack('>q', _BASE_MICROS - PG_EPOCH_MICROS + idx * 1_000_000)
+}
+_BINARY_FORMATS[25] = _BINARY_FORMATS[1043] = _TEXT_FORMATS[1043]
+_BINARY_FORMATS[1184] = _BINARY_FORMATS[1114]
+
+
+class PgWireServer:
+    # Local stand-in for QuestDB's PostgreSQL wire endpoint, to measure client overhead
+    # without a database. Every query returns the same canned result: rows rows of columns,
+    # (name, type oid), with values derived from the row number and a null every null_every
+    # rows, in text or binary format as bound. 'LIMIT n' caps the rows; INSERT, DDL and
+    # transaction statements are acknowledged without effect, inserted rows are counted;
+    # statements matching fail_pattern get an error. SSL is refused, the password checked
+    # in clear text.
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 rows: int = DEFAULT_ROWS,
+                 columns: typing.Sequence[typing.Tuple[str, int]] = DEFAULT_COLUMNS,
+                 null_every: int = 0,
+                 user: str = 'admin',
+                 password: str = 'quest',
+                 fail_pattern: str = None):
+        for _, oid in columns:
+            if oid not in _TEXT_FORMATS:
+                raise ValueError(f'unsupported type oid: {oid}')
+        self.rows = rows
+        self.columns = tuple(columns)
+        self.null_every = null_every
+        self.user = user
+        self.password = password
+        self.fail_pattern = re.compile(fail_pattern, re.IGNORECASE) if fail_pattern else None
+        self.connection_count = 0
+        self.query_count = 0
+        self.insert_count = 0
+        self.cancel_count = 0
+        self.statements = []
+        self._lock = threading.Lock()
+        self._data_rows = {}  # result formats -> encoded DataRow messages
+        self._server = _ThreadingTCPServer((host, port), _PgWireHandler)
+        self._server.pgwire_server = self
+        self.address = self._server.server_address
+        self._thread = None
+
+    @property
+    def conn_attrs(self) -> typing.Dict[str, str]:
+        # for pgwire.configure_pool and WireConnection
+        return {
+            'host': self.address[0],
+            'port': str(self.address[1]),
+            'user': self.user,
+            'password': self.password,
+            'database': 'qdb'
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connection_count = 0
+            self.query_count = 0
+            self.insert_count = 0
+            self.cancel_count = 0
+            self.statements.clear()
+
+    def row_description(self, binary: bool = False) -> bytes:
+        payload = struct.pack('>h', len(self.columns))
+        for name, oid in self.columns:
+            payload += name.encode('utf-8') + b'\x00'
+            payload += struct.pack('>ihihih', 0, 0, oid, -1, -1, 1 if binary else 0)
+        return _message(b'T', payload)
+
+    def data_rows(self, binary: bool) -> typing.List[bytes]:
+        # encoded once per format, the server should not be what a benchmark measures
+        with self._lock:
+            if (data_rows := self._data_rows.get(binary)) is None:
+                formats = [(_BINARY_FORMATS if binary else _TEXT_FORMATS)[oid] for _, oid in self.columns]
+                data_rows = [self._data_row(idx, formats) for idx in range(self.rows)]
+                self._data_rows[binary] = data_rows
+            return data_rows
+
+    def _data_row(self, idx: int, formats: typing.List[typing.Callable[[int], bytes]]) -> bytes:
+        payload = [struct.pack('>h', len(formats))]
+        for col_idx, value_format in enumerate(formats):
+            if self.null_every and (idx + col_idx) % self.null_every == self.null_every - 1:
+                payload.append(b'\xff\xff\xff\xff')
+            else:
+                value = value_format(idx)
+                payload.append(struct.pack('>i', len(value)) + value)
+        return _message(b'D', b''.join(payload))
+
+    def _on_statement(self, sql: str) -> None:
+        with self._lock:
+            self.query_count += 1
+            self.statements.append(sql)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _PgWireHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.pg = self.server.pgwire_server
+        self.out = []
+        self.tx_status = b'I'
+        self.cursors = {}  # name -> next row, row limit
+        self.statements = {}  # name -> sql
+        self.portals = {}  # name -> [sql, binary, next row]
+        try:
+            if not self._startup():
+                return
+            with self.pg._lock:
+                self.pg.connection_count += 1
+            skip_to_sync = False
+            while True:
+                msg_type = self.rfile.read(1)
+                if not msg_type:
+                    return
+                payload = self._read(struct.unpack('>i', self._read(4))[0] - 4)
+                if msg_type == b'X':
+                    return
+                if skip_to_sync and msg_type != b'S':
+                    continue
+                skip_to_sync = False
+                if msg_type == b'Q':
+                    self._simple_query(payload[:-1].decode('utf-8'))
+                elif msg_type == b'S':
+                    self._ready()
+                elif msg_type == b'H':
+                    self._flush()
+                else:
+                    skip_to_sync = not self._extended(msg_type, payload)
+        except (ConnectionError, EOFError):
+            pass
+
+    def _startup(self) -> bool:
+        while True:
+            length, code = struct.unpack('>ii', self._read(8))
+            payload = self._read(length - 8)
+            if code == SSL_REQUEST_CODE:
+                self.request.sendall(b'N')
+            elif code == CANCEL_REQUEST_CODE:
+                with self.pg._lock:
+                    self.pg.cancel_count += 1
+                return False
+            elif code == PROTOCOL_VERSION:
+                break
+            else:
+                return False
+        params = payload.split(b'\x00')
+        params = dict(zip(params[::2], params[1::2]))
+        self.request.sendall(_message(b'R', struct.pack('>i', 3)))
+        msg_type = self._read(1)
+        password = self._read(struct.unpack('>i', self._read(4))[0] - 4)[:-1]
+        if (msg_type != b'p' or params.get(b'user') != self.pg.user.encode('utf-8')
+                or password != self.pg.password.encode('utf-8')):
+            self._error('28P01', 'invalid username/password')
+            self._flush()
+            return False
+        self.out.append(_message(b'R', struct.pack('>i', 0)))
+        for key, value in SERVER_PARAMS.items():
+            self.out.append(_message(b'S', key.encode('utf-8') + b'\x00' + value.encode('utf-8') + b'\x00'))
+        self.out.append(_message(b'K', struct.pack('>ii', threading.get_ident() & 0x7FFFFFFF, 1)))
+        self._ready()
+        return True
+
+    def _simple_query(self, sql: str) -> None:
+        statements = [statement for statement in sql.split(';') if statement.strip()]
+        if not statements:
+            self.out.append(_message(b'I'))
+        for statement in statements:
+            if not self._run(statement.strip(), describe=True):
+                if self.tx_status == b'T':
+                    self.tx_status = b'E'
+                break
+        self._ready()
+
+    def _extended(self, msg_type: bytes, payload: bytes) -> bool:
+        if msg_type == b'P':
+            name, sql, _ = payload.split(b'\x00', 2)
+            self.statements[name] = sql.decode('utf-8').strip().rstrip(';')
+            self.out.append(_message(b'1'))
+        elif msg_type == b'B':
+            portal, statement, rest = payload.split(b'\x00', 2)
+            pos = 2 + 2 * struct.unpack_from('>h', rest)[0]
+            param_count = struct.unpack_from('>h', rest, pos)[0]
+            pos += 2
+            for _ in range(param_count):
+                pos += 4 + max(struct.unpack_from('>i', rest, pos)[0], 0)
+            result_formats = struct.unpack_from(f'>{struct.unpack_from(">h", rest, pos)[0]}h', rest, pos + 2)
+            self.portals[portal] = [self.statements[statement], FORMAT_BINARY in result_formats, 0]
+            self.out.append(_message(b'2'))
+        elif msg_type == b'D':
+            kind, name = payload[:1], payload[1:-1]
+            if kind == b'S':
+                self.out.append(_message(b't', b'\x00\x00'))
+                sql, binary = self.statements[name], False
+            else:
+                sql, binary = self.portals[name][:2]
+            self.out.append(self.pg.row_description(binary) if _is_query(sql) else _message(b'n'))
+        elif msg_type == b'E':
+            name, max_rows = payload[:-5], struct.unpack_from('>i', payload, len(payload) - 4)[0]
+            portal = self.portals[name]
+            if not _is_query(portal[0]):
+                return self._run(portal[0], describe=False)
+            if portal[2] == 0 and not self._check(portal[0]):
+                return False
+            row_count = _row_limit(portal[0], self.pg.rows)
+            end = row_count if max_rows <= 0 else min(row_count, portal[2] + max_rows)
+            self.out.extend(self.pg.data_rows(portal[1])[portal[2]:end])
+            if end < row_count:
+                self.out.append(_message(b's'))
+            else:
+                self.out.append(_command_complete(f'SELECT {end}'))
+            portal[2] = end
+        elif msg_type == b'C':
+            self.out.append(_message(b'3'))
+        return True
+
+    def _run(self, sql: str, describe: bool) -> bool:
+        # one statement, False when it failed
+        if not self._check(sql):
+            return False
+        keyword = sql.split(None, 1)[0].upper()
+        if keyword == 'BEGIN':
+            self.tx_status = b'T'
+            self.out.append(_command_complete('BEGIN'))
+        elif keyword in ('COMMIT', 'ROLLBACK', 'END'):
+            self.tx_status = b'I'
+            self.cursors.clear()
+            self.out.append(_command_complete('ROLLBACK' if keyword == 'ROLLBACK' else 'COMMIT'))
+        elif keyword == 'INSERT':
+            row_count = len(_INSERT_VALUES.findall(sql)) + 1
+            with self.pg._lock:
+                self.pg.insert_count += row_count
+            self.out.append(_command_complete(f'INSERT 0 {row_count}'))
+        elif (declare := _DECLARE.match(sql)) is not None:
+            self.cursors[declare.group(1)] = [0, _row_limit(declare.group(2), self.pg.rows)]
+            self.out.append(_command_complete('DECLARE CURSOR'))
+        elif (fetch := _FETCH.match(sql)) is not None:
+            cursor = self.cursors[fetch.group(2)]
+            end = min(cursor[1], cursor[0] + int(fetch.group(1)))
+            self.out.append(self.pg.row_description())
+            self.out.extend(self.pg.data_rows(False)[cursor[0]:end])
+            self.out.append(_command_complete(f'FETCH {end - cursor[0]}'))
+            cursor[0] = end
+        elif keyword == 'CLOSE':
+            self.out.append(_command_complete('CLOSE CURSOR'))
+        elif _is_query(sql):
+            row_count = _row_limit(sql, self.pg.rows)
+            if describe:
+                self.out.append(self.pg.row_description())
+            self.out.extend(self.pg.data_rows(False)[:row_count])
+            self.out.append(_command_complete(f'SELECT {row_count}'))
+        else:
+            self.out.append(_command_complete(' '.join(sql.split()[:2]).upper()))
+        return True
+
+    def _check(self, sql: str) -> bool:
+        self.pg._on_statement(sql)
+        if self.pg.fail_pattern is not None and self.pg.fail_pattern.search(sql):
+            self._error('42000', f'failed: {sql}')
+            return False
+        return True
+
+    def _error(self, code: str, message: str) -> None:
+        fields = f'SERROR\x00C{code}\x00M{message}\x00\x00'.encode('utf-8')
+        self.out.append(_message(b'E', fields))
+
+    def _ready(self) -> None:
+        self.out.append(_message(b'Z', self.tx_status))
+        self._flush()
+
+    def _flush(self) -> None:
+        if self.out:
+            self.request.sendall(b''.join(self.out))
+            self.out.clear()
+
+    def _read(self, num_bytes: int) -> bytes:
+        data = self.rfile.read(num_bytes)
+        if len(data) < num_bytes:
+            raise EOFError()
+        return data
+
+
+def _is_query(sql: str) -> bool:
+    # QuestDB also takes a bare table name, optionally with LIMIT, as a query
+    if sql.split(None, 1)[0].upper() in ('SELECT', 'WITH', 'SHOW'):
+        return True
+    return ' ' not in sql.strip() or _LIMIT.search(sql) is not None
+
+
+def _row_limit(sql: str, rows: int) -> int:
+    limit = _LIMIT.search(sql)
+    return min(rows, int(limit.group(1))) if limit else rows
+
+
+def _message(msg_type: bytes, payload: bytes = b'') -> bytes:
+    # backend message framing: type byte, then the length including itself
+    return msg_type + struct.pack('>i', 4 + len(payload)) + payload
+
+
+def _command_complete(tag: str) -> bytes:
+    return _message(b'C', tag.encode('utf-8') + b'\x00')
+
+
+def _iso_micros(micros: int) -> str:
+    return (datetime.datetime(1970, 1, 1) + datetime.timedelta(microseconds=micros)).isoformat(sep=' ')
@@ -0,0 +1,199 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import contextlib
+import threading
+import time
+import typing
+
+Connection = typing.TypeVar('Connection')
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool(typing.Generic[Connection]):
+    # Thread-safe pool of up to max_size connections, min_size of which are opened upfront and
+    # kept even when idle. Idle connections are handed out most recently used first, so the
+    # least used ones age out after max_idle seconds, closed by a reaper thread that only runs
+    # while there are such connections. A connection idle for longer than check_after seconds
+    # is pinged before being handed out, and discarded when the ping fails.
+
+    def __init__(self,
+                 connect: typing.Callable[[], Connection],
+                 min_size: int = 1,
+                 max_size: int = 8,
+                 max_idle: float = 300.0,
+                 check_after: float = 30.0,
+                 acquire_timeout: float = 30.0,
+                 ping: typing.Callable[[Connection], typing.Any] = None,
+                 close: typing.Callable[[Connection], typing.Any] = None):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f'invalid pool size [min: {min_size}, max: {max_size}]')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect
+        self._ping = ping
+        self._close = close if close is not None else lambda conn: conn.close()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._reaper_cond = threading.Condition(self._lock)
+        self._reaper = None
+        self._idle = []  # (connection, released at), most recently released last
+        self._size = 0
+        self._closed = False
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, timeout: float = None) -> Connection:
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            with self._cond:
+                self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    if self._closed:
+                        raise PoolTimeoutError('pool is closed')
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0.0:
+                        raise PoolTimeoutError(f'no connection available within timeout [max_size: {self.max_size}]')
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise PoolTimeoutError('pool is closed')
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn = None
+            if conn is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            if self._is_healthy(conn, released_at):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn: Connection, discard: bool = False) -> None:
+        if discard or self._closed or _is_closed(conn):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._evict_idle()
+            self._start_reaper()
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def connection(self, timeout: float = None) -> typing.Iterator[Connection]:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=_is_closed(conn))
+            raise
+        self.release(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+            self._reaper_cond.notify()
+        for conn in idle:
+            self._discard(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open(self) -> Connection:
+        conn = self._connect()
+        self._size += 1
+        return conn
+
+    def _is_healthy(self, conn: Connection, released_at: float) -> bool:
+        if _is_closed(conn):
+            return False
+        if self._ping is None or time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            self._ping(conn)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self) -> None:
+        # called holding the lock, idle connections are ordered by release time
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            self._close_quietly(conn)
+
+    def _start_reaper(self) -> None:
+        # called holding the lock
+        if self._reaper is None and self._idle and self._size > self.min_size:
+            self._reaper = threading.Thread(target=self._reap, name='pykit-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        # evicts idle connections as they expire, until none is left to evict
+        with self._lock:
+            while not self._closed and self._idle and self._size > self.min_size:
+                self._reaper_cond.wait(self._idle[0][1] + self.max_idle - time.monotonic())
+                self._evict_idle()
+            self._reaper = None
+
+    def _discard(self, conn: Connection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _close_quietly(self, conn: Connection) -> None:
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+
+def _is_closed(conn: typing.Any) -> bool:
+    return bool(getattr(conn, 'closed', False))
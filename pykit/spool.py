@@ -0,0 +1,191 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import mmap
+import os
+import struct
+import typing
+from pathlib import Path
+
+# Header layout: magic (8 bytes), capacity (int64), then two offset slots of four int64 each:
+# sequence, read offset, write offset, check. Updates alternate between slots and the valid slot
+# with the highest sequence wins on open, so a torn header write falls back to the previous state
+SPOOL_MAGIC = b'QDBSPOOL'
+SPOOL_HEADER_SIZE = 128
+_CAPACITY_OFFSET = 8
+_SLOTS_OFFSET = 16
+_SLOT_SIZE = 32
+_SLOT_CHECK_SEED = 0x5350_4F4F_4C5F_4F46
+
+DEFAULT_SPOOL_CAPACITY = 256 * 1024 ** 2
+DEFAULT_REPLAY_CHUNK_SIZE = 1024 ** 2
+
+
+class SpoolFullError(Exception):
+    pass
+
+
+class Spool:
+    # Memory mapped ring buffer of complete ILP lines. Read and write offsets only grow (by
+    # whole laps of capacity at most) and map to file position offset % capacity. Data is
+    # always written before the header slot that exposes it and is never moved, so a crash at
+    # any point leaves a header that describes intact, line aligned data. Replay is
+    # at-least-once; an unterminated tail is never sent.
+
+    def __init__(self, spool_path: typing.Union[str, Path], capacity: int = DEFAULT_SPOOL_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f'capacity must be positive: {capacity}')
+        self.spool_path = Path(spool_path)
+        self.capacity = capacity
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.spool_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            file_size = os.fstat(fd).st_size
+            if file_size >= SPOOL_HEADER_SIZE:
+                header = os.pread(fd, SPOOL_HEADER_SIZE, 0)
+                if header[:len(SPOOL_MAGIC)] == SPOOL_MAGIC:
+                    self.capacity = struct.unpack_from('<q', header, _CAPACITY_OFFSET)[0]
+                else:
+                    raise ValueError(f'not a spool file: {self.spool_path}')
+            if file_size < SPOOL_HEADER_SIZE + self.capacity:
+                os.ftruncate(fd, SPOOL_HEADER_SIZE + self.capacity)
+            self._mmap = mmap.mmap(fd, SPOOL_HEADER_SIZE + self.capacity, flags=mmap.MAP_SHARED,
+                                   access=mmap.ACCESS_WRITE, offset=0)
+        finally:
+            os.close(fd)
+        self._sequence = -1
+        if file_size < SPOOL_HEADER_SIZE:
+            struct.pack_into('<q', self._mmap, _CAPACITY_OFFSET, self.capacity)
+            self._store_offsets(0, 0)
+            self._mmap[:len(SPOOL_MAGIC)] = SPOOL_MAGIC
+        else:
+            self._load_offsets()
+        if not 0 <= self._read_offset <= self._write_offset <= self._read_offset + self.capacity:
+            raise ValueError(f'corrupt spool offsets [read: {self._read_offset}, '
+                             f'write: {self._write_offset}]: {self.spool_path}')
+
+    @property
+    def pending(self) -> int:
+        return self._write_offset - self._read_offset
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.pending
+
+    def append(self, payload: bytes) -> None:
+        payload_len = len(payload)
+        if payload_len == 0:
+            return
+        if payload_len > self.free:
+            raise SpoolFullError(f'spool full [pending: {self.pending}, '
+                                 f'capacity: {self.capacity}]: {self.spool_path}')
+        start = self._write_offset % self.capacity
+        head_len = min(payload_len, self.capacity - start)
+        self._mmap[SPOOL_HEADER_SIZE + start:SPOOL_HEADER_SIZE + start + head_len] = payload[:head_len]
+        if head_len < payload_len:
+            self._mmap[SPOOL_HEADER_SIZE:SPOOL_HEADER_SIZE + payload_len - head_len] = payload[head_len:]
+        self._store_offsets(self._read_offset, self._write_offset + payload_len)
+
+    def peek(self, max_bytes: int = DEFAULT_REPLAY_CHUNK_SIZE) -> bytes:
+        # returns the oldest pending bytes, up to max_bytes unless the first line is longer,
+        # ending at a line boundary. Empty when only an unterminated tail is pending.
+        chunk = self._read(min(self.pending, max_bytes))
+        line_end = chunk.rfind(b'\n')
+        if line_end == -1 and len(chunk) < self.pending:
+            chunk = self._read(self.pending)
+            line_end = chunk.find(b'\n')
+        return chunk[:line_end + 1]
+
+    def consume(self, num_bytes: int) -> None:
+        if not 0 <= num_bytes <= self.pending:
+            raise ValueError(f'cannot consume {num_bytes} bytes, pending: {self.pending}')
+        if num_bytes == self.pending:
+            self._store_offsets(0, 0)
+        elif num_bytes:
+            # keeps offsets within one lap of capacity
+            lap = (self._read_offset + num_bytes) // self.capacity * self.capacity
+            self._store_offsets(self._read_offset + num_bytes - lap, self._write_offset - lap)
+
+    def replay(self,
+               send: typing.Callable[[bytes], int],
+               chunk_size: int = DEFAULT_REPLAY_CHUNK_SIZE) -> int:
+        # send returns how many bytes of the chunk it wrote, only complete lines are consumed
+        # and replay stops at the first short write. A pending tail without a line end, which
+        # the server could never accept, is dropped.
+        replayed = 0
+        while self.pending:
+            chunk = self.peek(chunk_size)
+            if not chunk:
+                self.consume(self.pending)
+                break
+            written = send(chunk)
+            consumed = chunk.rfind(b'\n', 0, written) + 1
+            self.consume(consumed)
+            replayed += consumed
+            if written < len(chunk):
+                break
+        return replayed
+
+    def flush(self) -> None:
+        self._mmap.flush()
+
+    def close(self) -> None:
+        if not self._mmap.closed:
+            self._mmap.flush()
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _read(self, num_bytes: int) -> bytes:
+        # num_bytes pending bytes from the read offset, joined across the wrap point
+        start = self._read_offset % self.capacity
+        head_len = min(num_bytes, self.capacity - start)
+        data = self._mmap[SPOOL_HEADER_SIZE + start:SPOOL_HEADER_SIZE + start + head_len]
+        if head_len < num_bytes:
+            data += self._mmap[SPOOL_HEADER_SIZE:SPOOL_HEADER_SIZE + num_bytes - head_len]
+        return data
+
+    def _load_offsets(self) -> None:
+        best = None
+        for slot in range(2):
+            sequence, read_offset, write_offset, check = struct.unpack_from(
+                '<qqqq', self._mmap, _SLOTS_OFFSET + slot * _SLOT_SIZE)
+            if check == sequence ^ read_offset ^ write_offset ^ _SLOT_CHECK_SEED:
+                if best is None or sequence > best[0]:
+                    best = (sequence, read_offset, write_offset)
+        if best is None:
+            raise ValueError(f'corrupt spool header: {self.spool_path}')
+        self._sequence, self._read_offset, self._write_offset = best
+
+    def _store_offsets(self, read_offset: int, write_offset: int) -> None:
+        # writes into the slot not holding the current state, which stays valid until this one is complete
+        self._sequence += 1
+        struct.pack_into('<qqqq', self._mmap, _SLOTS_OFFSET + (self._sequence % 2) * _SLOT_SIZE,
+                         self._sequence, read_offset, write_offset,
+                         self._sequence ^ read_offset ^ write_offset ^ _SLOT_CHECK_SEED)
+        self._read_offset = read_offset
+        self._write_offset = write_offset
@@ -0,0 +1,143 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import re
+import typing
+
+import numpy as np
+
+from pykit.core import TableInfo
+from pykit.columns import (
+    STRING_NULL_LENGTH,
+    column_idx,
+    map_file,
+    string_lengths
+)
+from pykit.types import ColumnTypes
+
+# chars compared per gather in string_equals, string_in and string_startswith
+COMPARE_CHUNK_CHARS = 1 << 22
+
+
+def string_equals(table_name: str, column: str, value: str) -> np.ndarray:
+    return string_in(table_name, column, (value,))
+
+
+def string_in(table_name: str, column: str, values: typing.Iterable[str]) -> np.ndarray:
+    # row mask of a STRING column over all partitions, nulls never match
+    by_length = _encode_needles(values)
+    return _mask(table_name, column,
+                 lambda data, offsets, lengths: _match_chars(data, offsets, lengths, by_length, True))
+
+
+def string_startswith(table_name: str, column: str, prefix: str) -> np.ndarray:
+    by_length = _encode_needles((prefix,))
+    return _mask(table_name, column,
+                 lambda data, offsets, lengths: _match_chars(data, offsets, lengths, by_length, False))
+
+
+def string_contains(table_name: str, column: str, needle: str) -> np.ndarray:
+    return _mask(table_name, column, lambda data, offsets, lengths: _find_chars(data, offsets, lengths, needle))
+
+
+def _mask(table_name: str,
+          column: str,
+          predicate: typing.Callable[[typing.Any, np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
+    # the predicate sees each partition's mapped .d, .i offsets and char counts
+    table_info = TableInfo(table_name)
+    col_idx = column_idx(table_info, column)
+    if table_info.column_type(col_idx) is not ColumnTypes.STRING:
+        raise ValueError(f'column [{column}] is not a STRING')
+    masks = [np.zeros(0, dtype=bool)]
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        if p_row_count:
+            data = map_file(p_folder / f'{column}.d')
+            offsets = np.frombuffer(map_file(p_folder / f'{column}.i', p_row_count * 8), dtype=np.int64)
+            masks.append(predicate(data, offsets, string_lengths(data, offsets)))
+    return np.concatenate(masks)
+
+
+def _encode_needles(needles: typing.Iterable[str]) -> typing.Dict[int, np.ndarray]:
+    # needles as (needle count, length) UTF-16 code unit arrays by length, encoded once
+    # for all partitions
+    by_length = {}
+    for needle in needles:
+        encoded = np.frombuffer(needle.encode('utf-16-le'), dtype=np.uint16)
+        by_length.setdefault(len(encoded), []).append(encoded)
+    return {length: np.stack(encoded) for length, encoded in by_length.items()}
+
+
+def _match_chars(data, offsets: np.ndarray, lengths: np.ndarray,
+                 by_length: typing.Dict[int, np.ndarray], whole: bool) -> np.ndarray:
+    # rows whose chars are, or whole=False start with, one of the needles. Rows of each
+    # needle length are gathered as UTF-16 code units and matched with np.isin.
+    mask = np.zeros(len(offsets), dtype=bool)
+    chars = np.frombuffer(data, dtype=np.uint16, count=len(data) // 2)
+    for length, encoded in by_length.items():
+        rows = np.flatnonzero(lengths == length if whole else lengths >= length)
+        if length == 0:
+            mask[rows] = True
+            continue
+        targets = encoded.view(f'V{length * 2}').ravel()
+        char_idx = np.arange(length)
+        chunk_rows = max(COMPARE_CHUNK_CHARS // length, 1)
+        for chunk_start in range(0, len(rows), chunk_rows):
+            chunk = rows[chunk_start:chunk_start + chunk_rows]
+            # chars start after the int32 length, offsets are even
+            row_chars = chars[(offsets[chunk] + 4)[:, None] // 2 + char_idx]
+            mask[chunk[np.isin(row_chars.view(f'V{length * 2}').ravel(), targets)]] = True
+    return mask
+
+
+def _find_chars(data, offsets: np.ndarray, lengths: np.ndarray, needle: str) -> np.ndarray:
+    # rows containing needle: the raw .d is searched for the encoded needle and each hit
+    # is kept when it lies within one row's chars, on a char boundary
+    mask = np.zeros(len(offsets), dtype=bool)
+    if not needle:
+        mask[lengths != STRING_NULL_LENGTH] = True
+        return mask
+    if not len(offsets):
+        return mask
+    encoded = needle.encode('utf-16-le')
+    end = int(offsets[-1]) + 4 + max(int(lengths[-1]), 0) * 2
+    if len(encoded) == 2:
+        # a single code unit is compared over the whole file, hits are char aligned
+        start = int(offsets[0])
+        chars = np.frombuffer(data, dtype=np.uint16, count=(end - start) // 2, offset=start)
+        positions = np.flatnonzero(chars == np.frombuffer(encoded, dtype=np.uint16)[0]) * 2 + start
+    else:
+        positions = [match.start() for match in re.compile(re.escape(encoded)).finditer(data, int(offsets[0]), end)]
+        # entries start at even offsets, so do chars. Hits are not overlapping, an odd one may
+        # hide a char aligned hit starting within it.
+        for position in [position for position in positions if position % 2]:
+            hidden = data.find(encoded, position + 1, min(position + 2 * len(encoded) - 1, end))
+            while hidden != -1:
+                positions.append(hidden)
+                hidden = data.find(encoded, hidden + 1, min(position + 2 * len(encoded) - 1, end))
+        positions = np.array(positions, dtype=np.int64)
+    rows = np.searchsorted(offsets, positions, side='right') - 1
+    chars_start = offsets[rows] + 4
+    inside = (positions >= chars_start) & (positions + len(encoded) <= chars_start + np.maximum(lengths[rows], 0) * 2)
+    mask[rows[inside & (positions % 2 == 0)]] = True
+    return mask
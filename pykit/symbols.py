@@ -0,0 +1,176 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+from pykit.core import TableInfo
+from pykit.columns import (
+    symbol_key,
+    column_idx,
+    map_file,
+    partition_in_range,
+    partition_row_range,
+    symbol_idx,
+    INT_NULL
+)
+from pykit.dataframe import df_from_partition_rows
+from pykit.types import ColumnTypes
+
+# bitmap index key file: header fields and key entries of value count, first and
+# last value block offsets and a count check, values are partition row ids
+INDEX_KEY_HEADER_SIZE = 64
+INDEX_BLOCK_VALUE_COUNT_OFFSET = 17
+INDEX_KEY_COUNT_OFFSET = 21
+INDEX_KEY_ENTRY_SIZE = 32
+
+# rows in latest_by's first backward chunk of each partition, doubling after
+LATEST_BY_CHUNK_ROWS = 4096
+
+
+def rows_for_symbol(table_name: str,
+                    column: str,
+                    value: typing.Optional[str],
+                    ts_from: int = None,
+                    ts_to: int = None) -> np.ndarray:
+    # ascending table row ids where SYMBOL column equals value (None for null), and the
+    # designated timestamp is in [ts_from, ts_to), read from the column's bitmap index
+    table_info = TableInfo(table_name)
+    row_ids = [first_row + p_rows for _, first_row, p_rows in _indexed_rows(table_info, column, value, ts_from, ts_to)]
+    return np.concatenate([np.zeros(0, dtype=np.int64)] + row_ids)
+
+
+def df_for_symbol(table_name: str,
+                  column: str,
+                  value: typing.Optional[str],
+                  columns: typing.Sequence[str] = None,
+                  ts_from: int = None,
+                  ts_to: int = None) -> pd.DataFrame:
+    # rows_for_symbol as a frame indexed like read_table, columns are only read at the
+    # matching rows
+    table_info = TableInfo(table_name)
+    return df_from_partition_rows(table_info, columns, list(_indexed_rows(table_info, column, value, ts_from, ts_to)))
+
+
+def latest_by(table_name: str,
+              symbol_column: str,
+              columns: typing.Sequence[str] = None) -> pd.DataFrame:
+    # last row of each value of a SYMBOL column, in table order and indexed like read_table.
+    # Partitions are scanned newest first, backwards in growing chunks, until every
+    # value in the committed symbol table has been seen. Rows with a null value are
+    # left out, finding the last of them could mean reading the whole table.
+    table_info = TableInfo(table_name)
+    col_idx = column_idx(table_info, symbol_column)
+    if table_info.column_type(col_idx) is not ColumnTypes.SYMBOL:
+        raise ValueError(f'column [{symbol_column}] is not a SYMBOL')
+    symbol_count = table_info.transaction.symbol_value_counts[symbol_idx(table_info, col_idx)]
+    # key + 1, so that null is 0 and counts as seen from the start
+    seen = np.zeros(symbol_count + 1, dtype=bool)
+    seen[0] = True
+    seen_count = 0
+    partition_rows = []
+    first_rows = np.cumsum([0] + [table_info.partition_info(p_id)[1] for p_id in range(table_info.partitions_count)])
+    for p_id in range(table_info.partitions_count - 1, -1, -1):
+        if seen_count == symbol_count:
+            break
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        if not p_row_count:
+            continue
+        keys = np.frombuffer(map_file(p_folder / f'{symbol_column}.d', p_row_count * 4), dtype=np.int32)
+        p_rows = []
+        chunk_end, chunk_size = p_row_count, LATEST_BY_CHUNK_ROWS
+        while chunk_end > 0 and seen_count < symbol_count:
+            chunk_start = max(chunk_end - chunk_size, 0)
+            chunk_keys = np.where(keys[chunk_start:chunk_end] == INT_NULL, -1, keys[chunk_start:chunk_end])[::-1] + 1
+            # only rows of keys not seen yet, the first occurrence in the reversed chunk is
+            # the last row of each key
+            unseen_idx = np.flatnonzero(~seen[chunk_keys])
+            unique_keys, first_idx = np.unique(chunk_keys[unseen_idx], return_index=True)
+            seen[unique_keys] = True
+            seen_count += len(unique_keys)
+            p_rows.append(chunk_end - 1 - unseen_idx[first_idx])
+            chunk_end, chunk_size = chunk_start, chunk_size * 2
+        p_rows = np.sort(np.concatenate(p_rows))
+        if len(p_rows):
+            partition_rows.append((p_id, int(first_rows[p_id]), p_rows))
+    partition_rows.reverse()
+    return df_from_partition_rows(table_info, columns, partition_rows)
+
+
+def _indexed_rows(table_info: TableInfo,
+                  column: str,
+                  value: typing.Optional[str],
+                  ts_from: int,
+                  ts_to: int) -> typing.Iterator[typing.Tuple[int, int, np.ndarray]]:
+    # p_id, table row of the partition's first row, and partition row ids
+    col_idx = column_idx(table_info, column)
+    if table_info.column_type(col_idx) is not ColumnTypes.SYMBOL:
+        raise ValueError(f'column [{column}] is not a SYMBOL')
+    if value is None:
+        key = 0
+    else:
+        key = symbol_key(table_info, col_idx, value)
+        if key is None:
+            return
+        key += 1
+    first_row = 0
+    for p_id in range(table_info.partitions_count):
+        p_folder, p_row_count = table_info.partition_info(p_id)
+        p_first_row, first_row = first_row, first_row + p_row_count
+        if not p_row_count or not partition_in_range(table_info, p_id, ts_from, ts_to):
+            continue
+        key_file = p_folder / f'{column}.k'
+        if not key_file.exists():
+            raise ValueError(f'column [{column}] is not indexed')
+        p_rows = _index_values(key_file, p_folder / f'{column}.v', key)
+        p_rows = p_rows[p_rows < p_row_count]
+        if ts_from is not None or ts_to is not None:
+            lo, hi = partition_row_range(table_info, p_folder, p_row_count, ts_from, ts_to)
+            p_rows = p_rows[np.searchsorted(p_rows, lo):np.searchsorted(p_rows, hi)]
+        if len(p_rows):
+            yield p_id, p_first_row, p_rows
+
+
+def _index_values(key_file, value_file, key: int) -> np.ndarray:
+    key_mmap = map_file(key_file)
+    header = np.frombuffer(key_mmap, dtype=np.uint8, count=INDEX_KEY_HEADER_SIZE)
+    block_value_count = int(header[INDEX_BLOCK_VALUE_COUNT_OFFSET:INDEX_BLOCK_VALUE_COUNT_OFFSET + 4].view(np.int32)[0])
+    key_count = int(header[INDEX_KEY_COUNT_OFFSET:INDEX_KEY_COUNT_OFFSET + 4].view(np.int32)[0])
+    if key >= key_count:
+        return np.zeros(0, dtype=np.int64)
+    value_count, block_offset = np.frombuffer(
+        key_mmap, dtype=np.int64, count=2, offset=INDEX_KEY_HEADER_SIZE + key * INDEX_KEY_ENTRY_SIZE).tolist()
+    values = np.empty(value_count, dtype=np.int64)
+    if value_count:
+        # blocks of block_value_count row ids followed by the previous and next block offsets
+        blocks = np.frombuffer(map_file(value_file), dtype=np.int64)
+        filled = 0
+        while filled < value_count:
+            block_start = block_offset // 8
+            block_values = min(block_value_count, value_count - filled)
+            values[filled:filled + block_values] = blocks[block_start:block_start + block_values]
+            filled += block_values
+            block_offset = int(blocks[block_start + block_value_count + 1])
+    return values
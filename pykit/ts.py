@@ -21,13 +21,35 @@
 #  limitations under the License.
 #
 
-from datetime import datetime as dt
+from datetime import datetime as dt, timedelta
+import functools
+import re
+import time
+import typing
 
+import numpy as np
+import pandas as pd
 import pytz
 
 TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
 DATE_FORMAT_DAY = '%Y-%m-%d'
 
+# QuestDB's TIMESTAMP null
+LONG_NULL = np.iinfo(np.int64).min
+
+MICROS_PER_DAY = 86_400_000_000
+
+_EPOCH = dt(1970, 1, 1, tzinfo=pytz.utc)
+_ONE_MICRO = timedelta(microseconds=1)
+
+# character layout of the fixed formats: (position, width) of year, month, day, hour,
+# minute, second and micros, and (position, separator) of the rest
+_FIXED_LAYOUTS = {
+    TIMESTAMP_FORMAT: (26, ((0, 4), (5, 2), (8, 2), (11, 2), (14, 2), (17, 2), (20, 6)),
+                       ((4, '-'), (7, '-'), (10, ' '), (13, ':'), (16, ':'), (19, '.'))),
+    DATE_FORMAT_DAY: (10, ((0, 4), (5, 2), (8, 2)), ((4, '-'), (7, '-')))
+}
+
 
 def to_date(date_value: str) -> int:
     return to_timestamp(date_value, DATE_FORMAT_DAY)
@@ -38,14 +60,316 @@ def from_date(date_micros: int) -> str:
 
 
 def now_utc() -> int:
-    return int(dt.utcnow().timestamp() * 1e6)
+    return time.time_ns() // 1000
 
 
 def to_timestamp(timestamp_value: str, timestamp_format: str = TIMESTAMP_FORMAT) -> int:
-    timestamp = dt.strptime(timestamp_value, timestamp_format)
-    timestamp = pytz.utc.localize(timestamp, is_dst=None).astimezone(pytz.utc)
-    return int(timestamp.timestamp() * 1e6)
+    pattern = _FIXED_PATTERNS.get(timestamp_format)
+    if pattern is not None and (match := pattern.match(timestamp_value)) is not None:
+        micros = _micros_scalar(*map(int, match.groups()))
+    elif (compiled := _compile_format(timestamp_format)) is not None:
+        micros = _parse_compiled(timestamp_value, compiled)
+    else:
+        timestamp = dt.strptime(timestamp_value, timestamp_format)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=pytz.utc)
+        return (timestamp - _EPOCH) // _ONE_MICRO
+    if micros is None:
+        raise ValueError(f'time data {timestamp_value!r} does not match format {timestamp_format!r}')
+    return micros
 
 
 def from_timestamp(timestamp_micros: int, timestamp_format: str = TIMESTAMP_FORMAT) -> str:
-    return dt.fromtimestamp(timestamp_micros / 1e6, pytz.utc).strftime(timestamp_format)
+    compiled = _compile_format(timestamp_format)
+    if compiled is None:
+        return (_EPOCH + timedelta(microseconds=timestamp_micros)).strftime(timestamp_format)
+    days, micros_of_day = divmod(timestamp_micros, MICROS_PER_DAY)
+    year, month, day = _civil_from_days(days)
+    seconds, fraction = divmod(micros_of_day, 1_000_000)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return compiled.template.format(year, month, day, hour, minute, second, fraction)
+
+
+def to_timestamps(timestamp_values: typing.Sequence[str], timestamp_format: str = TIMESTAMP_FORMAT) -> np.ndarray:
+    # to_timestamp over a whole column, epoch micros as int64. TIMESTAMP_FORMAT and
+    # DATE_FORMAT_DAY are parsed straight from the character codes with integer date
+    # arithmetic, other formats, and values of other lengths, through pandas.
+    values = np.asarray(timestamp_values)
+    layout = _FIXED_LAYOUTS.get(timestamp_format)
+    if layout is not None and values.dtype.kind in 'US' and values.size:
+        width = layout[0]
+        char_dtype = np.uint32 if values.dtype.kind == 'U' else np.uint8
+        if values.dtype.itemsize == width * np.dtype(char_dtype).itemsize:
+            chars = np.ascontiguousarray(values).view(char_dtype).reshape(values.shape + (width,))
+            if chars[..., width - 1].all():
+                return _parse_fixed(values, chars, layout)
+    parsed = pd.to_datetime(pd.Series(values.ravel(), dtype=object), format=timestamp_format, exact=True)
+    micros = parsed.values.astype('datetime64[us]').view(np.int64)
+    return micros.reshape(values.shape)
+
+
+def from_timestamps(timestamp_micros: np.ndarray, timestamp_format: str = TIMESTAMP_FORMAT) -> np.ndarray:
+    # from_timestamp over a whole column, a str array, LONG_NULL becomes ''. TIMESTAMP_FORMAT
+    # and DATE_FORMAT_DAY are written as character codes, other formats go through pandas.
+    micros = np.asarray(timestamp_micros, dtype=np.int64)
+    nulls = micros == LONG_NULL
+    layout = _FIXED_LAYOUTS.get(timestamp_format)
+    if layout is not None:
+        return _format_fixed(micros, nulls, layout)
+    formatted = pd.to_datetime(np.where(nulls, 0, micros).ravel(), unit='us').strftime(timestamp_format)
+    result = np.asarray(formatted, dtype=str)
+    result[nulls.ravel()] = ''
+    return result.reshape(micros.shape)
+
+
+def utc_to_local(timestamp_micros: np.ndarray, tz_name: str, out: np.ndarray = None) -> np.ndarray:
+    # epoch micros to tz_name wall-clock micros in one searchsorted over the zone's
+    # transition table, LONG_NULL stays null. out may be the input to convert in place.
+    micros = np.asarray(timestamp_micros, dtype=np.int64)
+    transitions, offsets = _tz_transitions(tz_name)
+    return _apply_offsets(micros, transitions, offsets, 1, out)
+
+
+def local_to_utc(local_micros: np.ndarray, tz_name: str, out: np.ndarray = None) -> np.ndarray:
+    # inverse of utc_to_local. Like pytz's localize(is_dst=False), wall-clock times repeated
+    # when clocks go back take the later offset, and those skipped when they go forward
+    # the earlier one.
+    micros = np.asarray(local_micros, dtype=np.int64)
+    transitions, offsets = _tz_transitions(tz_name)
+    # the LONG_NULL sentinel at index 0 stays unshifted, so the table stays sorted
+    local_transitions = transitions.copy()
+    local_transitions[1:] += offsets[1:]
+    return _apply_offsets(micros, local_transitions, offsets, -1, out)
+
+
+@functools.lru_cache(maxsize=32)
+def _tz_transitions(tz_name: str) -> typing.Tuple[np.ndarray, np.ndarray]:
+    # UTC micros at which each offset starts, and the offsets in micros
+    tz = pytz.timezone(tz_name)
+    if not hasattr(tz, '_utc_transition_times'):
+        offset = tz.utcoffset(dt(1970, 1, 1)) // _ONE_MICRO
+        return np.array([LONG_NULL], dtype=np.int64), np.array([offset], dtype=np.int64)
+    naive_epoch = _EPOCH.replace(tzinfo=None)
+    transitions = np.array([(start - naive_epoch) // _ONE_MICRO for start in tz._utc_transition_times], dtype=np.int64)
+    offsets = np.array([offset // _ONE_MICRO for offset, _, _ in tz._transition_info], dtype=np.int64)
+    # the first offset applies from the beginning of time
+    transitions[0] = LONG_NULL
+    return transitions, offsets
+
+
+def _apply_offsets(micros: np.ndarray, transitions: np.ndarray, offsets: np.ndarray,
+                   sign: int, out: np.ndarray) -> np.ndarray:
+    nulls = micros == LONG_NULL
+    has_nulls = nulls.any()
+    values = micros[~nulls] if has_nulls else micros
+    if values.size:
+        # only the transitions within the range of the values
+        first = np.searchsorted(transitions, values.min(), side='right') - 1
+        last = np.searchsorted(transitions, values.max(), side='right')
+    else:
+        first, last = 0, 1
+    if last - first == 1:
+        shift = offsets[first] * sign
+    else:
+        shift = offsets[first:last][np.searchsorted(transitions[first + 1:last], micros, side='right')]
+        if sign < 0:
+            np.negative(shift, out=shift)
+    result = np.add(micros, shift, out=out)
+    if has_nulls:
+        result[nulls] = LONG_NULL
+    return result
+
+
+def _parse_fixed(values: np.ndarray, chars: np.ndarray, layout: typing.Tuple) -> np.ndarray:
+    width, fields, separators = layout
+    valid = np.ones(values.shape, dtype=bool)
+    for position, separator in separators:
+        valid &= chars[..., position] == ord(separator)
+    numbers = []
+    for position, field_width in fields:
+        number = np.zeros(values.shape, dtype=np.int32)
+        for digit_position in range(position, position + field_width):
+            digit = chars[..., digit_position] - chars.dtype.type(ord('0'))  # non digits wrap above 9
+            valid &= digit <= 9
+            number *= 10
+            number += digit
+        numbers.append(number)
+    year, month, day = (number.astype(np.int64) for number in numbers[:3])
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= _days_in_month(year, np.clip(month, 1, 12)))
+    micros = _days_from_civil(year, month, day) * MICROS_PER_DAY
+    if len(numbers) > 3:
+        hour, minute, second, fraction = numbers[3:]
+        valid &= (hour < 24) & (minute < 60) & (second < 60)
+        micros += ((hour * 60 + minute) * 60 + second).astype(np.int64) * 1_000_000 + fraction
+    if not valid.all():
+        bad_value = values[~valid].ravel()[0]
+        raise ValueError(f'time data {bad_value!r} does not match format')
+    return micros
+
+
+def _format_fixed(micros: np.ndarray, nulls: np.ndarray, layout: typing.Tuple) -> np.ndarray:
+    width, fields, separators = layout
+    micros = np.where(nulls, 0, micros)
+    days = micros // MICROS_PER_DAY
+    year, month, day = (number.astype(np.int32) for number in _civil_from_days(days))
+    if ((year < 0) | (year > 9999)).any():
+        raise ValueError('year out of range for the format [0, 9999]')
+    numbers = [year, month, day]
+    if len(fields) > 3:
+        seconds, fraction = np.divmod((micros - days * MICROS_PER_DAY), 1_000_000)
+        seconds = seconds.astype(np.int32)
+        numbers += [seconds // 3600, seconds // 60 % 60, seconds % 60, fraction.astype(np.int32)]
+    # each field is written as little-endian packed ASCII digits, 4 or 2 at a time,
+    # through a record view over the output bytes
+    records = np.empty(micros.shape, dtype=_record_dtype(layout))
+    for position, separator in separators:
+        records[f's{position}'] = ord(separator)
+    for (position, field_width), number in zip(fields, numbers):
+        for chunk_position, chunk_width in reversed(_digit_chunks(position, field_width)):
+            number, chunk = np.divmod(number, 10 ** chunk_width)
+            records[f'd{chunk_position}'] = _ascii_digits(chunk, chunk_width)
+    chars = records.view(np.uint8).reshape(micros.shape + (width,))
+    chars[nulls] = 0
+    return chars.astype(np.uint32).view(f'U{width}').reshape(micros.shape)
+
+
+def _digit_chunks(position: int, field_width: int) -> typing.List[typing.Tuple[int, int]]:
+    chunks = []
+    while field_width:
+        chunk_width = 4 if field_width >= 4 else 2
+        chunks.append((position, chunk_width))
+        position += chunk_width
+        field_width -= chunk_width
+    return chunks
+
+
+_RECORD_DTYPES = {}
+
+
+def _record_dtype(layout: typing.Tuple) -> np.dtype:
+    record_dtype = _RECORD_DTYPES.get(layout)
+    if record_dtype is None:
+        width, fields, separators = layout
+        names, formats, offsets = [], [], []
+        for position, _ in separators:
+            names.append(f's{position}')
+            formats.append(np.uint8)
+            offsets.append(position)
+        for position, field_width in fields:
+            for chunk_position, chunk_width in _digit_chunks(position, field_width):
+                names.append(f'd{chunk_position}')
+                formats.append('<u4' if chunk_width == 4 else '<u2')
+                offsets.append(chunk_position)
+        record_dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': width})
+        _RECORD_DTYPES[layout] = record_dtype
+    return record_dtype
+
+
+def _ascii_digits(number: np.ndarray, width: int) -> np.ndarray:
+    # the leftmost digit goes in the lowest byte
+    packed = np.zeros(number.shape, dtype=np.uint32)
+    for shift in range(8 * (width - 1), -8, -8):
+        number, digit = np.divmod(number, 10)
+        packed |= (digit.astype(np.uint32) + ord('0')) << shift
+    return packed
+
+
+def _days_from_civil(year, month, day):
+    # days since 1970-01-01 of proleptic Gregorian dates, H. Hinnant's algorithm,
+    # for ints and int arrays alike
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(days):
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_from_march = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_from_march + 2) // 5 + 1
+    month = (month_from_march + 2) % 12 + 1
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def _days_in_month(year: np.ndarray, month: np.ndarray) -> np.ndarray:
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return np.array(_DAYS_IN_MONTH)[month] + ((month == 2) & leap)
+
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _micros_scalar(year: int, month: int, day: int,
+                   hour: int = 0, minute: int = 0, second: int = 0, fraction: int = 0) -> typing.Optional[int]:
+    # None for out of range fields
+    if not 1 <= month <= 12 or hour > 23 or minute > 59 or second > 59:
+        return None
+    leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if not 1 <= day <= _DAYS_IN_MONTH[month] + leap:
+        return None
+    return _days_from_civil(year, month, day) * MICROS_PER_DAY + ((hour * 60 + minute) * 60 + second) * 1_000_000 + fraction
+
+
+def _fixed_pattern(layout: typing.Tuple) -> typing.Pattern:
+    _, fields, separators = layout
+    parts = [(position, f'(\\d{{{field_width}}})') for position, field_width in fields]
+    parts += [(position, re.escape(separator)) for position, separator in separators]
+    return re.compile(''.join(part for _, part in sorted(parts)) + r'\Z', re.ASCII)
+
+
+_FIXED_PATTERNS = {timestamp_format: _fixed_pattern(layout) for timestamp_format, layout in _FIXED_LAYOUTS.items()}
+
+
+class _CompiledFormat(typing.NamedTuple):
+    pattern: typing.Pattern
+    directives: typing.Tuple[str, ...]
+    template: str
+
+
+# strptime patterns and str.format fields of the directives with an integer fast path,
+# template arguments are year, month, day, hour, minute, second, micros
+_DIRECTIVES = {
+    'Y': (r'(\d{4})', '{0:04d}'),
+    'm': (r'(\d{1,2})', '{1:02d}'),
+    'd': (r'(\d{1,2})', '{2:02d}'),
+    'H': (r'(\d{1,2})', '{3:02d}'),
+    'M': (r'(\d{1,2})', '{4:02d}'),
+    'S': (r'(\d{1,2})', '{5:02d}'),
+    'f': (r'(\d{1,6})', '{6:06d}')
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_format(timestamp_format: str) -> typing.Optional[_CompiledFormat]:
+    # None when the format uses a directive without a fast path
+    pattern, directives, template = [], [], []
+    for literal, directive in re.findall(r'([^%]*)(%.?)?', timestamp_format):
+        pattern.append(r'\s+'.join(re.escape(part) for part in re.split(r'\s+', literal)))
+        template.append(literal.replace('{', '{{').replace('}', '}}'))
+        if directive == '%%':
+            pattern.append('%')
+            template.append('%')
+        elif directive:
+            if directive[1:] not in _DIRECTIVES or directive[1:] in directives:
+                return None
+            directives.append(directive[1:])
+            pattern.append(_DIRECTIVES[directive[1:]][0])
+            template.append(_DIRECTIVES[directive[1:]][1])
+    return _CompiledFormat(re.compile(''.join(pattern) + r'\Z', re.ASCII), tuple(directives), ''.join(template))
+
+
+def _parse_compiled(value: str, compiled: _CompiledFormat) -> typing.Optional[int]:
+    match = compiled.pattern.match(value)
+    if match is None:
+        return None
+    numbers = {'Y': 1900, 'm': 1, 'd': 1, 'H': 0, 'M': 0, 'S': 0, 'f': 0}
+    for directive, digits in zip(compiled.directives, match.groups()):
+        numbers[directive] = int(digits.ljust(6, '0')) if directive == 'f' else int(digits)
+    return _micros_scalar(*numbers.values())
@@ -129,13 +129,23 @@ class ColumnTypes:
         NULL
     )
 
+    __names = {col_type.type_name: col_type for col_type in __values}
+
     @staticmethod
     def resolve(type_id: int) -> ColumnType:
-        for col_type in ColumnTypes.__values:
-            if type_id == col_type.type_id:
-                return col_type
+        # __values position is the type id, geohash ids carry their bits above the low byte
+        type_tag = type_id & 0xFF
+        if type_tag < len(ColumnTypes.__values):
+            return ColumnTypes.__values[type_tag]
         return ColumnTypes.UNDEFINED
 
+    @staticmethod
+    def resolve_name(type_name: str) -> ColumnType:
+        col_type = ColumnTypes.__names.get(type_name.upper())
+        if col_type is None:
+            raise ValueError(f'unknown column type: {type_name.upper()}')
+        return col_type
+
 
 class NPArray(np.ndarray):
     def __new__(cls,
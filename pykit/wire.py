@@ -0,0 +1,560 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import hashlib
+import socket
+import struct
+import typing
+
+import numpy as np
+import pandas as pd
+
+from pykit.types import ColumnTypes
+
+# PostgreSQL type oids QuestDB sends in RowDescription, and the QuestDB type they carry
+PG_OID_TYPES = {
+    16: ColumnTypes.BOOLEAN,
+    17: ColumnTypes.BINARY,
+    18: ColumnTypes.CHAR,
+    20: ColumnTypes.LONG,
+    21: ColumnTypes.SHORT,
+    23: ColumnTypes.INT,
+    25: ColumnTypes.STRING,
+    700: ColumnTypes.FLOAT,
+    701: ColumnTypes.DOUBLE,
+    1043: ColumnTypes.STRING,
+    1082: ColumnTypes.DATE,
+    1114: ColumnTypes.TIMESTAMP,
+    1184: ColumnTypes.TIMESTAMP
+}
+
+# Binary format of fixed-width values, by oid
+PG_BINARY_DTYPES = {
+    16: np.dtype('?'),
+    20: np.dtype('>i8'),
+    21: np.dtype('>i2'),
+    23: np.dtype('>i4'),
+    700: np.dtype('>f4'),
+    701: np.dtype('>f8'),
+    1082: np.dtype('>i4'),
+    1114: np.dtype('>i8'),
+    1184: np.dtype('>i8')
+}
+
+# 2000-01-01, PostgreSQL's binary timestamp/date epoch, as unix epoch micros
+PG_EPOCH_MICROS = 946_684_800_000_000
+MICROS_PER_DAY = 86_400_000_000
+
+PROTOCOL_VERSION = 196608
+CANCEL_REQUEST_CODE = 80877102
+FORMAT_TEXT = 0
+FORMAT_BINARY = 1
+
+_RECV_SIZE = 1024 ** 2
+# statements written before reading their results back, so neither side blocks on a full socket
+PIPELINE_BATCH = 256
+_INT32 = struct.Struct('>i')
+
+
+class StatementResult(typing.NamedTuple):
+    sql: str
+    tag: typing.Optional[str]
+    error: typing.Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class WireError(Exception):
+    def __init__(self, fields: typing.Dict[str, str]):
+        super().__init__(fields.get('M', 'unknown error'))
+        self.fields = fields
+
+    @property
+    def code(self) -> str:
+        return self.fields.get('C')
+
+
+class _WireProtocol:
+    # Connection state and message framing shared by WireConnection and pykit.aio's
+    # AsyncWireConnection, which only differ in how bytes are sent and received
+
+    def __init__(self):
+        self.server_params = {}
+        self.backend_key = None
+        self._buf = bytearray()
+        self._pos = 0
+
+    def _send(self, *messages: bytes) -> None:
+        raise NotImplementedError
+
+    def _append(self, data: bytes) -> None:
+        if self._pos > _RECV_SIZE:
+            del self._buf[:self._pos]
+            self._pos = 0
+        self._buf += data
+
+    def _take_message(self) -> typing.Optional[typing.Tuple[bytes, bytes]]:
+        # next complete message in the buffer, None when more bytes are needed
+        if len(self._buf) - self._pos < 5:
+            return None
+        msg_len = struct.unpack_from('>i', self._buf, self._pos + 1)[0]
+        if len(self._buf) - self._pos < 1 + msg_len:
+            return None
+        msg_type = bytes(self._buf[self._pos:self._pos + 1])
+        payload = bytes(self._buf[self._pos + 5:self._pos + 1 + msg_len])
+        self._pos += 1 + msg_len
+        return msg_type, payload
+
+    def _feed_rows(self, decoder) -> bool:
+        # hands buffered DataRows to decoder, True when it stopped at an incomplete row
+        if decoder is None or self._pos >= len(self._buf) or self._buf[self._pos] != 0x44:
+            return False
+        self._pos = decoder.feed(self._buf, self._pos, len(self._buf))
+        return self._pos < len(self._buf) and self._buf[self._pos] == 0x44
+
+    def _on_startup_message(self, msg_type: bytes, payload: bytes, user: str, password: str) -> bool:
+        # returns True once the server is ready for queries
+        if msg_type == b'R':
+            reply = _auth_reply(payload, user, password)
+            if reply:
+                self._send(reply)
+        elif msg_type == b'S':
+            key, value = payload[:-1].split(b'\x00', 1)
+            self.server_params[key.decode('utf-8')] = value.decode('utf-8')
+        elif msg_type == b'K':
+            self.backend_key = payload[:8]
+        elif msg_type == b'E':
+            raise WireError(_error_fields(payload))
+        return msg_type == b'Z'
+
+
+class WireConnection(_WireProtocol):
+    # Minimal PostgreSQL wire protocol client, enough to run QuestDB queries through the extended
+    # protocol with binary results, which are decoded column-wise into NumPy arrays (see
+    # _ResultDecoder) instead of one Python object per cell. Parameters use $1, $2... and are
+    # sent in text format.
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: typing.Union[int, str] = 8812,
+                 user: str = 'admin',
+                 password: str = 'quest',
+                 database: str = 'qdb',
+                 connect_timeout: float = 10.0,
+                 **_unused_attrs):
+        super().__init__()
+        self._address = (host, int(port))
+        self._sock = socket.create_connection(self._address, timeout=connect_timeout)
+        try:
+            self._sock.settimeout(None)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._startup(user, password, database)
+        except BaseException:
+            self._sock.close()
+            raise
+
+    @property
+    def closed(self) -> bool:
+        return self._sock is None
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.sendall(b'X\x00\x00\x00\x04')
+            except OSError:
+                pass
+            finally:
+                self._sock.close()
+                self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def cancel(self, timeout: float = 10.0) -> None:
+        # asks the server, over a separate connection, to stop the running statement
+        if self.backend_key is not None:
+            with socket.create_connection(self._address, timeout=timeout) as cancel_sock:
+                cancel_sock.sendall(_cancel_message(self.backend_key))
+
+    def execute(self, sql: str) -> str:
+        # simple query protocol, returns the tag of the last command
+        self._send(_message(b'Q', _cstr(sql)))
+        tag = None
+        error = None
+        while True:
+            msg_type, payload = self._read_message()
+            if msg_type == b'C':
+                tag = payload[:-1].decode('utf-8')
+            elif msg_type == b'E':
+                error = WireError(_error_fields(payload))
+            elif msg_type == b'Z':
+                if error is not None:
+                    raise error
+                return tag
+
+    def pipeline(self, statements: typing.Sequence[str]) -> typing.List[StatementResult]:
+        # Runs statements back to back, each in its own implicit transaction (a Sync per
+        # statement), writing PIPELINE_BATCH of them before reading any result back. A failed
+        # statement is reported in its result and does not stop the following ones.
+        results = []
+        try:
+            for batch_start in range(0, len(statements), PIPELINE_BATCH):
+                batch = statements[batch_start:batch_start + PIPELINE_BATCH]
+                self._send(*(message for sql in batch for message in (
+                    _message(b'P', b'\x00' + _cstr(sql) + b'\x00\x00'),
+                    _bind_message(),
+                    _message(b'E', b'\x00\x00\x00\x00\x00'),
+                    _message(b'S'))))
+                for sql in batch:
+                    tag = None
+                    error = None
+                    while (message := self._read_message())[0] != b'Z':
+                        if message[0] == b'C':
+                            tag = message[1][:-1].decode('utf-8')
+                        elif message[0] == b'E':
+                            error = WireError(_error_fields(message[1]))
+                    results.append(StatementResult(sql, tag, error))
+        except OSError:
+            self.close()
+            raise
+        return results
+
+    def query_columns(self,
+                      sql: str,
+                      params: typing.Sequence[typing.Any] = None) -> typing.Dict[str, np.ndarray]:
+        for columns in self.iter_columns(sql, params, chunk_rows=0):
+            return columns
+
+    def query_df(self, sql: str, params: typing.Sequence[typing.Any] = None) -> pd.DataFrame:
+        return pd.DataFrame(self.query_columns(sql, params), copy=False)
+
+    def iter_columns(self,
+                     sql: str,
+                     params: typing.Sequence[typing.Any] = None,
+                     chunk_rows: int = 0) -> typing.Iterator[typing.Dict[str, np.ndarray]]:
+        # with chunk_rows > 0 the portal is executed chunk_rows at a time, so only one chunk
+        # is ever held client side; the first chunk is yielded even when the result is empty
+        execute = _message(b'E', b'\x00' + struct.pack('>i', chunk_rows))
+        end = _message(b'H') if chunk_rows else _message(b'S')
+        self._send(
+            _message(b'P', b'\x00' + _cstr(sql) + b'\x00\x00'),
+            _bind_message(params),
+            _message(b'D', b'P\x00'),
+            execute,
+            end)
+        synced = not chunk_rows
+        decoder = None
+        yielded = False
+        try:
+            while True:
+                if self._feed_rows(decoder) or (message := self._take_message()) is None:
+                    self._fill()
+                    continue
+                msg_type, payload = message
+                if msg_type == b'T':
+                    decoder = _ResultDecoder(_row_description(payload))
+                elif msg_type == b'n':
+                    decoder = _ResultDecoder([])
+                elif msg_type == b's':
+                    yielded = True
+                    yield decoder.finish()
+                    decoder = decoder.next_chunk()
+                    self._send(execute, end)
+                elif msg_type in (b'C', b'I'):
+                    if decoder is not None and (decoder.row_count or not yielded):
+                        yielded = True
+                        yield decoder.finish()
+                    if not synced:
+                        synced = True
+                        self._send(_message(b'S'))
+                elif msg_type == b'E':
+                    if not synced:
+                        synced = True
+                        self._send(_message(b'S'))
+                    self._read_until_ready()
+                    raise WireError(_error_fields(payload))
+                elif msg_type == b'Z':
+                    return
+        except GeneratorExit:
+            # abandoned mid-result: close the portal and drain, or give the connection up
+            try:
+                if not synced:
+                    self._send(_message(b'S'))
+                self._read_until_ready()
+            except OSError:
+                self.close()
+            raise
+        except OSError:
+            self.close()
+            raise
+
+    def _startup(self, user: str, password: str, database: str) -> None:
+        self._send(_startup_message(user, database))
+        while True:
+            msg_type, payload = self._read_message()
+            if self._on_startup_message(msg_type, payload, user, password):
+                return
+
+    def _read_until_ready(self) -> None:
+        while self._read_message()[0] != b'Z':
+            pass
+
+    def _send(self, *messages: bytes) -> None:
+        self._sock.sendall(b''.join(messages))
+
+    def _fill(self) -> None:
+        data = self._sock.recv(_RECV_SIZE)
+        if not data:
+            self.close()
+            raise ConnectionError('server closed the connection')
+        self._append(data)
+
+    def _read_message(self) -> typing.Tuple[bytes, bytes]:
+        while (message := self._take_message()) is None:
+            self._fill()
+        return message
+
+
+def connect(**conn_attrs) -> WireConnection:
+    # takes the same attributes as pgwire.CONN_ATTRS
+    return WireConnection(**conn_attrs)
+
+
+def unique_names(names: typing.Iterable[str]) -> typing.List[str]:
+    # result column names, repeats suffixed .1, .2... as pandas.read_csv does
+    unique = []
+    seen = set()
+    for name in names:
+        candidate = name
+        suffix = 0
+        while candidate in seen:
+            suffix += 1
+            candidate = f'{name}.{suffix}'
+        seen.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+class _ResultDecoder:
+    # Accumulates DataRow messages into one array per column. When every column is fixed-width,
+    # runs of rows without nulls have identical layout and are viewed as a structured array
+    # straight over the receive buffer. Other rows are located one message at a time, then
+    # decoded a column at a time for all of them: value lengths and fixed-width values are
+    # gathered with fancy indexing, only strings cost Python work per cell. Nulls become the
+    # QuestDB null of the type.
+
+    def __init__(self, fields: typing.List[typing.Tuple[str, int]]):
+        self.fields = fields
+        self.row_count = 0
+        self._col_types = [PG_OID_TYPES.get(oid, ColumnTypes.UNDEFINED) for _, oid in fields]
+        self._chunks = [[] for _ in fields]
+        self._row_dtype = None
+        if fields and all(oid in PG_BINARY_DTYPES for _, oid in fields):
+            row_fields = [('type', 'S1'), ('len', '>i4'), ('ncols', '>i2')]
+            for idx, (_, oid) in enumerate(fields):
+                row_fields.append((f'l{idx}', '>i4'))
+                row_fields.append((f'v{idx}', PG_BINARY_DTYPES[oid]))
+            self._row_dtype = np.dtype(row_fields)
+
+    def next_chunk(self):
+        return _ResultDecoder(self.fields)
+
+    def feed(self, buf: bytearray, pos: int, end: int) -> int:
+        # consumes complete DataRow messages from pos, returns where it stopped
+        while pos < end and buf[pos] == 0x44:
+            if self._row_dtype is not None and (pos := self._feed_fixed(buf, pos, end)) >= end:
+                break
+            starts = []
+            while pos + 5 <= end and buf[pos] == 0x44:
+                msg_end = pos + 1 + _INT32.unpack_from(buf, pos + 1)[0]
+                if msg_end > end:
+                    break
+                starts.append(pos)
+                pos = msg_end
+                if self._row_dtype is not None and msg_end - starts[-1] == self._row_dtype.itemsize:
+                    # back to the structured view after rows with nulls
+                    break
+            if not starts:
+                break
+            self._decode_rows(buf, np.array(starts, dtype=np.int64))
+        return pos
+
+    def finish(self) -> typing.Dict[str, np.ndarray]:
+        columns = {}
+        for idx, name in enumerate(unique_names(name for name, _ in self.fields)):
+            chunks = self._chunks[idx]
+            if len(chunks) == 1:
+                columns[name] = chunks[0]
+            elif chunks:
+                columns[name] = np.concatenate(chunks)
+            else:
+                columns[name] = np.empty(0, dtype=self._output_dtype(idx))
+        return columns
+
+    def _feed_fixed(self, buf: bytearray, pos: int, end: int) -> int:
+        row_size = self._row_dtype.itemsize
+        count = (end - pos) // row_size
+        if not count:
+            return pos
+        rows = np.frombuffer(buf, dtype=self._row_dtype, count=count, offset=pos)
+        valid = (rows['type'] == b'D') & (rows['len'] == row_size - 1)
+        for idx, (_, oid) in enumerate(self.fields):
+            valid &= rows[f'l{idx}'] == PG_BINARY_DTYPES[oid].itemsize
+        valid_count = count if valid.all() else int(np.argmin(valid))
+        if valid_count:
+            for idx in range(len(self.fields)):
+                self._chunks[idx].append(self._convert(idx, rows[f'v{idx}'][:valid_count]))
+            self.row_count += valid_count
+        del rows
+        return pos + valid_count * row_size
+
+    def _decode_rows(self, buf: bytearray, starts: np.ndarray) -> None:
+        data = np.frombuffer(buf, dtype=np.uint8)
+        last = len(data) - 1
+        offsets = starts + 7  # past type, length and column count
+        for idx, (_, oid) in enumerate(self.fields):
+            lengths = _gather(data, offsets, 4, last).view('>i4').ravel().astype(np.int64)
+            nulls = lengths < 0
+            if oid in PG_BINARY_DTYPES:
+                value_dtype = PG_BINARY_DTYPES[oid]
+                values = self._convert(idx, _gather(data, offsets + 4, value_dtype.itemsize, last).view(value_dtype).ravel())
+                if nulls.any():
+                    values[nulls] = _null_value(values.dtype.type)
+            else:
+                values = np.empty(len(starts), dtype=object)
+                decode = bytes if oid == 17 else _decode_utf8
+                values[:] = [None if value_len < 0 else decode(buf[value_start:value_start + value_len])
+                             for value_start, value_len in zip((offsets + 4).tolist(), lengths.tolist())]
+            self._chunks[idx].append(values)
+            offsets = offsets + 4 + np.maximum(lengths, 0)
+        del data
+        self.row_count += len(starts)
+
+    def _output_dtype(self, idx: int) -> np.dtype:
+        oid = self.fields[idx][1]
+        return self._col_types[idx].dtype.type if oid in PG_BINARY_DTYPES else object
+
+    def _convert(self, idx: int, values: np.ndarray) -> np.ndarray:
+        # big-endian wire values to native pykit values, always a copy
+        oid = self.fields[idx][1]
+        if oid in (1114, 1184):
+            return values.astype(np.int64) + PG_EPOCH_MICROS
+        if oid == 1082:
+            return (values.astype(np.int64) * MICROS_PER_DAY + PG_EPOCH_MICROS) // 1000
+        return values.astype(self._col_types[idx].dtype.type)
+
+
+def _gather(data: np.ndarray, offsets: np.ndarray, width: int, last: int) -> np.ndarray:
+    # (len(offsets), width) bytes from data; offsets of null values may point past the end
+    return data[np.minimum(offsets[:, None] + np.arange(width), last)]
+
+
+def _decode_utf8(value: bytearray) -> str:
+    return value.decode('utf-8')
+
+
+def _null_value(dtype: type) -> typing.Any:
+    if np.issubdtype(dtype, np.floating):
+        return np.nan
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).min
+    return False
+
+
+def _startup_message(user: str, database: str) -> bytes:
+    params = b''.join(_cstr(key) + _cstr(value) for key, value in (
+        ('user', user), ('database', database), ('client_encoding', 'UTF8'))) + b'\x00'
+    return struct.pack('>ii', 8 + len(params), PROTOCOL_VERSION) + params
+
+
+def _auth_reply(payload: bytes, user: str, password: str) -> typing.Optional[bytes]:
+    auth_code = struct.unpack_from('>i', payload)[0]
+    if auth_code == 0:
+        return None
+    if auth_code == 3:
+        return _message(b'p', _cstr(password))
+    if auth_code == 5:
+        inner = hashlib.md5((password + user).encode('utf-8')).hexdigest().encode('ascii')
+        return _message(b'p', _cstr(f'md5{hashlib.md5(inner + payload[4:8]).hexdigest()}'))
+    raise WireError({'M': f'unsupported authentication method: {auth_code}'})
+
+
+def _cancel_message(backend_key: bytes) -> bytes:
+    return struct.pack('>ii', 16, CANCEL_REQUEST_CODE) + backend_key
+
+
+def _row_description(payload: bytes) -> typing.List[typing.Tuple[str, int]]:
+    fields = []
+    pos = 2
+    for _ in range(struct.unpack_from('>h', payload)[0]):
+        name_end = payload.index(b'\x00', pos)
+        name = payload[pos:name_end].decode('utf-8')
+        oid = struct.unpack_from('>i', payload, name_end + 7)[0]
+        fields.append((name, oid))
+        pos = name_end + 19
+    return fields
+
+
+def _error_fields(payload: bytes) -> typing.Dict[str, str]:
+    fields = {}
+    for field in payload.split(b'\x00'):
+        if field:
+            fields[chr(field[0])] = field[1:].decode('utf-8', errors='replace')
+    return fields
+
+
+def _bind_message(params: typing.Sequence[typing.Any] = None) -> bytes:
+    body = [b'\x00\x00\x00\x00', struct.pack('>h', len(params or ()))]
+    for param in params or ():
+        value = _encode_param(param)
+        if value is None:
+            body.append(struct.pack('>i', -1))
+        else:
+            body.append(struct.pack('>i', len(value)) + value)
+    body.append(struct.pack('>hh', 1, FORMAT_BINARY))
+    return _message(b'B', b''.join(body))
+
+
+def _encode_param(param: typing.Any) -> typing.Optional[bytes]:
+    if param is None:
+        return None
+    if isinstance(param, bool):
+        return b'true' if param else b'false'
+    if isinstance(param, bytes):
+        return param
+    if hasattr(param, 'isoformat'):
+        return param.isoformat().encode('utf-8')
+    return str(param).encode('utf-8')
+
+
+def _message(msg_type: bytes, payload: bytes = b'') -> bytes:
+    return msg_type + struct.pack('>i', 4 + len(payload)) + payload
+
+
+def _cstr(value: str) -> bytes:
+    return value.encode('utf-8') + b'\x00'
@@ -30,7 +30,7 @@ setup(
     author="QuestDB community",
     author_email="miguel@questdb.io",
     url="https://github.com/questdb/pykit",
-    packages=["pykit", "examples", "tests"],
+    packages=["pykit", "examples", "benchmarks", "tests"],
     license="Apache License v2.0",
     classifiers=[
         "Programming Language :: Python :: 3.9",
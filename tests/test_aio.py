@@ -0,0 +1,151 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import asyncio
+import struct
+import unittest
+
+from pykit import (
+    AsyncWireConnection,
+    AsyncConnectionPool,
+    PoolTimeoutError,
+    WireError
+)
+from pykit.wire import _message
+from tests.test_wire import (
+    data_row,
+    row_description
+)
+
+
+class ScriptedServer:
+    # answers 'select n' with one LONG column counting to n, 'slow n' the same a row at a
+    # time, 'fail' with an error and 'hang' never; counts CancelRequests
+    def __init__(self):
+        self.cancel_count = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            startup_len, code = struct.unpack('>ii', await reader.readexactly(8))
+            await reader.readexactly(startup_len - 8)
+            if code == 80877102:
+                self.cancel_count += 1
+                return
+            writer.write(_message(b'R', struct.pack('>i', 0)) + _message(b'K', struct.pack('>ii', 1, 2)) +
+                         _message(b'Z', b'I'))
+            sql = None
+            while True:
+                msg_type = await reader.readexactly(1)
+                payload = await reader.readexactly(struct.unpack('>i', await reader.readexactly(4))[0] - 4)
+                if msg_type == b'X':
+                    return
+                if msg_type in (b'P', b'Q'):
+                    sql = payload[1:-3] if msg_type == b'P' else payload[:-1]
+                if msg_type not in (b'S', b'Q'):
+                    continue
+                if sql == b'hang':
+                    continue
+                if sql == b'fail':
+                    writer.write(_message(b'E', b'SERROR\x00Mfailed\x00\x00') + _message(b'Z', b'I'))
+                    continue
+                count = int(sql.split()[1])
+                writer.write(_message(b'T', row_description(('n', 20))))
+                if sql.startswith(b'slow'):
+                    # one DataRow per read, so rows also arrive into an empty client buffer
+                    for idx in range(count):
+                        await writer.drain()
+                        await asyncio.sleep(0.01)
+                        writer.write(data_row(struct.pack('>q', idx)))
+                else:
+                    writer.write(b''.join(data_row(struct.pack('>q', idx)) for idx in range(count)))
+                writer.write(_message(b'C', b'SELECT\x00') + _message(b'Z', b'I'))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class AsyncQueryTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = ScriptedServer()
+        self.port = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def test_query_and_error(self):
+        async with await AsyncWireConnection.connect(port=self.port) as conn:
+            self.assertEqual(b'\x00\x00\x00\x01\x00\x00\x00\x02', conn.backend_key)
+            self.assertEqual(list(range(5000)), (await conn.query_df('select 5000'))['n'].tolist())
+            with self.assertRaises(WireError):
+                await conn.query_columns('fail')
+            self.assertEqual('SELECT', await conn.execute('select 1'))
+
+    async def test_rows_read_on_message_boundaries(self):
+        async with await AsyncWireConnection.connect(port=self.port) as conn:
+            self.assertEqual(list(range(5)), (await conn.query_columns('slow 5'))['n'].tolist())
+
+    async def test_concurrent_queries_share_pool(self):
+        pool = AsyncConnectionPool(lambda: AsyncWireConnection.connect(port=self.port), max_size=3)
+        async def query(count):
+            async with pool.connection() as conn:
+                return len((await conn.query_columns(f'select {count}'))['n'])
+        self.assertEqual(list(range(20)), await asyncio.gather(*(query(count) for count in range(20))))
+        self.assertLessEqual(pool.size, 3)
+        await pool.close()
+
+    async def test_timeout_cancels_and_discards(self):
+        pool = AsyncConnectionPool(lambda: AsyncWireConnection.connect(port=self.port), max_size=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            async with pool.connection() as conn:
+                await asyncio.wait_for(conn.query_columns('hang'), 0.1)
+        self.assertTrue(conn.closed)
+        self.assertEqual(0, pool.size)
+        for _ in range(50):
+            if self.server.cancel_count:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(1, self.server.cancel_count)
+        async with pool.connection() as conn:
+            self.assertEqual(3, len((await conn.query_columns('select 3'))['n']))
+        await pool.close()
+
+    async def test_acquire_timeout(self):
+        pool = AsyncConnectionPool(lambda: AsyncWireConnection.connect(port=self.port), max_size=1)
+        async with pool.connection():
+            with self.assertRaises(PoolTimeoutError):
+                await pool.acquire(timeout=0.05)
+        await pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from pykit import (
+    QueryCache,
+    normalize_sql,
+    referenced_tables,
+    read_txn_id
+)
+
+
+class QueryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+        self.loads = 0
+
+    def commit(self, table_name: str, txn_id: int):
+        table_dir = Path(self.data_dir.name) / table_name
+        table_dir.mkdir(exist_ok=True)
+        (table_dir / '_txn').write_bytes(txn_id.to_bytes(8, byteorder=sys.byteorder) + bytes(120))
+
+    def load(self):
+        self.loads += 1
+        return {'value': np.arange(self.loads * 10)}
+
+    def test_read_txn_id(self):
+        self.commit('trades', 42)
+        self.assertEqual(42, read_txn_id('trades'))
+        self.assertIsNone(read_txn_id('missing'))
+
+    def test_hit_until_commit(self):
+        self.commit('trades', 1)
+        cache = QueryCache()
+        first = cache.get_or_load('select * from trades', None, self.load)
+        first['value'][0] = 99
+        second = cache.get_or_load('SELECT *\n  FROM trades;', None, self.load)
+        self.assertEqual(1, self.loads)
+        self.assertEqual(0, second['value'][0])
+        self.commit('trades', 2)
+        self.assertEqual(20, len(cache.get_or_load('select * from trades', None, self.load)['value']))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_uncacheable_queries(self):
+        self.commit('trades', 1)
+        cache = QueryCache()
+        for sql in ('select * from remote', 'select now() from trades', 'select 1',
+                    'select * from trades, remote', 'select * from long_sequence(10)'):
+            cache.get_or_load(sql, None, self.load)
+            cache.get_or_load(sql, None, self.load)
+        self.assertEqual(10, self.loads)
+        self.assertEqual(0, len(cache))
+
+    def test_params_and_literals_are_part_of_the_key(self):
+        self.commit('trades', 1)
+        cache = QueryCache()
+        cache.get_or_load('select * from trades where sym = %s', ('a',), self.load)
+        cache.get_or_load('select * from trades where sym = %s', ('b',), self.load)
+        cache.get_or_load("select * from trades where sym = 'A'", None, self.load)
+        cache.get_or_load("select * from trades where sym = 'a'", None, self.load)
+        self.assertEqual(4, self.loads)
+
+    def test_lru_eviction_within_budget(self):
+        for table_name in ('a', 'b', 'c'):
+            self.commit(table_name, 1)
+        cache = QueryCache(max_bytes=200)
+        for table_name in ('a', 'b'):
+            cache.get_or_load(table_name, None, lambda: {'value': np.zeros(10)})
+        cache.get_or_load('a', None, self.load)
+        cache.get_or_load('c', None, lambda: {'value': np.zeros(10)})
+        self.assertEqual(2, len(cache))
+        self.assertLessEqual(cache.bytes_used, 200)
+        cache.get_or_load('a', None, self.load)
+        self.assertEqual(0, self.loads)
+
+    def test_aliased_comma_join_is_not_cached(self):
+        self.commit('a', 1)
+        self.commit('b', 1)
+        cache = QueryCache()
+        sql = 'select * from a x, b y where x.id = y.id'
+        cache.get_or_load(sql, None, self.load)
+        self.commit('b', 2)
+        self.assertEqual(20, len(cache.get_or_load(sql, None, self.load)['value']))
+        self.assertEqual(0, cache.hits)
+
+    def test_referenced_tables(self):
+        self.assertEqual({'t1', 't 2'}, referenced_tables(normalize_sql('SELECT a FROM t1 JOIN "t 2" ON x')))
+        self.assertEqual({'trades'}, referenced_tables(normalize_sql('trades LIMIT 10;')))
+        self.assertEqual({'t'}, referenced_tables(normalize_sql('select * from (select * from t) limit 2')))
+        self.assertEqual({'t'}, referenced_tables(normalize_sql('select a, b from t where c in (1, 2) order by a, b')))
+        self.assertEqual({'a', 'b'}, referenced_tables(normalize_sql('select x.v from a x join b y on x.id = y.id')))
+        for sql in ('select * from a x, b y', 'select * from a as x,b', 'select * from (select * from a) x, b y',
+                    'select * from a join b on a.id = b.id, c', 'select * from (select * from a x, b y)'):
+            self.assertIsNone(referenced_tables(normalize_sql(sql)), sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from pykit import (
+    ColumnTypes,
+    TableInfo,
+    df_from_table,
+    column_codec,
+    register_codec,
+    read_column,
+    read_long256,
+    long256_hex,
+    read_binary,
+    read_symbol_table,
+    symbol_key,
+    take_rows
+)
+from pykit import columns as pykit_columns
+
+from tests.util import (
+    write_table,
+    string_files,
+    binary_files,
+    symbol_files
+)
+
+DAY = 86_400_000_000
+
+
+class ColumnCodecTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+        names = [['alpha', None, ''], ['Ωmega', 'beta']]
+        keys = [[1, 0, np.iinfo(np.int32).min], [2, 1]]
+        self.blobs = [[b'\x00\x01', None, b''], [b'blob' * 100, b'\xff']]
+        self.hashes = np.array([[1, 0, 0, 0], [0, 0, 0, 0], [2 ** 63] * 4, [0, 0, 0xabc, 0], [2 ** 64 - 1] * 4],
+                               dtype=np.uint64)
+        partitions = []
+        for day in range(2):
+            ts = day * DAY + np.arange(len(names[day]), dtype=np.int64)
+            name_d, name_i = string_files(names[day])
+            blob_d, blob_i = binary_files(self.blobs[day])
+            partitions.append((day * DAY, {
+                'ts.d': ts.tobytes(),
+                'name.d': name_d,
+                'name.i': name_i,
+                'sym.d': np.array(keys[day], dtype=np.int32).tobytes(),
+                'ch.d': np.array([ord('a') + day] * len(names[day]), dtype=np.int16).tobytes(),
+                'hash.d': np.split(self.hashes, [3])[day].tobytes(),
+                'blob.d': blob_d,
+                'blob.i': blob_i}))
+        columns = [('ts', 8), ('name', 11), ('sym', 12), ('ch', 4), ('hash', 13), ('blob', 18)]
+        self.table_root = write_table(Path(self.data_dir.name), 'events', columns, 0, partitions, symbol_counts=[3],
+                                      root_files=symbol_files('sym', ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD']))
+
+    def test_df_from_table(self):
+        df = df_from_table('events', (('name', ''), ('sym', ''), ('ch', ''), ('ts', '')))
+        self.assertEqual([0, 1, 2, DAY, DAY + 1], df.index.tolist())
+        self.assertEqual(['alpha', None, '', 'Ωmega', 'beta'], df['name'].tolist())
+        self.assertEqual(['GBPUSD', 'EURUSD', None, 'USDJPY', 'GBPUSD'],
+                         df['sym'].astype(object).where(df['sym'].notna(), None).tolist())
+        self.assertIsInstance(df['sym'].dtype, pd.CategoricalDtype)
+        self.assertEqual([97, 97, 97, 98, 98], df['ch'].tolist())
+
+    def test_registry(self):
+        self.assertIs(column_codec(ColumnTypes.resolve(14 | 20 << 8)), column_codec(ColumnTypes.INT))
+        with self.assertRaises(ValueError):
+            column_codec(ColumnTypes.CURSOR)
+        self.addCleanup(register_codec, ColumnTypes.CHAR, column_codec(ColumnTypes.CHAR))
+        register_codec(ColumnTypes.CHAR, lambda table_info, col_idx: np.full(table_info.row_count, 'x'))
+        self.assertEqual(['x'] * 5, read_column(TableInfo('events'), 3).tolist())
+        self.assertEqual(['x'] * 5, df_from_table('events', (('ch', ''), ('ts', '')))['ch'].tolist())
+
+    def test_long256(self):
+        longs = read_long256(TableInfo('events'), 4)
+        np.testing.assert_array_equal(self.hashes, longs)
+        expected = ['0x1', '0x0', '', '0xabc' + '0' * 32, '0x' + 'f' * 64]
+        self.assertEqual(expected, long256_hex(longs).tolist())
+        self.assertEqual(expected, df_from_table('events', (('hash', ''), ('ts', '')))['hash'].tolist())
+
+    def test_binary(self):
+        blobs = read_binary(TableInfo('events'), 5)
+        expected = self.blobs[0] + self.blobs[1]
+        self.assertEqual(5, len(blobs))
+        self.assertEqual(b'blob' * 100, blobs[3].tobytes())
+        self.assertIsNone(blobs[-4])
+        self.assertEqual(b'\xff', bytes(blobs[-1]))
+        self.assertEqual([2, -1, 0, 400, 1], blobs.lengths.tolist())
+        self.assertEqual(expected, [None if blob is None else bytes(blob) for blob in blobs])
+        with self.assertRaises(IndexError):
+            blobs[5]
+        values = df_from_table('events', (('blob', ''), ('ts', '')))['blob'].tolist()
+        self.assertEqual(expected, [None if blob is None else bytes(blob) for blob in values])
+
+    def test_take_rows(self):
+        table_info = TableInfo('events')
+        partition_rows = [(0, 0, np.array([0, 2])), (1, 3, np.array([1]))]
+        decoded = []
+
+        def decode_strings(data, offsets):
+            decoded.append(len(offsets))
+            return decode_strings.wrapped(data, offsets)
+
+        decode_strings.wrapped = pykit_columns._decode_strings
+        with mock.patch('pykit.columns._decode_strings', decode_strings):
+            self.assertEqual(['alpha', '', 'beta'], take_rows(table_info, 1, partition_rows).tolist())
+        self.assertEqual([2, 1], decoded)
+        for col_idx in (0, 2, 3, 4, 5):
+            expected = read_column(table_info, col_idx)[[0, 2, 4]]
+            taken = take_rows(table_info, col_idx, partition_rows)
+            self.assertEqual(isinstance(expected, pd.Categorical), isinstance(taken, pd.Categorical))
+            self.assertEqual(list(expected), list(taken))
+        self.assertEqual(0, len(take_rows(table_info, 1, [])))
+
+    def test_empty_table(self):
+        write_table(Path(self.data_dir.name), 'empty', [('sym', 12), ('ts', 8), ('name', 11), ('hash', 13)], 1,
+                    [(0, {'ts.d': b'', 'sym.d': b'', 'name.d': b'', 'name.i': b'', 'hash.d': b''})],
+                    symbol_counts=[1], root_files=symbol_files('sym', ['EURUSD']))
+        table_info = TableInfo('empty')
+        for col_idx in range(table_info.column_count):
+            self.assertEqual(0, len(read_column(table_info, col_idx)))
+        df = df_from_table('empty', (('sym', ''), ('name', ''), ('ts', '')))
+        self.assertEqual(['sym', 'name'], list(df.columns))
+        self.assertEqual(0, len(df))
+
+    def test_symbol_table_grows(self):
+        decoded = []
+
+        def decode_strings(data, offsets):
+            decoded.append(len(offsets))
+            return decode_strings.wrapped(data, offsets)
+
+        decode_strings.wrapped = pykit_columns._decode_strings
+        with mock.patch('pykit.columns._decode_strings', decode_strings):
+            symbols = read_symbol_table(TableInfo('events'), 2)
+            self.assertEqual(['EURUSD', 'GBPUSD', 'USDJPY'], symbols.tolist())
+            self.assertIsNone(symbol_key(TableInfo('events'), 2, 'AUDUSD'))
+            self._set_symbol_count(4)
+            self.assertEqual(['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD'], read_symbol_table(TableInfo('events'), 2).tolist())
+            self.assertEqual(3, symbol_key(TableInfo('events'), 2, 'AUDUSD'))
+            self.assertEqual(['EURUSD', 'GBPUSD', 'USDJPY'], symbols.tolist())
+            self._set_symbol_count(2)
+            self.assertEqual(['EURUSD', 'GBPUSD'], read_symbol_table(TableInfo('events'), 2).tolist())
+            self.assertIsNone(symbol_key(TableInfo('events'), 2, 'USDJPY'))
+            self._set_symbol_count(4)
+            self.assertEqual(3, symbol_key(TableInfo('events'), 2, 'AUDUSD'))
+        # new symbols are decoded once, an older snapshot reads a prefix of the cache
+        self.assertEqual([3, 1], decoded)
+
+    def test_symbol_table_truncated(self):
+        def write_ticks(symbols, data_version):
+            shutil.rmtree(Path(self.data_dir.name) / 'ticks', ignore_errors=True)
+            write_table(Path(self.data_dir.name), 'ticks', [('sym', 12), ('ts', 8)], 1, [(0, {
+                'ts.d': np.arange(len(symbols), dtype=np.int64).tobytes(),
+                'sym.d': np.arange(len(symbols), dtype=np.int32).tobytes()})],
+                symbol_counts=[len(symbols)], root_files=symbol_files('sym', symbols), data_version=data_version)
+
+        write_ticks(['AAA', 'BBB'], 0)
+        self.assertEqual(['AAA', 'BBB'], list(read_column(TableInfo('ticks'), 0)))
+        # truncated and refilled under the same table id, with fewer and then more symbols
+        write_ticks(['ZZZ'], 1)
+        self.assertEqual(['ZZZ'], list(read_column(TableInfo('ticks'), 0)))
+        self.assertIsNone(symbol_key(TableInfo('ticks'), 0, 'AAA'))
+        write_ticks(['XX', 'YY', 'ZZ'], 2)
+        self.assertEqual(['XX', 'YY', 'ZZ'], list(read_column(TableInfo('ticks'), 0)))
+
+    def _set_symbol_count(self, count: int):
+        txn = bytearray((self.table_root / '_txn').read_bytes())
+        txn[76:80] = np.int32(count).tobytes()
+        (self.table_root / '_txn').write_bytes(bytes(txn))
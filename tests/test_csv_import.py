@@ -0,0 +1,132 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pykit import (
+    ColumnTypes,
+    create_bulk_message,
+    import_csv,
+    infer_column_types
+)
+from pykit.ilp_server import IlpServer
+
+
+class BulkMessageTest(unittest.TestCase):
+    def test_create_bulk_message(self):
+        message = create_bulk_message(
+            'trades',
+            symbols={'sym': ['ETH-USD', 'BTC USD', None]},
+            fields={
+                'price': np.array([2615.54, np.nan, 39269.98]),
+                'qty': np.ma.masked_array([10, 20, 30], mask=[False, False, True]),
+                'note': np.array(['say "hi"', None, 'x'], dtype=object),
+                'open': np.array([True, False, True])},
+            ts=np.array([1633053600000000, 1633053600000001, 1633053600000002]))
+        self.assertEqual(
+            b'trades,sym=ETH-USD price=2615.54,qty=10i,note="say \\"hi\\"",open=t 1633053600000000000\n'
+            b'trades,sym=BTC\\ USD qty=20i,open=f 1633053600000001000\n'
+            b'trades price=39269.98,note="x",open=t 1633053600000002000\n',
+            message)
+
+    def test_create_bulk_message_non_finite_and_empty_rows(self):
+        message = create_bulk_message(
+            't',
+            symbols={'s': ['a', 'b', 'c', 'd']},
+            fields={'x': np.array([np.inf, -np.inf, 1.5, np.nan]),
+                    'y': np.ma.masked_array([1, 2, 3, 4], mask=[True, False, True, True])},
+            ts=np.array([1, 2, 3, 4]))
+        self.assertEqual(b't,s=b y=2i 2000\nt,s=c x=1.5 3000\n', message)
+        self.assertEqual(b'', create_bulk_message('t', symbols={'s': ['a']}, ts=np.array([1])))
+
+    def test_create_bulk_message_nul_bytes(self):
+        # NULs within values are kept, only the padding of fixed-width fragments is stripped
+        message = create_bulk_message('t', symbols={'s': ['a\x00b', 'c']},
+                                      fields={'n': np.array(['p\x00q', 'r'], dtype=object), 'x': np.array([1, 22])})
+        self.assertEqual(b't,s=a\x00b n="p\x00q",x=1i\nt,s=c n="r",x=22i\n', message)
+        self.assertRaises(ValueError, create_bulk_message, 't', symbols={'s': ['a\x00']}, fields={'x': [1]})
+        self.assertRaises(ValueError, create_bulk_message, 't', fields={'n': np.array(['a\x00'], dtype=object)})
+
+    def test_create_bulk_message_mismatched_lengths(self):
+        self.assertRaises(ValueError, create_bulk_message, 't', fields={'a': [1, 2], 'b': [1.0]})
+
+
+class CsvImportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = Path(self.tmp_dir.name) / 'trades.csv'
+        with open(self.csv_path, 'w') as csv_file:
+            csv_file.write('ts,sym,price,qty,note\n')
+            for idx in range(1000):
+                csv_file.write(f'2021-10-01 02:{idx // 60 % 60:02d}:{idx % 60:02d}.000000,'
+                               f's{idx % 5},{idx * 0.5},{idx},note {idx}\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_infer_column_types(self):
+        column_types = infer_column_types(pd.read_csv(self.csv_path), timestamp='ts')
+        self.assertEqual({
+            'ts': ColumnTypes.TIMESTAMP,
+            'sym': ColumnTypes.SYMBOL,
+            'price': ColumnTypes.DOUBLE,
+            'qty': ColumnTypes.LONG,
+            'note': ColumnTypes.STRING}, column_types)
+
+    def test_import_csv(self):
+        for workers in (1, 2):
+            with IlpServer(record=True) as server:
+                host, port = server.tcp_address
+                rows = import_csv(
+                    self.csv_path, 'trades', column_types={'qty': ColumnTypes.INT}, timestamp='ts',
+                    host=host, port=port, chunk_bytes=4096, workers=workers)
+                self.assertEqual(1000, rows)
+                self.assertTrue(server.wait_for(1000, timeout=5.0))
+                self.assertEqual(0, server.error_count)
+                self.assertEqual(b'trades,sym=s0 price=0.0,qty=0i,note="note 0" 1633053600000000000', server.lines[0])
+                self.assertEqual(b'trades,sym=s4 price=499.5,qty=999i,note="note 999" 1633054599000000000',
+                                 server.lines[-1])
+
+    def test_non_finite_and_empty_rows(self):
+        csv_path = Path(self.tmp_dir.name) / 'gaps.csv'
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write('ts,sym,price,qty\n'
+                           '2021-10-01 02:00:00,a,inf,1\n'
+                           '2021-10-01 02:00:01,b,-inf,\n'
+                           '2021-10-01 02:00:02,c,1.5,\n'
+                           '2021-10-01 02:00:03,d,nan,2\n')
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            rows = import_csv(csv_path, 'gaps', column_types={'sym': ColumnTypes.SYMBOL, 'qty': ColumnTypes.LONG},
+                              timestamp='ts', host=host, port=port, workers=1)
+            self.assertEqual(3, rows)
+            self.assertTrue(server.wait_for(3, timeout=5.0))
+            self.assertEqual(0, server.error_count)
+            self.assertEqual([b'gaps,sym=a qty=1i 1633053600000000000',
+                              b'gaps,sym=c price=1.5 1633053602000000000',
+                              b'gaps,sym=d qty=2i 1633053603000000000'], server.lines)
@@ -23,6 +23,10 @@
 
 import math
 import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
 import numpy as np
 import pandas as pd
 
@@ -31,10 +35,16 @@ from pykit import (
     insert_values,
     drop_table,
     to_timestamp,
-    df_from_table
+    df_from_table,
+    read_table
 )
 
-from tests.util import BaseTestTest
+from pykit import columns as pykit_columns
+from tests.util import (
+    BaseTestTest,
+    symbol_files,
+    write_table
+)
 
 
 class DataFrameFromTablesTest(BaseTestTest):
@@ -299,3 +309,68 @@ class DataFrameFromTablesTest(BaseTestTest):
         finally:
             self.report_mem_snapshot_diff(snapshot_after_df, 'SHOW AND TELL')
             drop_table(table_name)
+
+
+class ReadTableTest(unittest.TestCase):
+    DAY = 86_400_000_000
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+        partitions = []
+        for day in range(2):
+            ts = np.arange(day * self.DAY, (day + 1) * self.DAY, self.DAY // 4, dtype=np.int64)
+            partitions.append((day * self.DAY, {
+                'ts.d': ts.tobytes(),
+                'value.d': (ts / self.DAY).tobytes(),
+                'id.d': np.arange(day * 4, day * 4 + 4, dtype=np.int32).tobytes(),
+                'sym.d': np.array([0, 1, day, np.iinfo(np.int32).min], dtype=np.int32).tobytes()}))
+        write_table(Path(self.data_dir.name), 'trades', [('id', 5), ('ts', 8), ('value', 10), ('sym', 12)], 1,
+                    partitions, symbol_counts=[2], root_files=symbol_files('sym', ['EURUSD', 'GBPUSD']))
+
+    def test_local_time_range(self):
+        df = read_table('trades', ['value', 'id'], ts_from=self.DAY // 2, ts_to=self.DAY + 1)
+        self.assertEqual(['value', 'id'], list(df.columns))
+        self.assertEqual('ts', df.index.name)
+        self.assertEqual([2, 3, 4], df['id'].tolist())
+        self.assertEqual([0.5, 0.75, 1.0], df['value'].tolist())
+        self.assertEqual(8, len(read_table('trades')))
+
+    def test_local_skips_partitions(self):
+        read_files = []
+
+        def map_file(file_path, length=0):
+            read_files.append(file_path)
+            return map_file.wrapped(file_path, length)
+
+        map_file.wrapped = pykit_columns.map_file
+        with mock.patch('pykit.columns.map_file', map_file):
+            df = read_table('trades', ['id'], ts_from=self.DAY + self.DAY // 4)
+        self.assertEqual([5, 6, 7], df['id'].tolist())
+        self.assertFalse([file_path for file_path in read_files if file_path.parent.name == '1970-01-01'])
+
+    def test_remote_matches_local(self):
+        local = read_table('trades', ['value', 'sym', 'id'], ts_from=self.DAY // 2, ts_to=self.DAY + 1)
+        self.assertEqual('category', local['sym'].dtype)
+        queries = []
+
+        def fake_query_df(sql, params=None, binary=False):
+            queries.append(sql)
+            if 'table_columns' in sql:
+                return pd.DataFrame({'column': ['id', 'ts', 'value', 'sym'],
+                                     'type': ['INT', 'TIMESTAMP', 'DOUBLE', 'SYMBOL'],
+                                     'designated': [False, True, False, False]})
+            rows = local.reset_index()[['value', 'sym', 'id', 'ts']]
+            rows['sym'] = rows['sym'].astype(object).where(rows['sym'].notna(), None)
+            return rows
+
+        with mock.patch('pykit.dataframe.query_df', fake_query_df):
+            remote = read_table('remote', ['value', 'sym', 'id'], ts_from=self.DAY // 2, ts_to=self.DAY + 1)
+        self.assertEqual(f'SELECT value, sym, id, ts FROM remote WHERE ts >= {self.DAY // 2} AND ts < {self.DAY + 1}',
+                         queries[-1])
+        # locally the categories are the whole symbol table, remotely the values returned
+        self.assertEqual('category', remote['sym'].dtype)
+        pd.testing.assert_frame_equal(local, remote, check_categorical=False)
@@ -0,0 +1,88 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from pykit import (
+    TableInfo,
+    parse_geohash,
+    read_geohash,
+    geohash_boxes,
+    geohash_centres,
+    geohash_prefix_mask,
+    geohash_box_mask
+)
+
+from tests.util import write_table
+
+GEOHASHES = ('u33dc0', 'u33dc1', 'u33db2', 'gcpvj0', 'ezs420')
+
+
+class GeohashTest(unittest.TestCase):
+    def setUp(self):
+        self.values = np.array([parse_geohash(geohash)[0] for geohash in GEOHASHES] + [-1], dtype=np.int32)
+
+    def test_parse(self):
+        self.assertEqual((0b01101_11111_11000_00100_00010, 25), parse_geohash('EZS42'))
+        with self.assertRaises(ValueError):
+            parse_geohash('ezs4a')
+
+    def test_boxes(self):
+        value, bits = parse_geohash('ezs42')
+        box = geohash_boxes(np.array([value, -1]), bits)
+        np.testing.assert_allclose([42.583, 42.627, -5.625, -5.581], [part[0] for part in box], atol=1e-3)
+        self.assertTrue(all(np.isnan(part[1]) for part in box))
+        lat, lon = geohash_centres(self.values, 30)
+        np.testing.assert_allclose([52.517, 52.523, 52.517, 51.507, 42.586], lat[:5], atol=1e-3)
+        np.testing.assert_allclose([13.409, 13.409, 13.376, -0.126, -5.620], lon[:5], atol=1e-3)
+        # even bit counts split evenly
+        lat, lon = geohash_centres(np.array([parse_geohash('ezs4')[0]]), 20)
+        np.testing.assert_allclose([42.627, -5.449], [lat[0], lon[0]], atol=1e-3)
+
+    def test_filters(self):
+        self.assertEqual([True, True, True, False, False, False],
+                         geohash_prefix_mask(self.values, 30, 'u33d').tolist())
+        self.assertEqual([True, True, False, False, False, False],
+                         geohash_prefix_mask(self.values, 30, 'u33dc').tolist())
+        self.assertEqual([True, True, True, False, False, False],
+                         geohash_box_mask(self.values, 30, 52.3, 52.7, 13.0, 13.8).tolist())
+        self.assertEqual([False, False, False, True, True, False],
+                         geohash_box_mask(self.values, 30, 40, 55, -10, 0).tolist())
+        with self.assertRaises(ValueError):
+            geohash_prefix_mask(self.values, 30, 'u33dc00')
+
+    def test_read_column(self):
+        with tempfile.TemporaryDirectory() as data_dir, mock.patch('pykit.core.QDB_DB_DATA', Path(data_dir)):
+            write_table(Path(data_dir), 'positions', [('ts', 8), ('geo', 16 | 30 << 8)], 0, [(0, {
+                'ts.d': np.arange(len(self.values), dtype=np.int64).tobytes(),
+                'geo.d': self.values.tobytes()})])
+            values, bits = read_geohash(TableInfo('positions'), 1)
+            self.assertEqual(30, bits)
+            self.assertEqual(self.values.tolist(), values.tolist())
+            with self.assertRaises(ValueError):
+                read_geohash(TableInfo('positions'), 0)
@@ -0,0 +1,152 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import socket
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pykit import (
+    create_message,
+    send_columns,
+    send_udp_batched,
+    pack_datagrams,
+    TcpSender
+)
+from pykit.ilp_server import IlpServer
+import pykit.ilp
+
+
+class UdpBatchingTest(unittest.TestCase):
+    def test_pack_datagrams(self):
+        payload = b'a 1\nbb 22\nccc 333\n'
+        self.assertEqual([(0, 10), (10, 8)], pack_datagrams(payload, 10))
+        self.assertEqual([(0, 4), (4, 6), (10, 8)], pack_datagrams(payload, 9))
+        self.assertEqual([(0, 18)], pack_datagrams(payload, 1500))
+        self.assertEqual([], pack_datagrams(b'', 1500))
+
+    def test_pack_datagrams_oversized_line(self):
+        payload = b'a 1\n' + b'x' * 20 + b'\nb 2\n'
+        self.assertEqual([(0, 4), (4, 21), (25, 4)], pack_datagrams(payload, 8))
+
+    def test_send_udp_batched(self):
+        self._assert_received_batched()
+
+    def test_send_udp_batched_without_sendmmsg(self):
+        sendmmsg = pykit.ilp._libc_sendmmsg
+        pykit.ilp._libc_sendmmsg = None
+        try:
+            self._assert_received_batched()
+        finally:
+            pykit.ilp._libc_sendmmsg = sendmmsg
+
+    def _assert_received_batched(self):
+        messages = [create_message('udp_batched', symbols={'sym': 'a'}, fields={'idx': idx}) for idx in range(100)]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+            receiver.bind(('127.0.0.1', 0))
+            receiver.settimeout(5.0)
+            port = receiver.getsockname()[1]
+            self.assertTrue(send_udp_batched(*messages, datagram_size=256, group='127.0.0.1', port=port))
+            expected = ''.join(messages).encode('utf-8')
+            expected_datagrams = pack_datagrams(expected, 256)
+            received = b''
+            for _ in expected_datagrams:
+                datagram = receiver.recv(65535)
+                self.assertLessEqual(len(datagram), 256)
+                self.assertTrue(datagram.endswith(b'\n'))
+                received += datagram
+            self.assertEqual(expected, received)
+
+
+class ColumnsIngestTest(unittest.TestCase):
+    def test_send_columns(self):
+        codes = np.array([0, 1, 0, -1, 1], dtype=np.int32)
+        dictionary = [b'ETH-USD', b'BTC-USD']
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            with TcpSender(host=host, port=port) as sender:
+                self.assertTrue(send_columns(
+                    'quotes',
+                    {
+                        'sym': (codes, dictionary),
+                        'bid': np.array([1.5, 2.5, 3.5, 4.5, np.nan]),
+                        'size': np.arange(5, dtype=np.int32),
+                        'ts': np.arange(1633053600000000, 1633053600000005)
+                    },
+                    timestamp='ts',
+                    sender=sender,
+                    batch_rows=2))
+            self.assertTrue(server.wait_for(5, timeout=5.0))
+            self.assertEqual([
+                b'quotes,sym=ETH-USD bid=1.5,size=0i 1633053600000000000',
+                b'quotes,sym=BTC-USD bid=2.5,size=1i 1633053600000001000',
+                b'quotes,sym=ETH-USD bid=3.5,size=2i 1633053600000002000',
+                b'quotes bid=4.5,size=3i 1633053600000003000',
+                b'quotes,sym=BTC-USD size=4i 1633053600000004000'], server.lines)
+
+    def test_symbols_encoded_once(self):
+        codes = np.array([0, 1, 2, 1, 0, 2, 1], dtype=np.int32)
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            with TcpSender(host=host, port=port) as sender, \
+                    mock.patch('pykit.ilp._as_str', wraps=pykit.ilp._as_str) as as_str:
+                self.assertTrue(send_columns('quotes', {'sym': (codes, ['a', 'b', 'c']), 'size': codes},
+                                             sender=sender, batch_rows=2))
+            self.assertEqual(3, as_str.call_count)
+            self.assertTrue(server.wait_for(7, timeout=5.0))
+            self.assertEqual(b'quotes,sym=b size=1i', server.lines[-1])
+
+    def test_empty_symbol_dictionary(self):
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            with TcpSender(host=host, port=port) as sender:
+                self.assertTrue(send_columns('quotes', {'sym': (np.array([-1, -1]), []), 'size': np.arange(2)},
+                                             sender=sender, batch_rows=1))
+                self.assertTrue(send_columns('quotes', {}, sender=sender))
+            self.assertTrue(server.wait_for(2, timeout=5.0))
+            self.assertEqual([b'quotes size=0i', b'quotes size=1i'], server.lines)
+
+    def test_non_finite_and_empty_rows(self):
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            with TcpSender(host=host, port=port) as sender:
+                self.assertTrue(send_columns('quotes', {
+                    'sym': (np.array([0, 0, 1]), ['a', 'b']),
+                    'bid': np.array([np.inf, np.nan, 2.5]),
+                    'ts': np.array([1, 2, 3])}, timestamp='ts', sender=sender))
+            self.assertTrue(server.wait_for(1, timeout=5.0))
+            self.assertEqual(0, server.error_count)
+            self.assertEqual([b'quotes,sym=b bid=2.5 3000'], server.lines)
+
+    def test_send_structured_array(self):
+        rows = np.zeros(3, dtype=[('price', np.float64), ('qty', np.int64), ('ts', np.int64)])
+        rows['price'] = [1.0, 2.0, 3.0]
+        rows['qty'] = [10, 20, 30]
+        rows['ts'] = [1, 2, 3]
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            with TcpSender(host=host, port=port) as sender:
+                self.assertTrue(send_columns('fills', rows, timestamp='ts', sender=sender))
+            self.assertTrue(server.wait_for(3, timeout=5.0))
+            self.assertEqual(b'fills price=3.0,qty=30i 3000', server.lines[-1])
@@ -0,0 +1,78 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+from pykit import (
+    create_message,
+    send_tcp_messages,
+    send_udp_batched,
+    TcpSender
+)
+from pykit.ilp_server import (
+    IlpServer,
+    is_valid_line
+)
+from benchmarks import bench_ilp
+
+
+class IlpServerTest(unittest.TestCase):
+    def test_is_valid_line(self):
+        self.assertTrue(is_valid_line(b'trades,sym=ETH-USD price=2615.54,qty=10i,open=t 1633053600000000000'))
+        self.assertTrue(is_valid_line(b'trades,sym=ETH-USD qty=1i'))
+        self.assertTrue(is_valid_line(b'trades note="a \\"quoted\\" note, with spaces"'))
+        self.assertTrue(is_valid_line(b'my\\ table,tag\\=key=va\\,lue f=-1.5e-3'))
+        self.assertFalse(is_valid_line(b'trades price='))
+        self.assertFalse(is_valid_line(b'trades,sym price=1.0'))
+        self.assertFalse(is_valid_line(b'trades qty=10j'))
+        self.assertFalse(is_valid_line(b'trades price=1.0 12ab'))
+        self.assertFalse(is_valid_line(b't,s=a 1000'))
+        self.assertFalse(is_valid_line(b'trades,sym=ETH-USD'))
+
+    def test_counts_and_records_tcp(self):
+        messages = [create_message('standin', symbols={'sym': 'a'}, fields={'idx': idx}) for idx in range(50)]
+        with IlpServer(record=True) as server:
+            host, port = server.tcp_address
+            self.assertTrue(send_tcp_messages(*messages[:10], host=host, port=port))
+            with TcpSender(host=host, port=port) as sender:
+                self.assertTrue(sender.send(*messages[10:]))
+            self.assertTrue(server.wait_for(50, timeout=5.0))
+            self.assertEqual(50, server.line_count)
+            self.assertEqual(len(''.join(messages)), server.byte_count)
+            self.assertEqual(0, server.error_count)
+            self.assertEqual([message.rstrip('\n').encode('utf-8') for message in messages], server.lines)
+
+    def test_counts_errors_udp(self):
+        with IlpServer() as server:
+            host, port = server.udp_address
+            self.assertTrue(send_udp_batched('standin idx=1i\n', 'standin idx=\n', group=host, port=port))
+            self.assertTrue(server.wait_for(2, timeout=5.0))
+            self.assertEqual(1, server.error_count)
+            self.assertEqual([b'standin idx='], server.errors)
+
+    def test_benchmark_smoke(self):
+        results = bench_ilp.run(rows=2000, batch_rows=500, udp=False)
+        self.assertEqual(['create_message', 'send_tcp_messages', 'TcpSender', 'create_bulk_message', 'send_columns'], [result.name for result in results])
+        for result in results:
+            self.assertEqual(2000, result.rows)
+            self.assertEqual(4, len(result.latencies))
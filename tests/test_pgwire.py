@@ -0,0 +1,134 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import collections
+import datetime
+import struct
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from pykit import (
+    df_from_rows,
+    parallel_query,
+    time_slices,
+    to_timestamp
+)
+from pykit.pgwire import _insert_column
+
+Column = collections.namedtuple('Column', ('name', 'type_code'))
+
+
+class DataFrameFromRowsTest(unittest.TestCase):
+    def test_typed_columns(self):
+        description = (
+            Column('int', 23), Column('long', 20), Column('double', 701),
+            Column('string', 1043), Column('ts', 1114), Column('boolean', 16))
+        rows = [
+            (1, None, 2.5, 'a', datetime.datetime(2021, 10, 1, 2, 0, 0, 123456), True),
+            (None, 7, None, None, None, None)]
+        df = df_from_rows(rows, description)
+        self.assertEqual(['int32', 'int64', 'float64', 'object', 'int64', 'bool'], [str(dtype) for dtype in df.dtypes])
+        self.assertEqual([1, np.iinfo(np.int32).min], df['int'].tolist())
+        self.assertEqual([np.iinfo(np.int64).min, 7], df['long'].tolist())
+        self.assertTrue(np.isnan(df['double'][1]))
+        self.assertEqual(['a', None], df['string'].tolist())
+        self.assertEqual([to_timestamp('2021-10-01 02:00:00.123456'), np.iinfo(np.int64).min], df['ts'].tolist())
+        self.assertEqual([True, False], df['boolean'].tolist())
+
+    def test_empty_result_keeps_columns(self):
+        df = df_from_rows([], (Column('int', 23), Column('string', 25)))
+        self.assertEqual(['int', 'string'], list(df.columns))
+        self.assertEqual(0, len(df))
+
+    def test_repeated_names_and_aware_timestamps(self):
+        description = (Column('a', 23), Column('a', 23), Column('ts', 1184), Column('a.1', 23))
+        utc = datetime.timezone.utc
+        cest = datetime.timezone(datetime.timedelta(hours=2))
+        rows = [(1, 2, datetime.datetime(2021, 10, 1, 4, 0, tzinfo=cest), 3),
+                (4, 5, datetime.datetime(2021, 10, 1, 2, 0, 1, tzinfo=utc), 6)]
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            df = df_from_rows(rows, description)
+        self.assertEqual(['a', 'a.1', 'ts', 'a.1.1'], list(df.columns))
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], df[['a', 'a.1', 'a.1.1']].values.tolist())
+        self.assertEqual([to_timestamp('2021-10-01 02:00:00.000000'), to_timestamp('2021-10-01 02:00:01.000000')],
+                         df['ts'].tolist())
+
+
+class InsertColumnTest(unittest.TestCase):
+    def test_nulls_and_timestamps(self):
+        df = pd.DataFrame({
+            'long': np.array([1, 2], dtype=np.int64),
+            'double': [1.5, np.nan],
+            'ts': pd.to_datetime(['2021-10-01 02:00:00', None]),
+            'string': ['a', None]})
+        self.assertEqual([1, 2], _insert_column(df['long']))
+        self.assertIs(int, type(_insert_column(df['long'])[0]))
+        self.assertEqual([1.5, None], _insert_column(df['double']))
+        self.assertEqual([datetime.datetime(2021, 10, 1, 2, 0, 0), None], _insert_column(df['ts']))
+        self.assertEqual(['a', None], _insert_column(df['string']))
+
+
+class TimeSlicesTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+
+    def write_txn(self, table_name: str, partitions):
+        # (timestamp, rows) per partition, the last one's rows are transient
+        table_dir = Path(self.data_dir.name) / table_name
+        table_dir.mkdir()
+        header = struct.pack('=qqq', 1, partitions[-1][1], sum(rows for _, rows in partitions[:-1]))
+        header += bytes(72 - len(header)) + struct.pack('=ii', 0, len(partitions) * 32)
+        entries = b''.join(struct.pack('=qqqq', ts, rows, -1, -1) for ts, rows in partitions)
+        (table_dir / '_txn').write_bytes(header + entries)
+
+    def test_even_split(self):
+        self.assertEqual([(0, 3), (3, 6), (6, 10)], time_slices(0, 10, 3))
+        self.assertEqual([(0, 1), (1, 2)], time_slices(0, 2, 5))
+        with self.assertRaises(ValueError):
+            time_slices(10, 10, 2)
+
+    def test_partition_boundaries_balance_rows(self):
+        self.write_txn('trades', [(0, 10), (100, 10), (200, 80), (300, 10), (400, 10)])
+        self.assertEqual([(50, 200), (200, 300), (300, 450)], time_slices(50, 450, 3, 'trades'))
+        self.assertEqual([(250, 300), (300, 350)], time_slices(250, 350, 4, 'trades'))
+        self.assertEqual([(0, 5), (5, 10)], time_slices(0, 10, 2, 'missing'))
+
+    def test_parallel_query_keeps_slice_order(self):
+        def fake_query_df(sql, params=None, binary=False):
+            ts_from, ts_to = (int(value) for value in sql.split())
+            return pd.DataFrame({'ts': np.arange(ts_from, ts_to)})
+
+        with mock.patch('pykit.pgwire.query_df', fake_query_df):
+            df = parallel_query('{ts_from} {ts_to}', 0, 1000, slices=7)
+        self.assertEqual(list(range(1000)), df['ts'].tolist())
@@ -0,0 +1,122 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+import pandas as pd
+import psycopg2
+
+from pykit import (
+    CONN_ATTRS,
+    configure_pool,
+    create_tables,
+    drop_tables,
+    truncate_tables,
+    insert_values,
+    query_columns,
+    query_df,
+    query_iter,
+    select_all,
+    WireConnection,
+    WireError
+)
+from pykit.pgwire_server import PgWireServer
+from benchmarks import bench_pgwire
+
+
+class PgWireServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = PgWireServer(rows=1000, null_every=7, fail_pattern='^fail').start()
+        self.addCleanup(self.server.stop)
+        conn_attrs = dict(CONN_ATTRS)
+        self.addCleanup(configure_pool, conn_attrs)
+        configure_pool(self.server.conn_attrs)
+
+    def test_psycopg2_helpers(self):
+        rows = select_all('trades')
+        self.assertEqual(10, len(rows))
+        self.assertEqual((0, 0.0, 0, 's0'), rows[0][:4])
+        insert_values('trades', (('id', 'LONG'), ('sym', 'SYMBOL')), *((idx, 's') for idx in range(2500)))
+        self.assertEqual(2500, self.server.insert_count)
+        self.assertEqual(1, self.server.connection_count)
+
+    def test_text_and_binary_results_match(self):
+        text_df = query_df('SELECT * FROM trades')
+        pd.testing.assert_frame_equal(text_df, query_df('SELECT * FROM trades', binary=True))
+        self.assertEqual(1000, len(query_columns('SELECT * FROM trades')['id']))
+        for named, binary in ((False, False), (True, False), (False, True)):
+            chunks = list(query_iter('SELECT * FROM trades', chunk_rows=300, named=named, binary=binary))
+            self.assertEqual([300, 300, 300, 100], [len(chunk) for chunk in chunks])
+            pd.testing.assert_frame_equal(text_df, pd.concat(chunks, ignore_index=True))
+
+    def test_wire_connection_errors_and_auth(self):
+        with WireConnection(**self.server.conn_attrs) as conn:
+            self.assertEqual('12.3', conn.server_params['server_version'])
+            with self.assertRaises(WireError):
+                conn.query_columns('fail here')
+            self.assertEqual(5, len(conn.query_columns('trades LIMIT 5')['ts']))
+            self.assertEqual('CREATE TABLE', conn.execute('CREATE TABLE x (a INT)'))
+        with self.assertRaises(WireError):
+            WireConnection(**{**self.server.conn_attrs, 'password': 'wrong'})
+        with self.assertRaises(psycopg2.OperationalError):
+            psycopg2.connect(**{**self.server.conn_attrs, 'password': 'wrong'})
+
+    def test_benchmark_smoke(self):
+        results = bench_pgwire.run(rows=500, calls=2, chunk_rows=200, concurrency=2)
+        self.assertEqual(['psycopg2.connect', 'with_cursor', 'select_all', 'insert_values', 'query_df', 'query_iter',
+                          'query_iter named', 'query_iter binary', 'query_columns', 'async_query_columns'],
+                         [result.name for result in results])
+        self.assertEqual(1000, results[-1].rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class BulkDdlTest(unittest.TestCase):
+    def setUp(self):
+        self.server = PgWireServer(fail_pattern='bad').start()
+        self.addCleanup(self.server.stop)
+        conn_attrs = dict(CONN_ATTRS)
+        self.addCleanup(configure_pool, conn_attrs)
+        configure_pool(self.server.conn_attrs)
+
+    def test_results_per_statement_in_order(self):
+        tables = {f'fixture_{idx}': [('id', 'LONG'), ('ts', 'TIMESTAMP')] for idx in range(600)}
+        tables['bad_table'] = [('id', 'LONG')]
+        for concurrency in (1, 4):
+            self.server.reset()
+            results = create_tables(tables, designated='ts', partition_by='DAY', concurrency=concurrency)
+            self.assertEqual(601, len(results))
+            self.assertEqual(['CREATE TABLE'] * 600, [result.tag for result in results[:600]])
+            self.assertTrue(results[0].sql.startswith('CREATE TABLE IF NOT EXISTS fixture_0 (id LONG, ts TIMESTAMP)'))
+            self.assertFalse(results[-1].ok)
+            self.assertIsInstance(results[-1].error, WireError)
+            self.assertEqual(601, self.server.query_count)
+            self.assertLessEqual(self.server.connection_count, 4)
+
+    def test_drop_and_truncate(self):
+        self.assertTrue(all(result.ok for result in truncate_tables(['a', 'b'])))
+        results = drop_tables('fixture_', 3)
+        self.assertEqual(['DROP TABLE'] * 3, [result.tag for result in results])
+        self.assertEqual('DROP table fixture_2', self.server.statements[-1])
@@ -0,0 +1,142 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import threading
+import time
+import unittest
+
+from pykit import (
+    ConnectionPool,
+    PoolTimeoutError
+)
+
+
+class FakeConnection:
+    opened = 0
+
+    def __init__(self):
+        FakeConnection.opened += 1
+        self.closed = 0
+        self.pings = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        FakeConnection.opened = 0
+
+    def test_min_size_opened_upfront_and_reused(self):
+        with ConnectionPool(FakeConnection, min_size=2, max_size=4) as pool:
+            self.assertEqual(2, FakeConnection.opened)
+            with pool.connection() as conn:
+                pass
+            with pool.connection() as same_conn:
+                self.assertIs(conn, same_conn)
+            self.assertEqual(2, FakeConnection.opened)
+            self.assertEqual(2, pool.idle_count)
+
+    def test_max_size_blocks_until_release(self):
+        with ConnectionPool(FakeConnection, min_size=0, max_size=2) as pool:
+            first = pool.acquire()
+            pool.acquire()
+            self.assertRaises(PoolTimeoutError, pool.acquire, 0.05)
+            threading.Timer(0.05, pool.release, args=(first,)).start()
+            self.assertIs(first, pool.acquire(timeout=5.0))
+            self.assertEqual(2, pool.size)
+
+    def test_concurrent_use_never_exceeds_max_size(self):
+        in_use = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker(pool):
+            for _ in range(50):
+                with pool.connection() as conn:
+                    with lock:
+                        self.assertNotIn(conn, in_use)
+                        in_use.append(conn)
+                        peak.append(len(in_use))
+                    time.sleep(0.0001)
+                    with lock:
+                        in_use.remove(conn)
+
+        with ConnectionPool(FakeConnection, min_size=1, max_size=3) as pool:
+            threads = [threading.Thread(target=worker, args=(pool,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLessEqual(max(peak), 3)
+            self.assertLessEqual(FakeConnection.opened, 3)
+
+    def test_broken_connections_are_discarded(self):
+        with ConnectionPool(FakeConnection, min_size=1, max_size=2) as pool:
+            try:
+                with pool.connection() as conn:
+                    conn.closed = 2
+                    raise ConnectionError('server closed the connection')
+            except ConnectionError:
+                pass
+            self.assertEqual(0, pool.size)
+            with pool.connection() as new_conn:
+                self.assertIsNot(conn, new_conn)
+
+    def test_health_check_and_idle_eviction(self):
+        def ping(conn):
+            conn.pings += 1
+            if conn.pings > 1:
+                raise ConnectionError('gone')
+
+        with ConnectionPool(FakeConnection, min_size=1, max_size=3, max_idle=0.05, check_after=0.0, ping=ping) as pool:
+            first = pool.acquire()
+            second = pool.acquire()
+            pool.release(first)
+            pool.release(second)
+            self.assertEqual(2, pool.idle_count)
+            time.sleep(0.1)
+            conn = pool.acquire()  # evicts the oldest idle connection, pings the other
+            self.assertIs(second, conn)
+            self.assertEqual(1, first.closed)
+            pool.release(conn)
+            conn = pool.acquire()  # second ping fails, a fresh connection replaces it
+            self.assertIsNot(second, conn)
+            self.assertEqual(1, second.closed)
+            self.assertEqual(1, pool.size)
+
+    def test_quiet_pool_evicts_idle(self):
+        with ConnectionPool(FakeConnection, min_size=1, max_size=3, max_idle=0.05) as pool:
+            first = pool.acquire()
+            second = pool.acquire()
+            pool.release(first)
+            pool.release(second)
+            self.assertEqual(2, pool.idle_count)
+            for _ in range(100):
+                if pool.idle_count == 1:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(1, pool.idle_count)
+            self.assertEqual(1, pool.size)
+            self.assertEqual(1, first.closed)
+            self.assertEqual(0, second.closed)
@@ -0,0 +1,156 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from pykit import (
+    create_message,
+    Spool,
+    SpoolFullError,
+    TcpSender
+)
+
+
+class SpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.spool_path = Path(self.tmp_dir.name) / 'ilp.spool'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_peek_consume(self):
+        with Spool(self.spool_path, capacity=64) as spool:
+            spool.append(b'a 1\nbb 22\n')
+            spool.append(b'ccc 333\n')
+            self.assertEqual(18, spool.pending)
+            self.assertEqual(b'a 1\n', spool.peek(6))
+            self.assertEqual(b'a 1\nbb 22\n', spool.peek(12))
+            spool.consume(4)
+            self.assertEqual(b'bb 22\nccc 333\n', spool.peek())
+            spool.consume(14)
+            self.assertEqual(0, spool.pending)
+            self.assertEqual(b'', spool.peek())
+
+    def test_offsets_survive_reopen(self):
+        with Spool(self.spool_path, capacity=64) as spool:
+            spool.append(b'a 1\nbb 22\n')
+            spool.consume(4)
+        with Spool(self.spool_path, capacity=1024) as spool:
+            self.assertEqual(64, spool.capacity)
+            self.assertEqual(b'bb 22\n', spool.peek())
+
+    def test_compaction_and_full(self):
+        with Spool(self.spool_path, capacity=16) as spool:
+            spool.append(b'0123456\n')
+            spool.append(b'abcdef\n')
+            self.assertRaises(SpoolFullError, spool.append, b'xy\n')
+            spool.consume(8)
+            spool.append(b'xy\n')
+            self.assertEqual(b'abcdef\nxy\n', spool.peek())
+
+    def test_replay(self):
+        with Spool(self.spool_path) as spool:
+            spool.append(b'a 1\nbb 22\nccc 333\n')
+            sent = []
+            written = [10, 5]
+            self.assertEqual(10, spool.replay(lambda chunk: sent.append(chunk) or written.pop(0), chunk_size=10))
+            self.assertEqual([b'a 1\nbb 22\n', b'ccc 333\n'], sent)
+            self.assertEqual(b'ccc 333\n', spool.peek())
+
+    def test_replay_drops_unterminated_tail(self):
+        with Spool(self.spool_path, capacity=64) as spool:
+            spool.append(b'a 1\n')
+            spool.append(b'abc')
+            self.assertEqual(b'a 1\n', spool.peek())
+            sent = []
+            self.assertEqual(4, spool.replay(lambda chunk: sent.append(chunk) or len(chunk)))
+            self.assertEqual([b'a 1\n'], sent)
+            self.assertEqual(0, spool.pending)
+
+    def test_append_wraps_around(self):
+        # pending bytes overlap the free head of the file, appends wrap instead of failing
+        with Spool(self.spool_path, capacity=16) as spool:
+            spool.append(b'ab\n0123456\n')
+            spool.consume(3)
+            self.assertEqual(8, spool.free)
+            spool.append(b'xyzuvw\n')
+            self.assertEqual(1, spool.free)
+            self.assertEqual(b'0123456\n', spool.peek(10))
+        with Spool(self.spool_path) as spool:
+            self.assertEqual(b'0123456\nxyzuvw\n', spool.peek())
+            spool.consume(8)
+            self.assertEqual(b'xyzuvw\n', spool.peek())
+            spool.append(b'last\n')
+            self.assertEqual(b'xyzuvw\nlast\n', spool.peek())
+
+
+class TcpSenderTest(unittest.TestCase):
+    def test_spools_until_server_is_up(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+                server.bind(('127.0.0.1', 0))
+                port = server.getsockname()[1]
+                messages = [create_message('spooled', fields={'idx': idx}) for idx in range(10)]
+                with TcpSender(port=port, spool_path=Path(tmp_dir) / 'ilp.spool', retry_interval=0.0) as sender:
+                    self.assertFalse(sender.send(*messages[:5]))
+                    self.assertEqual(len(''.join(messages[:5])), sender.spool.pending)
+                    server.listen(1)
+                    received = []
+                    reader = threading.Thread(target=_read_all, args=(server, received))
+                    reader.start()
+                    self.assertTrue(sender.send(*messages[5:]))
+                    self.assertEqual(0, sender.spool.pending)
+                reader.join(timeout=5.0)
+                self.assertEqual(''.join(messages).encode('utf-8'), b''.join(received))
+
+    def test_full_spool_replays_before_dropping(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+                server.bind(('127.0.0.1', 0))
+                port = server.getsockname()[1]
+                messages = [create_message('spooled', fields={'idx': idx}) for idx in range(4)]
+                spool_capacity = len(''.join(messages[:3]))
+                with TcpSender(port=port, spool_path=Path(tmp_dir) / 'ilp.spool',
+                               spool_capacity=spool_capacity, retry_interval=0.0) as sender:
+                    self.assertFalse(sender.send(*messages[:3]))
+                    self.assertEqual(0, sender.spool.free)
+                    server.listen(1)
+                    received = []
+                    reader = threading.Thread(target=_read_all, args=(server, received))
+                    reader.start()
+                    self.assertTrue(sender.send(messages[3]))
+                    self.assertEqual(0, sender.spool.pending)
+                reader.join(timeout=5.0)
+                self.assertEqual(''.join(messages).encode('utf-8'), b''.join(received))
+
+
+def _read_all(server: socket.socket, received: list):
+    conn, _ = server.accept()
+    with conn:
+        while data := conn.recv(65536):
+            received.append(data)
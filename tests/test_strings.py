@@ -0,0 +1,112 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from pykit import (
+    string_equals,
+    string_in,
+    string_startswith,
+    string_contains
+)
+
+from tests.util import (
+    write_table,
+    string_files
+)
+
+DAY = 86_400_000_000
+MESSAGES = [
+    ['connection reset', None, '', 'connection refused', 'ok'],
+    ['résumé 😀', 'ok', 'reset by peer', None, 'Ā愀', 'connection', 'Āāā']
+]
+
+
+class StringPredicateTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+        partitions = []
+        for day, messages in enumerate(MESSAGES):
+            data, offsets = string_files(messages)
+            ts = day * DAY + np.arange(len(messages), dtype=np.int64)
+            partitions.append((day * DAY, {
+                'ts.d': ts.tobytes(),
+                'msg.d': data,
+                'msg.i': offsets,
+                'level.d': np.arange(len(messages), dtype=np.int32).tobytes()}))
+        write_table(Path(self.data_dir.name), 'logs', [('msg', 11), ('level', 5), ('ts', 8)], 2, partitions)
+        self.messages = [message for messages in MESSAGES for message in messages]
+
+    def expected(self, predicate) -> list:
+        return [message is not None and predicate(message) for message in self.messages]
+
+    def test_equals(self):
+        for value in ('ok', '', 'connection', 'résumé 😀', 'missing'):
+            self.assertEqual(self.expected(lambda message: message == value),
+                             string_equals('logs', 'msg', value).tolist())
+
+    def test_in(self):
+        values = {'ok', '', 'Ā愀', 'connection refused', 'missing'}
+        self.assertEqual(self.expected(lambda message: message in values), string_in('logs', 'msg', values).tolist())
+        self.assertEqual([False] * len(self.messages), string_in('logs', 'msg', []).tolist())
+
+    def test_in_generator(self):
+        # values are read once, then matched in every partition
+        values = ['ok', 'connection']
+        self.assertEqual(self.expected(lambda message: message in values),
+                         string_in('logs', 'msg', (value for value in values)).tolist())
+
+    def test_startswith(self):
+        for prefix in ('connection', 'conn', '', 'résumé', 'reset by peer!'):
+            self.assertEqual(self.expected(lambda message: message.startswith(prefix)),
+                             string_startswith('logs', 'msg', prefix).tolist())
+
+    def test_contains(self):
+        for needle in ('reset', 'e', '😀', 'é', '', 'Ā', '愀', 'peer', 'missing'):
+            self.assertEqual(self.expected(lambda message: needle in message),
+                             string_contains('logs', 'msg', needle).tolist())
+
+    def test_misaligned_bytes(self):
+        # 'Āāā' is 00 01 01 01 01 01 in UTF-16LE, the first byte match of 'āā' is off a char boundary
+        for needle in ('āā', 'a', '\u0101\u0100', '\u0100\u0101'):
+            self.assertEqual(self.expected(lambda message: needle in message),
+                             string_contains('logs', 'msg', needle).tolist())
+
+    def test_not_a_string_column(self):
+        with self.assertRaises(ValueError):
+            string_contains('logs', 'level', 'a')
+        with self.assertRaises(ValueError):
+            string_equals('logs', 'unknown', 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
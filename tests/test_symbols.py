@@ -0,0 +1,131 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from pykit import (
+    rows_for_symbol,
+    df_for_symbol,
+    latest_by
+)
+from pykit import symbols
+
+from tests.util import (
+    write_table,
+    index_files,
+    symbol_files
+)
+
+DAY = 86_400_000_000
+SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD']
+NULL_KEY = np.iinfo(np.int32).min
+
+
+class SymbolIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch('pykit.core.QDB_DB_DATA', Path(self.data_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+        self.write_quotes(len(SYMBOLS))
+
+    def write_quotes(self, symbol_count: int, table_name: str = 'quotes'):
+        self.keys = [[0, 1, 0, 2, 0, 0, 0, NULL_KEY, 0, 1], [1, 0, 2, 2, 0, 1]]
+        partitions = []
+        first_row = 0
+        for day, keys in enumerate(self.keys):
+            ts = day * DAY + np.arange(len(keys), dtype=np.int64) * 1000
+            partitions.append((day * DAY, {
+                'ts.d': ts.tobytes(),
+                'sym.d': np.array(keys, dtype=np.int32).tobytes(),
+                'price.d': (np.arange(len(keys), dtype=np.float64) + first_row).tobytes(),
+                **index_files('sym', keys, block_value_count=2)}))
+            first_row += len(keys)
+        write_table(Path(self.data_dir.name), table_name, [('sym', 12), ('price', 10), ('ts', 8)], 2, partitions,
+                    symbol_counts=[symbol_count], root_files=symbol_files('sym', SYMBOLS[:symbol_count]))
+
+    def test_rows(self):
+        self.assertEqual([0, 2, 4, 5, 6, 8, 11, 14], rows_for_symbol('quotes', 'sym', 'EURUSD').tolist())
+        self.assertEqual([1, 9, 10, 15], rows_for_symbol('quotes', 'sym', 'GBPUSD').tolist())
+        self.assertEqual([7], rows_for_symbol('quotes', 'sym', None).tolist())
+        self.assertEqual([], rows_for_symbol('quotes', 'sym', 'AUDUSD').tolist())
+        self.assertEqual([], rows_for_symbol('quotes', 'sym', 'unknown').tolist())
+
+    def test_time_range(self):
+        self.assertEqual([5, 6, 8, 11], rows_for_symbol('quotes', 'sym', 'EURUSD', 5000, DAY + 2000).tolist())
+        self.assertEqual([14], rows_for_symbol('quotes', 'sym', 'EURUSD', ts_from=DAY + 2000).tolist())
+        self.assertEqual([0, 2], rows_for_symbol('quotes', 'sym', 'EURUSD', ts_to=3000).tolist())
+
+    def test_frame(self):
+        df = df_for_symbol('quotes', 'sym', 'USDJPY')
+        self.assertEqual(['sym', 'price'], list(df.columns))
+        self.assertEqual('ts', df.index.name)
+        self.assertEqual([3000, DAY + 2000, DAY + 3000], df.index.tolist())
+        self.assertEqual([3.0, 12.0, 13.0], df['price'].tolist())
+        self.assertEqual(['USDJPY'] * 3, df['sym'].tolist())
+        df = df_for_symbol('quotes', 'sym', 'GBPUSD', columns=['price'], ts_from=DAY)
+        self.assertEqual([10.0, 15.0], df['price'].tolist())
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            rows_for_symbol('quotes', 'price', 'EURUSD')
+        with self.assertRaises(ValueError):
+            rows_for_symbol('quotes', 'missing', 'EURUSD')
+
+    def test_latest_by(self):
+        df = latest_by('quotes', 'sym')
+        self.assertEqual([DAY + 3000, DAY + 4000, DAY + 5000], df.index.tolist())
+        self.assertEqual(['USDJPY', 'EURUSD', 'GBPUSD'], df['sym'].tolist())
+        self.assertEqual([13.0, 14.0, 15.0], df['price'].tolist())
+        self.assertEqual(['price'], list(latest_by('quotes', 'sym', ['price']).columns))
+
+    def test_latest_by_skips_nulls(self):
+        # AUDUSD never occurs so the whole table is scanned, the null row is still left out
+        with mock.patch('pykit.symbols.LATEST_BY_CHUNK_ROWS', 16):
+            self.assertEqual([DAY + 3000, DAY + 4000, DAY + 5000], latest_by('quotes', 'sym').index.tolist())
+        # no committed symbols, as in a table where every value is null
+        self.write_quotes(0, 'nulls')
+        df = latest_by('nulls', 'sym', ['price'])
+        self.assertEqual(0, len(df))
+        self.assertEqual(['price'], list(df.columns))
+
+    def test_latest_by_stops_early(self):
+        # all three symbols are in the last partition, the first is never read
+        self.write_quotes(3, 'quotes3')
+        read_files = []
+
+        def map_file(file_path, length=0):
+            read_files.append(file_path)
+            return map_file.wrapped(file_path, length)
+
+        map_file.wrapped = symbols.map_file
+        with mock.patch('pykit.symbols.map_file', map_file), mock.patch('pykit.symbols.LATEST_BY_CHUNK_ROWS', 2):
+            df = latest_by('quotes3', 'sym', ['price'])
+        self.assertEqual([13.0, 14.0, 15.0], df['price'].tolist())
+        self.assertFalse([file_path for file_path in read_files if file_path.parent.name == '1970-01-01'])
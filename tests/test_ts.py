@@ -21,14 +21,23 @@
 #  limitations under the License.
 #
 
+import time
 import unittest
 
+import numpy as np
+
 from pykit import (
     to_timestamp,
     from_timestamp,
     to_date,
-    from_date
+    from_date,
+    now_utc,
+    to_timestamps,
+    from_timestamps,
+    utc_to_local,
+    local_to_utc
 )
+from pykit.ts import DATE_FORMAT_DAY, LONG_NULL
 
 
 class TimestampTest(unittest.TestCase):
@@ -39,3 +48,95 @@ class TimestampTest(unittest.TestCase):
     def test_date(self):
         date_value = to_date('2021-10-01')
         self.assertEqual('2021-10-01', from_date(date_value))
+
+    def test_exact_micros(self):
+        for micros in (253_402_300_799_999_999, -62_135_596_800_000_000, 1_633_081_122_999_999, -1):
+            self.assertEqual(micros, to_timestamp(from_timestamp(micros)))
+        self.assertEqual('9999-12-31 23:59:59.999999', from_timestamp(253_402_300_799_999_999))
+
+    def test_custom_formats(self):
+        micros = to_timestamp('2021-10-01 09:38:42.123456')
+        self.assertEqual('01.10.2021 09:38', from_timestamp(micros, '%d.%m.%Y %H:%M'))
+        self.assertEqual(micros - 42_123_456, to_timestamp('01.10.2021 09:38', '%d.%m.%Y %H:%M'))
+        self.assertEqual(micros, to_timestamp('2021-10-1 9:38:42.123456'))
+        self.assertEqual('Oct 01 2021', from_timestamp(micros, '%b %d %Y'))
+        self.assertEqual(micros - 34_722_123_456, to_timestamp('Oct 01 2021', '%b %d %Y'))
+
+    def test_invalid_values(self):
+        for value in ('2021-02-29', '2021-13-01', '2021-1a-01', '2021-10-01x'):
+            with self.assertRaises(ValueError):
+                to_date(value)
+
+    def test_now(self):
+        self.assertLess(abs(now_utc() - time.time() * 1e6), 1e6)
+
+
+class TimestampArrayTest(unittest.TestCase):
+    def test_timestamps_match_scalar(self):
+        micros = np.array([0, -1, 1_633_081_122_123_456, -2_208_988_800_000_000])
+        formatted = from_timestamps(micros)
+        self.assertEqual([from_timestamp(int(value)) for value in micros], formatted.tolist())
+        np.testing.assert_array_equal(micros, to_timestamps(formatted))
+
+    def test_round_trip_extremes(self):
+        micros = np.array([-62_135_596_800_000_000, 253_402_300_799_999_999])
+        formatted = from_timestamps(micros)
+        self.assertEqual(['0001-01-01 00:00:00.000000', '9999-12-31 23:59:59.999999'], formatted.tolist())
+        np.testing.assert_array_equal(micros, to_timestamps(formatted))
+
+    def test_dates(self):
+        days = np.array(['1970-01-01', '2000-02-29', '2021-10-01'])
+        micros = to_timestamps(days, DATE_FORMAT_DAY)
+        self.assertEqual([to_date(value) for value in days], micros.tolist())
+        self.assertEqual(days.tolist(), from_timestamps(micros, DATE_FORMAT_DAY).tolist())
+
+    def test_nulls(self):
+        formatted = from_timestamps(np.array([LONG_NULL, 0]))
+        self.assertEqual(['', '1970-01-01 00:00:00.000000'], formatted.tolist())
+
+    def test_other_formats(self):
+        micros = to_timestamps(['2021/10/01 09:38'], '%Y/%m/%d %H:%M')
+        self.assertEqual(to_timestamp('2021-10-01 09:38:00.000000'), micros[0])
+        self.assertEqual(['2021/10/01 09:38'], from_timestamps(micros, '%Y/%m/%d %H:%M').tolist())
+
+    def test_invalid(self):
+        for value in ('2021-02-29', '2021-13-01', '2021-1a-01', '2021/10/01'):
+            with self.assertRaises(ValueError):
+                to_timestamps(np.array([value, '2021-10-01']), DATE_FORMAT_DAY)
+
+
+class TimeZoneTest(unittest.TestCase):
+    def test_dst(self):
+        utc = to_timestamps(['2021-03-28 00:59:59.000000', '2021-03-28 01:00:00.000000',
+                             '2021-10-31 00:59:59.000000', '2021-10-31 01:00:00.000000'])
+        local = utc_to_local(utc, 'Europe/London')
+        self.assertEqual(['2021-03-28 00:59:59.000000', '2021-03-28 02:00:00.000000',
+                          '2021-10-31 01:59:59.000000', '2021-10-31 01:00:00.000000'],
+                         from_timestamps(local).tolist())
+        self.assertEqual(['2021-10-01 14:30:00.000000'],
+                         from_timestamps(utc_to_local(to_timestamps(['2021-10-01 09:00:00.000000']), 'Asia/Kolkata')).tolist())
+
+    def test_round_trip(self):
+        utc = np.arange(1_600_000_000_000_000, 1_700_000_000_000_000, 3_600_000_000 * 7, dtype=np.int64)
+        local = utc_to_local(utc, 'America/New_York')
+        self.assertEqual({-4 * 3_600_000_000, -5 * 3_600_000_000}, set((local - utc).tolist()))
+        back = local_to_utc(local, 'America/New_York')
+        np.testing.assert_array_equal(local, utc_to_local(back, 'America/New_York'))
+        # only the hour repeated when clocks go back maps to a different instant
+        self.assertEqual({3_600_000_000}, set((back - utc)[back != utc].tolist()))
+
+    def test_before_first_transition(self):
+        # 1874 is local mean time in New York, 4:56 behind UTC
+        local = np.array([-3_000_000_000_000_000, 1_633_053_600_000_000], dtype=np.int64)
+        utc = local_to_utc(local, 'America/New_York')
+        self.assertEqual([17_760_000_000, 4 * 3_600_000_000], (utc - local).tolist())
+        np.testing.assert_array_equal(local, utc_to_local(utc, 'America/New_York'))
+        self.assertEqual([17_760_000_000], (local_to_utc(local[:1], 'America/New_York') - local[:1]).tolist())
+
+    def test_nulls_and_out(self):
+        micros = np.array([LONG_NULL, 0, 3_600_000_000], dtype=np.int64)
+        result = utc_to_local(micros, 'Asia/Tokyo', out=micros)
+        self.assertIs(result, micros)
+        self.assertEqual([LONG_NULL, 32_400_000_000, 36_000_000_000], micros.tolist())
+        self.assertEqual([LONG_NULL, 0, 3_600_000_000], local_to_utc(micros, 'Asia/Tokyo').tolist())
+        self.assertEqual([LONG_NULL], utc_to_local(np.array([LONG_NULL]), 'UTC').tolist())
@@ -48,6 +48,14 @@ class TypesTest(BaseTestTest):
         # self._test_type(ColumnTypes.FLOAT, [3.14159, np.NaN, 0.0, None, 2.71828, pd.NA])
         # self._test_type(ColumnTypes.DOUBLE, [3.14159, np.NaN, 0.0, None, 2.71828, pd.NA])
 
+    def test_resolve(self):
+        self.assertIs(ColumnTypes.SYMBOL, ColumnTypes.resolve(12))
+        self.assertIs(ColumnTypes.GEOINT, ColumnTypes.resolve(16 | 30 << 8))
+        self.assertIs(ColumnTypes.UNDEFINED, ColumnTypes.resolve(99))
+        self.assertIs(ColumnTypes.LONG256, ColumnTypes.resolve_name('long256'))
+        with self.assertRaises(ValueError):
+            ColumnTypes.resolve_name('decimal')
+
     def _test_type(self, series_type: ColumnType, values: typing.List[typing.Any]):
         series = pd.Series(data=values, dtype=series_type)
         series_bytes = series.values.tobytes('C')
@@ -0,0 +1,154 @@
+#
+#     ___                  _   ____  ____
+#    / _ \ _   _  ___  ___| |_|  _ \| __ )
+#   | | | | | | |/ _ \/ __| __| | | |  _ \
+#   | |_| | |_| |  __/\__ \ |_| |_| | |_) |
+#    \__\_\\__,_|\___||___/\__|____/|____/
+#
+#  Copyright (c) 2014-2019 Appsicle
+#  Copyright (c) 2019-2020 QuestDB
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import struct
+import unittest
+
+import numpy as np
+
+from pykit.pgwire import _numbered_params
+from pykit.wire import (
+    PG_EPOCH_MICROS,
+    WireConnection,
+    _ResultDecoder,
+    _row_description,
+    _message
+)
+
+LONG_NULL = np.iinfo(np.int64).min
+INT_NULL = np.iinfo(np.int32).min
+
+
+def data_row(*values: bytes) -> bytes:
+    payload = struct.pack('>h', len(values))
+    for value in values:
+        payload += struct.pack('>i', -1) if value is None else struct.pack('>i', len(value)) + value
+    return _message(b'D', payload)
+
+
+def row_description(*fields) -> bytes:
+    payload = struct.pack('>h', len(fields))
+    for name, oid in fields:
+        payload += name.encode() + b'\x00' + struct.pack('>ihihih', 0, 0, oid, 8, -1, 1)
+    return payload
+
+
+class ResultDecoderTest(unittest.TestCase):
+    def decode(self, fields, rows, split=None):
+        decoder = _ResultDecoder(fields)
+        buf = bytearray(b''.join(rows) + _message(b'C', b'SELECT\x00'))
+        end = len(buf) if split is None else split
+        pos = decoder.feed(buf, 0, end)
+        if split is not None:
+            pos = decoder.feed(buf, pos, len(buf))
+        self.assertEqual(b'C', bytes(buf[pos:pos + 1]))
+        return decoder.finish()
+
+    def test_row_description(self):
+        fields = [('id', 23), ('ts', 1114)]
+        self.assertEqual(fields, _row_description(row_description(*fields)))
+
+    def test_fixed_width_fast_path(self):
+        fields = [('id', 23), ('value', 701), ('ts', 1114), ('flag', 16)]
+        rows = [data_row(struct.pack('>i', idx), struct.pack('>d', idx / 2),
+                         struct.pack('>q', idx * 1000), struct.pack('>?', idx % 2))
+                for idx in range(100)]
+        columns = self.decode(fields, rows, split=40 * 35 + 3)
+        self.assertEqual(np.int32, columns['id'].dtype)
+        self.assertEqual(list(range(100)), columns['id'].tolist())
+        self.assertEqual([idx / 2 for idx in range(100)], columns['value'].tolist())
+        self.assertEqual(PG_EPOCH_MICROS + 99000, columns['ts'][99])
+        self.assertEqual([bool(idx % 2) for idx in range(100)], columns['flag'].tolist())
+
+    def test_nulls_become_sentinels(self):
+        fields = [('id', 23), ('value', 701), ('ts', 1114)]
+        rows = [data_row(struct.pack('>i', 1), struct.pack('>d', 1.5), struct.pack('>q', 0)),
+                data_row(None, None, None),
+                data_row(struct.pack('>i', 3), struct.pack('>d', 3.5), struct.pack('>q', 5))]
+        columns = self.decode(fields, rows)
+        self.assertEqual([1, INT_NULL, 3], columns['id'].tolist())
+        self.assertTrue(np.isnan(columns['value'][1]))
+        self.assertEqual([PG_EPOCH_MICROS, LONG_NULL, PG_EPOCH_MICROS + 5], columns['ts'].tolist())
+
+    def test_variable_width_columns(self):
+        fields = [('sym', 1043), ('day', 1082), ('raw', 17)]
+        rows = [data_row('ü'.encode(), struct.pack('>i', 1), b'\x00\x01'),
+                data_row(None, None, None)]
+        columns = self.decode(fields, rows, split=5)
+        self.assertEqual(['ü', None], columns['sym'].tolist())
+        self.assertEqual([(PG_EPOCH_MICROS + 86_400_000_000) // 1000, LONG_NULL], columns['day'].tolist())
+        self.assertEqual([b'\x00\x01', None], columns['raw'].tolist())
+
+    def test_repeated_names(self):
+        columns = self.decode([('a', 23), ('a', 23)], [data_row(struct.pack('>i', 1), struct.pack('>i', 2))])
+        self.assertEqual({'a': [1], 'a.1': [2]}, {name: values.tolist() for name, values in columns.items()})
+
+    def test_empty_result_keeps_types(self):
+        columns = self.decode([('id', 20), ('sym', 25)], [])
+        self.assertEqual(np.int64, columns['id'].dtype)
+        self.assertEqual(object, columns['sym'].dtype)
+
+    def test_numbered_params(self):
+        self.assertEqual('select * from t where a = $1 and b = $2',
+                         _numbered_params('select * from t where a = %s and b = %s', (1, 2)))
+        self.assertEqual('select 1', _numbered_params('select 1'))
+
+
+class ScriptedSocket:
+    # hands out the scripted chunks one recv at a time, whatever was sent
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def sendall(self, data):
+        pass
+
+    def recv(self, size):
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def close(self):
+        pass
+
+
+class IterColumnsTest(unittest.TestCase):
+    def connection(self, chunks) -> WireConnection:
+        conn = WireConnection.__new__(WireConnection)
+        conn.server_params = {}
+        conn._buf = bytearray()
+        conn._pos = 0
+        conn._sock = ScriptedSocket(chunks)
+        return conn
+
+    def test_rows_read_on_message_boundaries(self):
+        # every recv ends on a message boundary, so DataRows also arrive into an empty buffer
+        rows = [data_row(struct.pack('>q', idx)) for idx in range(6)]
+        chunks = [_message(b'1') + _message(b'2') + _message(b'T', row_description(('n', 20))) + rows[0],
+                  rows[1], rows[2] + _message(b's'),
+                  rows[3], rows[4] + _message(b's'),
+                  rows[5], _message(b'C', b'SELECT\x00'), _message(b'Z', b'I')]
+        conn = self.connection(chunks)
+        self.assertEqual([[0, 1, 2], [3, 4], [5]],
+                         [columns['n'].tolist() for columns in conn.iter_columns('select n', chunk_rows=3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,8 @@
 
 import unittest
 import os
+import struct
+import typing
 import psycopg2
 import numpy as np
 import mmap
@@ -36,6 +38,7 @@ from pykit import (
     with_cursor,
     Cursor
 )
+from pykit.ts import from_timestamp
 from pykit.internal import (
     MemSnapshot,
     mem_snapshot,
@@ -81,6 +84,95 @@ class BaseTestTest(unittest.TestCase):
             print(f'Error while creating rnd table [{table_name}]: {create_error}')
 
 
+def write_table(data_root: Path,
+                table_name: str,
+                columns: typing.List[typing.Tuple[str, int]],
+                ts_idx: int,
+                partitions: typing.List[typing.Tuple[int, typing.Dict[str, bytes]]],
+                txn_id: int = 1,
+                symbol_counts: typing.Sequence[int] = (),
+                root_files: typing.Dict[str, bytes] = None,
+                data_version: int = 0) -> Path:
+    # Synthetic DAY partitioned table under data_root: columns are (name, type id) and
+    # partitions (timestamp micros, {file name: content}), row counts come from the
+    # designated timestamp's .d file. symbol_counts are the SYMBOL columns' committed
+    # symbol table sizes, root_files (e.g. symbol tables) go in the table folder, and
+    # data_version goes up with each truncate
+    table_root = data_root / table_name
+    table_root.mkdir(parents=True)
+    meta = struct.pack('=iiiiiiq', len(columns), 0, ts_idx, 1, 1, 1000, 0)
+    meta += bytes(128 - len(meta))
+    for _, type_id in columns:
+        meta += struct.pack('=iqi', type_id, 0, 0)
+    for col_name, _ in columns:
+        meta += struct.pack('=i', len(col_name)) + col_name.encode('utf-16-le')
+    (table_root / '_meta').write_bytes(meta)
+    sizes = [len(files[f'{columns[ts_idx][0]}.d']) // 8 for _, files in partitions]
+    txn = struct.pack('=qqq', txn_id, sizes[-1], sum(sizes[:-1])) + bytes(24)
+    txn += struct.pack('=q', data_version) + bytes(16)
+    txn += struct.pack('=i', len(symbol_counts))
+    txn += b''.join(struct.pack('=ii', count, count) for count in symbol_counts)
+    txn += struct.pack('=i', len(partitions) * 32)
+    txn += b''.join(struct.pack('=qqqq', p_ts, size, -1, -1) for (p_ts, _), size in zip(partitions, sizes))
+    (table_root / '_txn').write_bytes(txn)
+    for file_name, content in (root_files or {}).items():
+        (table_root / file_name).write_bytes(content)
+    for p_ts, files in partitions:
+        p_folder = table_root / from_timestamp(p_ts, '%Y-%m-%d')
+        p_folder.mkdir()
+        for file_name, content in files.items():
+            (p_folder / file_name).write_bytes(content)
+    return table_root
+
+
+def string_files(values: typing.Sequence[typing.Optional[str]]) -> typing.Tuple[bytes, bytes]:
+    # .d and .i content of a STRING column, or .c and .o (less its header) of a symbol table
+    data, offsets = bytearray(), []
+    for value in values:
+        offsets.append(len(data))
+        if value is None:
+            data += struct.pack('=i', -1)
+        else:
+            encoded = value.encode('utf-16-le')
+            data += struct.pack('=i', len(encoded) // 2) + encoded
+    return bytes(data), struct.pack(f'={len(offsets)}q', *offsets)
+
+
+def binary_files(values: typing.Sequence[typing.Optional[bytes]]) -> typing.Tuple[bytes, bytes]:
+    # .d and .i content of a BINARY column
+    data, offsets = bytearray(), []
+    for value in values:
+        offsets.append(len(data))
+        data += struct.pack('=q', -1 if value is None else len(value)) + (value or b'')
+    return bytes(data), struct.pack(f'={len(offsets)}q', *offsets)
+
+
+def index_files(col_name: str, keys: typing.Sequence[int], block_value_count: int = 4) -> typing.Dict[str, bytes]:
+    # .k and .v bitmap index of a partition's SYMBOL keys, index key is the symbol key + 1
+    index_keys = [0 if key == np.iinfo(np.int32).min else key + 1 for key in keys]
+    key_count = max(index_keys, default=-1) + 1
+    values, entries = b'', b''
+    for index_key in range(key_count):
+        rows = [row for row, row_key in enumerate(index_keys) if row_key == index_key]
+        blocks = [rows[start:start + block_value_count] for start in range(0, len(rows), block_value_count)]
+        block_size = block_value_count * 8 + 16
+        first = len(values)
+        for block_idx, block in enumerate(blocks):
+            prev_offset = len(values) - block_size if block_idx else 0
+            next_offset = len(values) + block_size if block_idx + 1 < len(blocks) else 0
+            values += struct.pack(f'={block_value_count}q', *(block + [0] * (block_value_count - len(block))))
+            values += struct.pack('=qq', prev_offset, next_offset)
+        last = len(values) - block_size if blocks else 0
+        entries += struct.pack('=qqqq', len(rows), first if blocks else 0, last, len(rows))
+    header = struct.pack('=bqqiiq', -6, 1, len(values), block_value_count, key_count, 1)
+    return {f'{col_name}.k': header + bytes(64 - len(header)) + entries, f'{col_name}.v': values}
+
+
+def symbol_files(col_name: str, symbols: typing.Sequence[str]) -> typing.Dict[str, bytes]:
+    chars, offsets = string_files(symbols)
+    return {f'{col_name}.c': chars, f'{col_name}.o': bytes(64) + offsets}
+
+
 def dataframe(file_path: Path,
               col_name: str,
               row_count: int,